@@ -1,10 +1,27 @@
-import openai
+import os
 import json
 import hashlib
+import itertools
 import time
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+from typing import Dict, List, Any, Optional, Callable, Iterator, Tuple, Set
 from dataclasses import dataclass
 from enum import Enum
+from lantern_cache import ResponseCache
+from lantern_coalesce import SingleFlight
+from lantern_providers import LLMProvider, create_provider, default_model
+from lantern_scheduler import RequestScheduler
+from lantern_tokens import estimate_tokens
+from lantern_sessions import SessionStore
+from lantern_context import build_digest
+from lantern_semantic_cache import SemanticCache, agreement, consensus
+from keyword_router import KeywordRouter
+from lantern_dag import DialogueDAG, DialogueNode
+from lantern_resilience import ResilientCaller
+from lantern_models import ModelRouter
+from lantern_cancellation import CancellationToken, QueryCancelled
+from lantern_memory import DialogueMemory
+from lantern_planner import DialoguePlanner, DialoguePlan, RequestBudget
 # FLUXInterpreter will be passed as parameter to avoid circular import
 
 class BloomLevel(Enum):
@@ -15,6 +32,32 @@ class BloomLevel(Enum):
     LEVEL_5 = 5  # Synthesis
     LEVEL_6 = 6  # Evaluation
 
+# Keywords that indicate different bloom levels, plus FLUX-specific complexity indicators
+BLOOM_ROUTER = KeywordRouter({
+    BloomLevel.LEVEL_1.name: ["what", "define", "list", "identify", "recall", "remember"],
+    BloomLevel.LEVEL_2.name: ["explain", "describe", "understand", "interpret", "summarize"],
+    BloomLevel.LEVEL_3.name: ["apply", "use", "implement", "execute", "demonstrate"],
+    BloomLevel.LEVEL_4.name: ["analyze", "compare", "examine", "investigate", "debug"],
+    BloomLevel.LEVEL_5.name: ["create", "design", "build", "synthesize", "integrate"],
+    BloomLevel.LEVEL_6.name: ["evaluate", "assess", "critique", "optimize", "judge"],
+    "flux_complexity": [
+        "connection", "floating memory", "fingerprint", "siig transfer",
+        "natural language api", "memory module", "cryptographic"
+    ]
+})
+
+# Content keywords that bring a specialist lantern into the consultation
+LANTERN_ROUTER = KeywordRouter({
+    "connection_architect": ["connection", "session", "floating"],
+    "memory_weaver": ["memory", "fingerprint", "persistence"],
+    "natural_interpreter": ["natural language", "command", "api"],
+    "siig_guardian": ["transfer", "siig", "security", "crypto"],
+    "symbolic_sage": ["symbolic", "brack", "notation", "flame"],
+    "intuitor": ["risk", "security", "threat", "vulnerability"],
+    "cogsworth": ["compliance", "standard", "requirement"],
+    "archiva": ["pattern", "history", "similar", "past"]
+})
+
 @dataclass
 class LanternResponse:
     lantern_id: str
@@ -22,6 +65,8 @@ class LanternResponse:
     timestamp: float
     confidence: float
     symbolic_notation: str
+    model: Optional[str] = None
+    route: Optional[str] = None
 
 @dataclass
 class CognitiveSession:
@@ -30,37 +75,87 @@ class CognitiveSession:
     active_lanterns: List[str]
     dialogue_history: List[Dict]
     flux_context: Optional[Dict] = None
+    max_concurrency: Optional[int] = None
+    bypass_cache: bool = False
+    on_token: Optional[Callable[[Dict], None]] = None
+    priority: str = "interactive"
+    cancel_token: Optional[CancellationToken] = None
+    plan: Optional[DialoguePlan] = None
+    memory_scope: Optional[str] = None
 
 class FLUXLanternHive:
     """Enhanced LanternHive with FLUX programming language integration"""
     
-    def __init__(self, api_key: str = None):
-        try:
-            if api_key:
-                self.client = openai.OpenAI(api_key=api_key)
-            else:
-                # Will use environment variable OPENAI_API_KEY
-                self.client = openai.OpenAI()
-        except Exception as e:
-            print(f"OpenAI client initialization failed: {e}")
-            # Fallback initialization with minimal parameters
-            import os
-            if api_key:
-                os.environ['OPENAI_API_KEY'] = api_key
-            try:
-                # Try with explicit parameters to avoid proxy issues
-                self.client = openai.OpenAI(
-                    api_key=os.getenv('OPENAI_API_KEY'),
-                    timeout=30.0
-                )
-            except Exception as e2:
-                print(f"Fallback initialization also failed: {e2}")
-                # Last resort: try without any parameters
-                self.client = openai.OpenAI()
+    def __init__(self, api_key: str = None, provider: Optional[LLMProvider] = None):
+        # LLM backend: OpenAI by default, or whatever LANTERN_LLM_PROVIDER selects
+        self.provider = provider or create_provider(api_key)
+        self.model = default_model()
+        
+        # Per bloom level, lantern and phase model tiers; self.model serves unrouted calls
+        self.model_router = ModelRouter.from_env(self.model)
 
         # FLUX Interpreter will be set externally to avoid circular import
         self.flux_interpreter = None
 
+        # Parallel consultation: per-request concurrency cap and per-call timeout
+        self.max_concurrent_consultations = int(os.getenv('LANTERN_MAX_CONCURRENCY', 4))
+        self.consult_timeout = float(os.getenv('LANTERN_CONSULT_TIMEOUT', 60))
+        self.consultation_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('LANTERN_WORKER_THREADS', 16)),
+            thread_name_prefix='lantern-consult'
+        )
+        
+        # Hedged requests and bounded retries; each consultation may run a primary and a hedge
+        self.resilience = ResilientCaller(max_workers=2 * int(os.getenv('LANTERN_WORKER_THREADS', 16)))
+
+        # Response cache for identical consultations
+        self.response_cache = ResponseCache(
+            max_entries=int(os.getenv('LANTERN_CACHE_SIZE', 1024)),
+            ttl=float(os.getenv('LANTERN_CACHE_TTL', 3600)),
+            db_path=os.getenv('LANTERN_CACHE_DB') or None
+        )
+        
+        # Final responses for reworded prompts, matched by local embedding similarity; opt-in
+        self.semantic_cache = SemanticCache(
+            max_entries=int(os.getenv('LANTERN_SEMANTIC_CACHE_SIZE', 2048)),
+            threshold=float(os.getenv('LANTERN_SEMANTIC_THRESHOLD', 0.97)),
+            ttl=float(os.getenv('LANTERN_CACHE_TTL', 3600)),
+            enabled=os.getenv('LANTERN_SEMANTIC_CACHE', 'off').lower() in ('on', 'true', '1')
+        )
+        
+        # Client-side pacing of provider calls; completions are budgeted at this many tokens
+        self.scheduler = RequestScheduler.from_env()
+        self.expected_completion_tokens = int(os.getenv('LANTERN_EXPECTED_COMPLETION_TOKENS', 500))
+        
+        # Token budgets for the lantern contributions quoted in dialogue prompts
+        self.cross_context_tokens = int(os.getenv('LANTERN_CROSS_CONTEXT_TOKENS', 600))
+        self.synthesis_context_tokens = int(os.getenv('LANTERN_SYNTHESIS_CONTEXT_TOKENS', 1200))
+        
+        # Archiva's long-term memory of past syntheses, quoted within a token budget
+        self.memory = DialogueMemory(
+            capacity=int(os.getenv('LANTERN_MEMORY_CAPACITY', 10000)),
+            directory=os.getenv('LANTERN_MEMORY_DIR') or None
+        )
+        self.memory_recall = int(os.getenv('LANTERN_MEMORY_RECALL', 3))
+        self.memory_context_tokens = int(os.getenv('LANTERN_MEMORY_CONTEXT_TOKENS', 400))
+        
+        # Cross-consultation is skipped when its inputs already agree at least this much
+        self.agreement_threshold = float(os.getenv('LANTERN_AGREEMENT_THRESHOLD', 0.85))
+        
+        # Lanterns, phases and models per request, sized to its latency and token budget
+        self.planner = DialoguePlanner.from_env()
+        
+        # Identical concurrent prompts share one dialogue, and identical concurrent lantern calls one provider call
+        self.inflight = SingleFlight()
+        self.call_inflight = SingleFlight()
+        self._session_counter = itertools.count()
+        
+        # Prompts of a batch run as separate dialogues, this many at a time
+        self.batch_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('LANTERN_BATCH_WORKERS', 4)),
+            thread_name_prefix='lantern-batch'
+        )
+
         # FLUX-specific Lanterns in addition to original cognitive council
         self.flux_lanterns = {
             "connection_architect": {
@@ -112,35 +207,23 @@ class FLUXLanternHive:
         # Combine all lanterns
         self.all_lanterns = {**self.cognitive_lanterns, **self.flux_lanterns}
         
-        # Session management
-        self.active_sessions: Dict[str, CognitiveSession] = {}
-        
-    def classify_bloom_level(self, prompt: str) -> BloomLevel:
-        """Classify the complexity level of a prompt using Bloom's taxonomy"""
-        
-        # Keywords that indicate different bloom levels
-        level_indicators = {
-            BloomLevel.LEVEL_1: ["what", "define", "list", "identify", "recall", "remember"],
-            BloomLevel.LEVEL_2: ["explain", "describe", "understand", "interpret", "summarize"],
-            BloomLevel.LEVEL_3: ["apply", "use", "implement", "execute", "demonstrate"],
-            BloomLevel.LEVEL_4: ["analyze", "compare", "examine", "investigate", "debug"],
-            BloomLevel.LEVEL_5: ["create", "design", "build", "synthesize", "integrate"],
-            BloomLevel.LEVEL_6: ["evaluate", "assess", "critique", "optimize", "judge"]
-        }
-        
-        prompt_lower = prompt.lower()
+        # Session management: bounded and expiring, old dialogues compacted to summaries
+        self.active_sessions = SessionStore(
+            max_sessions=int(os.getenv('LANTERN_MAX_SESSIONS', 1000)),
+            ttl=float(os.getenv('LANTERN_SESSION_TTL', 3600)),
+            full_history=int(os.getenv('LANTERN_SESSION_FULL_HISTORY', 2))
+        )
         
-        # Check for FLUX-specific complexity indicators
-        flux_complexity_indicators = [
-            "connection", "floating memory", "fingerprint", "siig transfer",
-            "natural language api", "memory module", "cryptographic"
-        ]
+    def classify_bloom_level(self, prompt: str, matched: Optional[Set[str]] = None) -> BloomLevel:
+        """Classify the complexity level of a prompt using Bloom's taxonomy; matched is BLOOM_ROUTER's match, if known"""
         
-        has_flux_complexity = any(indicator in prompt_lower for indicator in flux_complexity_indicators)
+        if matched is None:
+            matched = BLOOM_ROUTER.match(prompt)
+        has_flux_complexity = "flux_complexity" in matched
         
         # Determine bloom level based on keywords and complexity
         for level in reversed(list(BloomLevel)):  # Start from highest level
-            if any(keyword in prompt_lower for keyword in level_indicators[level]):
+            if level.name in matched:
                 # Boost level if FLUX complexity is detected
                 if has_flux_complexity and level.value < 5:
                     return BloomLevel(min(level.value + 1, 6))
@@ -149,40 +232,20 @@ class FLUXLanternHive:
         # Default to level 3 for FLUX-related prompts, level 2 otherwise
         return BloomLevel.LEVEL_4 if has_flux_complexity else BloomLevel.LEVEL_2
     
-    def select_lanterns(self, prompt: str, bloom_level: BloomLevel, flux_context: Dict = None) -> List[str]:
-        """Select appropriate lanterns based on prompt content and bloom level"""
+    def select_lanterns(self, prompt: str, bloom_level: BloomLevel, flux_context: Dict = None,
+                        matched: Optional[Set[str]] = None) -> List[str]:
+        """Select appropriate lanterns based on prompt content and bloom level; matched is LANTERN_ROUTER's match, if known"""
         
         selected = []
-        prompt_lower = prompt.lower()
         
         # Always include core cognitive lanterns for complex tasks
         if bloom_level.value >= 4:
             selected.extend(["planner", "eidolon"])
         
-        # Add specific lanterns based on content
-        if any(word in prompt_lower for word in ["connection", "session", "floating"]):
-            selected.append("connection_architect")
-            
-        if any(word in prompt_lower for word in ["memory", "fingerprint", "persistence"]):
-            selected.append("memory_weaver")
-            
-        if any(word in prompt_lower for word in ["natural language", "command", "api"]):
-            selected.append("natural_interpreter")
-            
-        if any(word in prompt_lower for word in ["transfer", "siig", "security", "crypto"]):
-            selected.append("siig_guardian")
-            
-        if any(word in prompt_lower for word in ["symbolic", "brack", "notation", "flame"]):
-            selected.append("symbolic_sage")
-            
-        if any(word in prompt_lower for word in ["risk", "security", "threat", "vulnerability"]):
-            selected.append("intuitor")
-            
-        if any(word in prompt_lower for word in ["compliance", "standard", "requirement"]):
-            selected.append("cogsworth")
-            
-        if any(word in prompt_lower for word in ["pattern", "history", "similar", "past"]):
-            selected.append("archiva")
+        # Add specific lanterns based on content, in the router's declaration order
+        if matched is None:
+            matched = LANTERN_ROUTER.match(prompt)
+        selected.extend(lantern_id for lantern_id in LANTERN_ROUTER.categories if lantern_id in matched)
         
         # Ensure we have at least some lanterns
         if not selected:
@@ -191,13 +254,53 @@ class FLUXLanternHive:
         # Remove duplicates while preserving order
         return list(dict.fromkeys(selected))
     
+    def classify_prompts(self, prompts: List[str],
+                         flux_contexts: Optional[List[Optional[Dict]]] = None) -> List[Tuple[BloomLevel, List[str]]]:
+        """(bloom level, lanterns) for each prompt.
+
+        Each distinct prompt is classified once, and the keyword routers scan all
+        distinct prompts in one batch pass each.
+        """
+        flux_contexts = flux_contexts or [None] * len(prompts)
+        keys = [SingleFlight.make_key(prompt, flux_context) for prompt, flux_context in zip(prompts, flux_contexts)]
+        distinct: Dict[str, Tuple[str, Optional[Dict]]] = {}
+        for key, prompt, flux_context in zip(keys, prompts, flux_contexts):
+            distinct.setdefault(key, (prompt, flux_context))
+        
+        texts = [prompt for prompt, _ in distinct.values()]
+        matches = zip(BLOOM_ROUTER.match_many(texts), LANTERN_ROUTER.match_many(texts))
+        classified: Dict[str, Tuple[BloomLevel, List[str]]] = {}
+        for (key, (prompt, flux_context)), (bloom_matched, lantern_matched) in zip(distinct.items(), matches):
+            bloom_level = self.classify_bloom_level(prompt, bloom_matched)
+            classified[key] = (bloom_level, self.select_lanterns(prompt, bloom_level, flux_context, lantern_matched))
+        return [classified[key] for key in keys]
+    
     def generate_session_id(self) -> str:
         """Generate a unique session ID"""
-        timestamp = str(time.time())
+        # The counter keeps IDs unique for sessions created within the same clock tick
+        timestamp = f"{time.time()}:{next(self._session_counter)}"
         return hashlib.md5(timestamp.encode()).hexdigest()[:12]
     
-    def consult_lantern(self, lantern_id: str, prompt: str, context: Dict = None) -> LanternResponse:
-        """Consult a specific lantern with the given prompt"""
+    def consult_lantern(self, lantern_id: str, prompt: str, context: Dict = None,
+                        timeout: Optional[float] = None, use_cache: bool = True,
+                        on_token: Optional[Callable[[str, str], None]] = None,
+                        phase: str = "consultation", request_class: str = "interactive",
+                        bloom_level: Optional[BloomLevel] = None,
+                        cancel_token: Optional[CancellationToken] = None,
+                        model: Optional[str] = None,
+                        memory_scope: Optional[str] = None) -> LanternResponse:
+        """Consult a specific lantern with the given prompt.
+
+        When on_token is given the completion is streamed and on_token(lantern_id, text)
+        is called for each chunk as it arrives; a cached response arrives as one chunk.
+        on_token returns False when a chunk reached no listener, which keeps retries open.
+        Provider calls wait their turn in the scheduler, ranked by request_class and phase,
+        and are hedged and retried within the timeout. The model comes from the routing
+        table for bloom_level, lantern_id and phase, unless a dialogue plan passes model.
+        Cancelling cancel_token drops the call from the scheduler queue or cuts off its
+        stream, and raises QueryCancelled. Archiva recalls past dialogues only from
+        memory_scope, and not at all without one.
+        """
         
         if lantern_id not in self.all_lanterns:
             raise ValueError(f"Unknown lantern: {lantern_id}")
@@ -209,17 +312,65 @@ class FLUXLanternHive:
         if context and context.get('flux_code'):
             contextual_prompt = f"FLUX Code Context:\n{context['flux_code']}\n\nTask: {prompt}"
         
+        # Archiva answers from past dialogues; later phases already quote its analysis
+        if lantern_id == "archiva" and phase in ("initial", "consultation") and memory_scope is not None:
+            contextual_prompt = self.with_memory(contextual_prompt, prompt, memory_scope)
+        
+        temperature = 0.1 if lantern_id in ["cogsworth", "siig_guardian"] else 0.3
+        route, routed_model = self.model_router.route(bloom_level.value if bloom_level else None, lantern_id, phase)
+        model = model or routed_model
+        cache_key = ResponseCache.make_key(
+            lantern_id, lantern_config["system_prompt"], contextual_prompt, temperature, model
+        )
+        
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4-turbo",
-                messages=[
+            content = self.response_cache.get(cache_key) if use_cache else None
+            cached = content is not None
+            
+            if content is None:
+                messages = [
                     {"role": "system", "content": lantern_config["system_prompt"]},
                     {"role": "user", "content": contextual_prompt}
-                ],
-                temperature=0.1 if lantern_id in ["cogsworth", "siig_guardian"] else 0.3
-            )
-            
-            content = response.choices[0].message.content
+                ]
+                timeout = timeout or self.consult_timeout
+                prompt_tokens = estimate_tokens(lantern_config["system_prompt"]) + estimate_tokens(contextual_prompt)
+                priority = RequestScheduler.priority_for(request_class, phase, lantern_id)
+                
+                def fetch(publish: Callable[[Dict], None], cancellation: CancellationToken) -> str:
+                    def attempt(budget: float):
+                        # Always streamed, so a hedged attempt that loses can be cut off mid-response
+                        with self.scheduler.slot(priority, prompt_tokens + self.expected_completion_tokens, budget,
+                                                 cancellation) as usage:
+                            produced = []
+                            try:
+                                for text in self.provider.stream(model, messages, temperature, budget):
+                                    produced.append(text)
+                                    yield text
+                            finally:
+                                usage['tokens'] = prompt_tokens + estimate_tokens("".join(produced))
+                    
+                    started = time.monotonic()
+                    try:
+                        fetched = self.resilience.call(
+                            f"{lantern_id}:{model}", attempt, timeout, lambda text: publish({"text": text}), cancellation
+                        )
+                    except Exception:
+                        self.model_router.record(route, model, time.monotonic() - started, error=True)
+                        raise
+                    elapsed = time.monotonic() - started
+                    self.model_router.record(route, model, elapsed, estimate_tokens(fetched))
+                    self.planner.observe(lantern_id, model, elapsed, estimate_tokens(fetched))
+                    self.response_cache.set(cache_key, fetched)
+                    return fetched
+                
+                # Identical calls already in flight, from this dialogue or any other, share one provider call
+                content, cached = self.call_inflight.run(
+                    cache_key, fetch,
+                    (lambda event: on_token(lantern_id, event["text"])) if on_token else None,
+                    cancel_token
+                )
+            elif on_token:
+                on_token(lantern_id, content)
             
             # Generate symbolic notation based on lantern type
             symbolic_notation = self.generate_symbolic_notation(lantern_id, content)
@@ -229,17 +380,113 @@ class FLUXLanternHive:
                 content=content,
                 timestamp=time.time(),
                 confidence=0.85,  # Could be enhanced with actual confidence scoring
-                symbolic_notation=symbolic_notation
+                symbolic_notation=symbolic_notation,
+                model=model,
+                route=None if cached else route  # Cache hits and shared calls are not the route's work this time
             )
             
+        except QueryCancelled:
+            raise
         except Exception as e:
-            return LanternResponse(
-                lantern_id=lantern_id,
-                content=f"Error consulting {lantern_id}: {str(e)}",
-                timestamp=time.time(),
-                confidence=0.0,
-                symbolic_notation=f"⚠️ ERROR: {lantern_id}"
-            )
+            return self.error_response(lantern_id, e)
+    
+    def with_memory(self, contextual_prompt: str, prompt: str, scope: str) -> str:
+        """Prefix a prompt with scope's most similar past dialogues, summarized to fit the memory budget"""
+        recalled = self.memory.recall(prompt, scope, self.memory_recall)
+        if not recalled:
+            return contextual_prompt
+        
+        digest = build_digest([(past['prompt'], past['synthesis']) for past in recalled], self.memory_context_tokens)
+        memories = "\n".join([f'- "{past_prompt}": {synthesis}' for past_prompt, synthesis in digest])
+        return f"Relevant past dialogues, most similar first:\n{memories}\n\n{contextual_prompt}"
+    
+    def error_response(self, lantern_id: str, error: Exception) -> LanternResponse:
+        """Build the response returned when a lantern could not be consulted"""
+        return LanternResponse(
+            lantern_id=lantern_id,
+            content=f"Error consulting {lantern_id}: {str(error)}",
+            timestamp=time.time(),
+            confidence=0.0,
+            symbolic_notation=f"⚠️ ERROR: {lantern_id}"
+        )
+    
+    def consult_lanterns(self, lantern_ids: List[str], prompt: str, context: Dict = None,
+                         max_concurrency: Optional[int] = None,
+                         timeout: Optional[float] = None,
+                         use_cache: bool = True,
+                         on_token: Optional[Callable[[str, str], None]] = None,
+                         phase: str = "consultation",
+                         request_class: str = "interactive",
+                         bloom_level: Optional[BloomLevel] = None,
+                         cancel_token: Optional[CancellationToken] = None,
+                         models: Optional[Dict[str, str]] = None,
+                         memory_scope: Optional[str] = None) -> List[LanternResponse]:
+        """Consult several lanterns concurrently, returning responses in the order requested.
+
+        models, if given, maps lantern IDs to the model each must use.
+        """
+        
+        max_concurrency = max(1, max_concurrency or self.max_concurrent_consultations)
+        timeout = timeout or self.consult_timeout
+        responses: List[Optional[LanternResponse]] = [None] * len(lantern_ids)
+        queued = iter(enumerate(lantern_ids))
+        pending = {}
+        
+        def submit_next():
+            item = next(queued, None)
+            if item is not None:
+                index, lantern_id = item
+                future = self.consultation_executor.submit(
+                    self.consult_lantern, lantern_id, prompt, context, timeout, use_cache, on_token,
+                    phase, request_class, bloom_level, cancel_token, (models or {}).get(lantern_id), memory_scope
+                )
+                pending[future] = (index, lantern_id, time.monotonic() + timeout)
+        
+        for _ in range(max_concurrency):
+            submit_next()
+        
+        # Keep at most max_concurrency calls in flight; a call past its deadline is abandoned
+        while pending:
+            if cancel_token is not None and cancel_token.cancelled:
+                for future in pending:
+                    future.cancel()
+                cancel_token.raise_if_cancelled()
+            next_deadline = min(deadline for _, _, deadline in pending.values())
+            waiting = set(pending) | ({cancel_token.future} if cancel_token is not None else set())
+            done, _ = wait(waiting, timeout=max(0.0, next_deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            
+            for future in list(pending):
+                index, lantern_id, deadline = pending[future]
+                if future in done:
+                    responses[index] = future.result()
+                elif now >= deadline:
+                    future.cancel()
+                    responses[index] = self.error_response(lantern_id, TimeoutError(f"timed out after {timeout}s"))
+                else:
+                    continue
+                del pending[future]
+                submit_next()
+        
+        return responses
+    
+    def phase_stream(self, session: CognitiveSession, phase: str) -> Optional[Callable[[str, str], Optional[bool]]]:
+        """Tag streamed chunks with the session and dialogue phase before forwarding them.
+
+        Returns False for a chunk that reached no listener, so the call may still be retried.
+        """
+        if session.on_token is None:
+            return None
+        
+        def forward(lantern_id: str, text: str) -> Optional[bool]:
+            return session.on_token({
+                "session_id": session.session_id,
+                "lantern": lantern_id,
+                "phase": phase,
+                "token": text
+            })
+        
+        return forward
     
     def generate_symbolic_notation(self, lantern_id: str, content: str) -> str:
         """Generate symbolic notation for lantern responses"""
@@ -272,71 +519,198 @@ class FLUXLanternHive:
     def initiate_lantern_dialogue(self, session_id: str, prompt: str) -> Dict:
         """Initiate internal dialogue between lanterns for complex problems"""
         
-        if session_id not in self.active_sessions:
+        session = self.active_sessions.get(session_id)
+        if session is None:
             raise ValueError(f"Session {session_id} not found")
         
-        session = self.active_sessions[session_id]
+        started = time.monotonic()
+        plan = session.plan
+        if session.bloom_level.value < 4 or "synthesis" not in plan.phases:
+            # Simple consultation without dialogue, also when the budget leaves room for only one round
+            return self.with_plan(session, self.simple_consultation(session_id, prompt), started)
         
-        if session.bloom_level.value < 4:
-            # Simple consultation without dialogue
-            return self.simple_consultation(session_id, prompt)
-        
-        # Complex dialogue for high bloom levels
-        dialogue_log = []
-        lantern_responses = {}
+        # Complex dialogue for high bloom levels, run as a dependency graph: each call
+        # fires as soon as the calls it reads from have finished
+        use_cache = not session.bypass_cache
+        dag = DialogueDAG()
+        agreement_scores: Dict[str, Optional[float]] = {}
         
         # Phase 1: Initial consultation
-        for lantern_id in session.active_lanterns:
-            response = self.consult_lantern(lantern_id, prompt, session.flux_context)
-            lantern_responses[lantern_id] = response
-            dialogue_log.append({
-                "phase": "initial",
-                "lantern": lantern_id,
-                "content": response.content,
-                "symbolic": response.symbolic_notation,
-                "timestamp": response.timestamp
-            })
+        initial_nodes = [
+            dag.add(DialogueNode(f"initial:{lantern_id}", lantern_id, "initial", lambda deps: prompt))
+            for lantern_id in session.active_lanterns
+        ]
         
         # Phase 2: Cross-consultation (lanterns respond to each other)
-        if len(session.active_lanterns) > 2:
-            cross_consultation_prompt = self.generate_cross_consultation_prompt(lantern_responses, prompt)
+        cross_nodes = []
+        cross_lanterns = self.cross_lanterns(session.active_lanterns)
+        if cross_lanterns and "cross_consultation" in plan.phases:
+            # Cross-consultation reads only the synthesizers' own initial analyses
+            cross_inputs = [f"initial:{lantern_id}" for lantern_id in cross_lanterns]
+            
+            def cross_prompt(deps: Dict[str, LanternResponse]) -> str:
+                responses = {node_id.split(":", 1)[1]: response for node_id, response in deps.items()}
+                return self.generate_cross_consultation_prompt(responses, prompt)
             
-            for lantern_id in session.active_lanterns[:3]:  # Limit to prevent infinite loops
-                if lantern_id in ["eidolon", "planner"]:  # Synthesizers get priority
-                    response = self.consult_lantern(lantern_id, cross_consultation_prompt, session.flux_context)
-                    dialogue_log.append({
-                        "phase": "cross_consultation",
-                        "lantern": lantern_id,
-                        "content": response.content,
-                        "symbolic": response.symbolic_notation,
-                        "timestamp": response.timestamp
-                    })
+            def inputs_agree(deps: Dict[str, LanternResponse]) -> bool:
+                # Failed inputs say nothing about agreement, so never skip on them
+                if "cross_consultation" not in agreement_scores:
+                    responses = list(deps.values())
+                    agreement_scores["cross_consultation"] = (
+                        agreement([response.content for response in responses])
+                        if all(response.confidence > 0 for response in responses) else None
+                    )
+                score = agreement_scores["cross_consultation"]
+                return score is not None and score >= self.agreement_threshold
+            
+            cross_nodes = [
+                dag.add(DialogueNode(f"cross_consultation:{lantern_id}", lantern_id, "cross_consultation",
+                                     cross_prompt, cross_inputs, skip_if=inputs_agree))
+                for lantern_id in cross_lanterns
+            ]
         
         # Phase 3: Final synthesis
-        synthesis_prompt = self.generate_synthesis_prompt(dialogue_log, prompt, session.flux_context)
-        final_response = self.consult_lantern("eidolon", synthesis_prompt, session.flux_context)
-        
-        dialogue_log.append({
-            "phase": "synthesis",
-            "lantern": "eidolon",
-            "content": final_response.content,
-            "symbolic": final_response.symbolic_notation,
-            "timestamp": final_response.timestamp
-        })
+        dialogue_nodes = initial_nodes + cross_nodes
+        
+        def synthesis_prompt(deps: Dict[str, LanternResponse]) -> str:
+            dialogue_log = [
+                self.dialogue_entry(node.phase, node.lantern_id, deps[node.node_id])
+                for node in dialogue_nodes if node.node_id in deps
+            ]
+            return self.generate_synthesis_prompt(dialogue_log, prompt, session.flux_context)
+        
+        synthesis_node = dag.add(DialogueNode(
+            "synthesis:eidolon", "eidolon", "synthesis", synthesis_prompt, [node.node_id for node in dialogue_nodes]
+        ))
+        
+        def call(node: DialogueNode, node_prompt: str) -> LanternResponse:
+            return self.consult_lantern(
+                node.lantern_id, node_prompt, session.flux_context, self.consult_timeout, use_cache,
+                self.phase_stream(session, node.phase), node.phase, session.priority, session.bloom_level,
+                session.cancel_token, plan.model_for(node.lantern_id, node.phase), session.memory_scope
+            )
+        
+        dag.run(
+            call, self.consultation_executor,
+            max(1, session.max_concurrency or self.max_concurrent_consultations),
+            self.consult_timeout,
+            lambda node: self.error_response(node.lantern_id, TimeoutError(f"timed out after {self.consult_timeout}s")),
+            session.cancel_token
+        )
+        if session.cancel_token is not None:
+            session.cancel_token.raise_if_cancelled()
+        
+        dialogue_log = [
+            self.dialogue_entry(node.phase, node.lantern_id, node.result)
+            for node in dialogue_nodes + [synthesis_node] if not node.skipped
+        ]
+        final_response = synthesis_node.result
+        self.record_route_quality(
+            [node.result for node in dialogue_nodes if not node.skipped], [final_response]
+        )
+        
+        phases = [{"phase": "initial", "status": "completed"}]
+        if cross_nodes:
+            phase = {
+                "phase": "cross_consultation",
+                "status": "skipped" if all(node.skipped for node in cross_nodes) else "completed"
+            }
+            if agreement_scores.get("cross_consultation") is not None:
+                phase["agreement"] = round(agreement_scores["cross_consultation"], 3)
+            phases.append(phase)
+        elif cross_lanterns:
+            phases.append({"phase": "cross_consultation", "status": "skipped", "reason": "budget"})
+        phases.append({"phase": "synthesis", "status": "completed"})
         
         # Update session history
-        session.dialogue_history.append({
+        self.active_sessions.record_dialogue(session, {
             "prompt": prompt,
             "dialogue_log": dialogue_log,
             "timestamp": time.time()
         })
         
-        return {
+        return self.with_plan(session, {
             "session_id": session_id,
             "dialogue_log": dialogue_log,
             "final_response": final_response.content,
             "symbolic_summary": self.generate_dialogue_symbolic_summary(dialogue_log),
-            "bloom_level": session.bloom_level.value
+            "bloom_level": session.bloom_level.value,
+            "phases": phases,
+            "critical_path": dag.critical_path_report()
+        }, started)
+    
+    def cross_lanterns(self, lantern_ids: List[str]) -> List[str]:
+        """Lanterns that respond to each other in cross-consultation, for dialogues of three or more"""
+        if len(lantern_ids) <= 2:
+            return []
+        # Limit to prevent infinite loops; synthesizers get priority
+        return [lantern_id for lantern_id in lantern_ids[:3] if lantern_id in ["eidolon", "planner"]]
+    
+    def dialogue_calls(self, lantern_ids: List[str], phases: List[str]) -> List[Tuple[str, str]]:
+        """(phase, lantern) of every call a dialogue with these lanterns and phases makes"""
+        calls = [(phase, lantern_id) for phase in ("consultation", "initial") if phase in phases
+                 for lantern_id in lantern_ids]
+        if "cross_consultation" in phases:
+            calls.extend(("cross_consultation", lantern_id) for lantern_id in self.cross_lanterns(lantern_ids))
+        if "synthesis" in phases:
+            calls.append(("synthesis", "eidolon"))
+        return calls
+    
+    def plan_dialogue(self, prompt: str, bloom_level: BloomLevel, lantern_ids: List[str],
+                      flux_context: Dict = None, budget: Optional[RequestBudget] = None,
+                      max_concurrency: Optional[int] = None) -> DialoguePlan:
+        """Choose how many of lantern_ids to consult, in which phases and on which models, within budget"""
+        if bloom_level.value < 4:
+            phases = ["consultation"]
+        elif self.cross_lanterns(lantern_ids):
+            phases = ["initial", "cross_consultation", "synthesis"]
+        else:
+            phases = ["initial", "synthesis"]
+        
+        base_tokens = estimate_tokens(prompt)
+        if flux_context and flux_context.get('flux_code'):
+            base_tokens += estimate_tokens(flux_context['flux_code'])
+        quoted_tokens = {"cross_consultation": self.cross_context_tokens, "synthesis": self.synthesis_context_tokens}
+        
+        def prompt_tokens(lantern_id: str, phase: str) -> int:
+            tokens = base_tokens + estimate_tokens(self.all_lanterns[lantern_id]["system_prompt"])
+            if lantern_id == "archiva" and phase in ("initial", "consultation"):
+                tokens += self.memory_context_tokens
+            return tokens + quoted_tokens.get(phase, 0)
+        
+        return self.planner.plan(
+            lantern_ids, phases, self.dialogue_calls,
+            lambda lantern_id, phase: self.model_router.route(bloom_level.value, lantern_id, phase),
+            prompt_tokens, self.expected_completion_tokens,
+            max(1, max_concurrency or self.max_concurrent_consultations),
+            self.model_router.models(), budget
+        )
+    
+    def with_plan(self, session: CognitiveSession, result: Dict, started: float) -> Dict:
+        """Report the plan a dialogue ran, with the seconds it actually took"""
+        result["plan"] = {**session.plan.to_dict(), "seconds": round(time.monotonic() - started, 3)}
+        return result
+    
+    def record_route_quality(self, responses: List[LanternResponse],
+                             references: Optional[List[LanternResponse]] = None):
+        """Score each fresh response by how closely it tracks the references, or else its peers"""
+        for response in responses:
+            if response.route is None or response.confidence <= 0:
+                continue
+            others = references if references is not None else [peer for peer in responses if peer is not response]
+            others = [other.content for other in others if other.confidence > 0]
+            if others:
+                self.model_router.record_quality(response.route, response.model, consensus(response.content, others))
+    
+    def dialogue_entry(self, phase: str, lantern_id: str, response: LanternResponse) -> Dict:
+        """Dialogue log entry for one lantern response"""
+        return {
+            "phase": phase,
+            "lantern": lantern_id,
+            "content": response.content,
+            "symbolic": response.symbolic_notation,
+            "model": response.model,
+            "timestamp": response.timestamp
         }
     
     def simple_consultation(self, session_id: str, prompt: str) -> Dict:
@@ -345,12 +719,31 @@ class FLUXLanternHive:
         session = self.active_sessions[session_id]
         responses = []
         
-        for lantern_id in session.active_lanterns:
-            response = self.consult_lantern(lantern_id, prompt, session.flux_context)
+        consulted = self.consult_lanterns(
+            session.active_lanterns, prompt, session.flux_context, session.max_concurrency,
+            use_cache=not session.bypass_cache, on_token=self.phase_stream(session, "consultation"),
+            phase="consultation", request_class=session.priority, bloom_level=session.bloom_level,
+            cancel_token=session.cancel_token,
+            models={
+                lantern_id: session.plan.model_for(lantern_id, "consultation") for lantern_id in session.active_lanterns
+            },
+            memory_scope=session.memory_scope
+        )
+        self.record_route_quality(consulted)
+        self.active_sessions.record_dialogue(session, {
+            "prompt": prompt,
+            "dialogue_log": [
+                self.dialogue_entry("consultation", lantern_id, response)
+                for lantern_id, response in zip(session.active_lanterns, consulted)
+            ],
+            "timestamp": time.time()
+        })
+        for lantern_id, response in zip(session.active_lanterns, consulted):
             responses.append({
                 "lantern": lantern_id,
                 "content": response.content,
                 "symbolic": response.symbolic_notation,
+                "model": response.model,
                 "timestamp": response.timestamp
             })
         
@@ -364,16 +757,18 @@ class FLUXLanternHive:
             "session_id": session_id,
             "responses": responses,
             "synthesis": synthesis_content,
-            "bloom_level": session.bloom_level.value
+            "bloom_level": session.bloom_level.value,
+            "phases": [{"phase": "consultation", "status": "completed"}]
         }
     
     def generate_cross_consultation_prompt(self, lantern_responses: Dict, original_prompt: str) -> str:
         """Generate prompt for cross-consultation between lanterns"""
         
-        responses_summary = "\n".join([
-            f"{lantern_id}: {response.content[:200]}..."
-            for lantern_id, response in lantern_responses.items()
-        ])
+        digest = build_digest(
+            [(lantern_id, response.content) for lantern_id, response in lantern_responses.items()],
+            self.cross_context_tokens
+        )
+        responses_summary = "\n".join([f"{lantern_id}: {content}" for lantern_id, content in digest])
         
         return f"""
 Based on the following initial analyses from other lanterns regarding: "{original_prompt}"
@@ -386,10 +781,11 @@ Provide your perspective, considering the insights from other lanterns. Focus on
     def generate_synthesis_prompt(self, dialogue_log: List[Dict], original_prompt: str, flux_context: Dict = None) -> str:
         """Generate prompt for final synthesis"""
         
-        dialogue_summary = "\n".join([
-            f"[{entry['phase']}] {entry['lantern']}: {entry['content'][:150]}..."
-            for entry in dialogue_log
-        ])
+        digest = build_digest(
+            [(f"[{entry['phase']}] {entry['lantern']}", entry['content']) for entry in dialogue_log],
+            self.synthesis_context_tokens
+        )
+        dialogue_summary = "\n".join([f"{label}: {content}" for label, content in digest])
         
         # Check if FLUX code generation is requested
         flux_code_instruction = ""
@@ -466,50 +862,172 @@ Your output must be the polished, final answer.
         
         return f"⟦{phase_notation}⟨{lantern_notation}⟩⟧"
     
-    def create_session(self, prompt: str, flux_context: Dict = None) -> str:
-        """Create a new cognitive session"""
+    def create_session(self, prompt: str, flux_context: Dict = None, max_concurrency: Optional[int] = None,
+                       bypass_cache: bool = False, on_token: Optional[Callable[[Dict], None]] = None,
+                       priority: str = "interactive", cancel_token: Optional[CancellationToken] = None,
+                       classification: Optional[Tuple[BloomLevel, List[str]]] = None,
+                       budget: Optional[RequestBudget] = None, memory_scope: Optional[str] = None) -> str:
+        """Create a new cognitive session, planned to fit budget; classification, if given, comes from classify_prompts"""
         
         session_id = self.generate_session_id()
-        bloom_level = self.classify_bloom_level(prompt)
-        active_lanterns = self.select_lanterns(prompt, bloom_level, flux_context)
+        if classification is not None:
+            bloom_level, selected = classification
+        else:
+            bloom_level = self.classify_bloom_level(prompt)
+            selected = self.select_lanterns(prompt, bloom_level, flux_context)
+        plan = self.plan_dialogue(prompt, bloom_level, selected, flux_context, budget, max_concurrency)
         
         session = CognitiveSession(
             session_id=session_id,
             bloom_level=bloom_level,
-            active_lanterns=active_lanterns,
+            active_lanterns=plan.lanterns,
             dialogue_history=[],
-            flux_context=flux_context
+            flux_context=flux_context,
+            max_concurrency=max_concurrency,
+            bypass_cache=bypass_cache,
+            on_token=on_token,
+            priority=priority,
+            cancel_token=cancel_token,
+            plan=plan,
+            memory_scope=memory_scope
         )
         
         self.active_sessions[session_id] = session
         
         return session_id
     
-    def process_prompt(self, prompt: str, flux_context: Dict = None) -> Dict:
-        """Main entry point for processing prompts with LanternHive"""
+    def process_prompt(self, prompt: str, flux_context: Dict = None, max_concurrency: Optional[int] = None,
+                       bypass_cache: bool = False, on_token: Optional[Callable[[Dict], None]] = None,
+                       priority: str = "interactive", cancel_token: Optional[CancellationToken] = None,
+                       classification: Optional[Tuple[BloomLevel, List[str]]] = None,
+                       budget: Optional[RequestBudget] = None, memory_scope: Optional[str] = None) -> Dict:
+        """Main entry point for processing prompts with LanternHive.
+
+        on_token, if given, receives streamed chunks as dicts tagged with session_id,
+        lantern and phase while the dialogue runs. A prompt identical to one already
+        in flight (same normalized text, flux_context, priority, bypass_cache and budget)
+        joins that dialogue instead of starting its own, and shares its stream and result. A prompt close enough
+        to an earlier one with the same flux_context is answered from the semantic cache.
+        Cancelling cancel_token stops the dialogue's pending calls and raises QueryCancelled;
+        a shared dialogue stops only once every caller sharing it has cancelled.
+        budget, if given, limits the dialogue's latency and tokens; the lanterns, phases
+        and models are planned to fit it, and the result's plan reports the choice and
+        how long the dialogue took. Without one the full dialogue runs.
+        memory_scope, typically the calling client, is whose past dialogues Archiva
+        may recall and where this one is remembered; without it memory is not used.
+        """
         
-        session_id = self.create_session(prompt, flux_context)
-        result = self.initiate_lantern_dialogue(session_id, prompt)
+        scope = None
+        if self.semantic_cache.enabled and not bypass_cache:
+            # Only a dialogue at the same Bloom level, with the same lanterns and memories, answers the same question
+            classification = classification or self.classify_prompts([prompt], [flux_context])[0]
+            scope = [classification[0].name, classification[1], memory_scope]
+            cached = self.semantic_cache.lookup(prompt, flux_context, scope)
+            if cached is not None:
+                return cached
+        
+        def run_dialogue(publish: Callable[[Dict], None], cancellation: CancellationToken) -> Dict:
+            session_id = self.create_session(
+                prompt, flux_context, max_concurrency, bypass_cache, publish, priority, cancellation, classification,
+                budget, memory_scope
+            )
+            result = self.initiate_lantern_dialogue(session_id, prompt)
+            if not self.has_errors(result):
+                # A dialogue cut down to its budget is no answer for requests that can afford more
+                if not result["plan"]["degradations"]:
+                    self.semantic_cache.store(prompt, flux_context, result, scope)
+                if memory_scope is not None:
+                    self.memory.remember(prompt, result.get("final_response") or result.get("synthesis", ""), memory_scope)
+            return result
         
-        # Clean up session after processing (optional)
-        # del self.active_sessions[session_id]
+        # Only requests with the same priority class, cache choice, memory scope and budget share a
+        # dialogue: a follower must neither wait at a lower priority, get cached answers it bypassed,
+        # nor see another client's memories
+        key = f"{SingleFlight.make_key(prompt, flux_context)}:{priority}:{'bypass' if bypass_cache else 'cached'}"
+        if memory_scope is not None:
+            key += f":{memory_scope}"
+        if budget is not None:
+            key += ":" + json.dumps(budget.to_dict(), sort_keys=True)
+        result, shared = self.inflight.run(key, run_dialogue, on_token, cancel_token)
+        if shared:
+            result["coalesced"] = True
         
         return result
     
+    def process_batch(self, items: List[Dict], bypass_cache: bool = False,
+                      cancel_token: Optional[CancellationToken] = None,
+                      memory_scope: Optional[str] = None) -> Iterator[Dict]:
+        """Run many prompts at batch priority, yielding one line per prompt as each finishes.
+
+        items are dicts with a prompt and an optional flux_context and budget. Prompts are
+        classified up front; identical prompts run once and are reported for each
+        occurrence, and identical lantern calls across the batch share one provider
+        call. Lines carry the prompt's index; the last line summarizes the batch.
+        memory_scope is as for process_prompt.
+        """
+        started = time.monotonic()
+        call_stats = self.call_inflight.get_statistics()
+        prompts = [item["prompt"] for item in items]
+        contexts = [item.get("flux_context") or {} for item in items]
+        budgets = [RequestBudget.from_dict(item.get("budget")) for item in items]
+        classifications = self.classify_prompts(prompts, contexts)
+        
+        occurrences: Dict[str, List[int]] = {}
+        for index, (prompt, flux_context, budget) in enumerate(zip(prompts, contexts, budgets)):
+            key = SingleFlight.make_key(prompt, flux_context) + (json.dumps(budget.to_dict()) if budget else "")
+            occurrences.setdefault(key, []).append(index)
+        
+        futures = {
+            self.batch_executor.submit(
+                self.process_prompt, prompts[indexes[0]], contexts[indexes[0]], None, bypass_cache,
+                priority="batch", cancel_token=cancel_token, classification=classifications[indexes[0]],
+                budget=budgets[indexes[0]], memory_scope=memory_scope
+            ): indexes
+            for indexes in occurrences.values()
+        }
+        failed = 0
+        try:
+            for future in as_completed(futures):
+                try:
+                    line = {"result": future.result()}
+                except Exception as e:
+                    line = {"error": str(e)}
+                for index in futures[future]:
+                    failed += "error" in line
+                    yield {"index": index, "prompt": prompts[index], **line}
+        finally:
+            for future in futures:
+                future.cancel()
+        
+        yield {
+            "summary": {
+                "prompts": len(items),
+                "distinct_prompts": len(occurrences),
+                "failed": failed,
+                "shared_lantern_calls": self.call_inflight.get_statistics()["followers"] - call_stats["followers"],
+                "seconds": round(time.monotonic() - started, 3)
+            }
+        }
+    
+    def has_errors(self, result: Dict) -> bool:
+        """Whether any lantern in a dialogue or consultation result failed"""
+        entries = result.get("dialogue_log") or result.get("responses") or []
+        return any(entry["symbolic"].startswith("⚠️ ERROR") for entry in entries)
+    
     def get_session_info(self, session_id: str) -> Dict:
         """Get information about an active session"""
 
-        if session_id not in self.active_sessions:
+        session = self.active_sessions.get(session_id)
+        if session is None:
             return {"error": "Session not found"}
 
-        session = self.active_sessions[session_id]
-
         return {
             "session_id": session_id,
             "bloom_level": session.bloom_level.value,
             "active_lanterns": session.active_lanterns,
             "dialogue_count": len(session.dialogue_history),
-            "flux_context": session.flux_context is not None
+            "flux_context": session.flux_context is not None,
+            "plan": session.plan.to_dict() if session.plan else None
         }
 
     def execute_flux_code(self, flux_code: str) -> Dict:
@@ -531,7 +1049,8 @@ Your output must be the polished, final answer.
 # Example usage and testing
 if __name__ == "__main__":
     # Initialize the enhanced LanternHive
-    # Note: You'll need to set OPENAI_API_KEY environment variable
+    # Note: You'll need to set OPENAI_API_KEY environment variable,
+    # or LANTERN_LLM_PROVIDER=stub to run offline
     hive = FLUXLanternHive()
     
     # Test with a FLUX-specific prompt
@@ -1,16 +1,27 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_socketio import SocketIO, emit, join_room, leave_room
+from werkzeug.middleware.proxy_fix import ProxyFix
 import json
 import hashlib
 import time
 import re
 import logging
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass, asdict
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Any, Optional, Tuple
+from dataclasses import dataclass, asdict, field
 from enhanced_lanternhive import FLUXLanternHive, BloomLevel
 from ptpf_flux_generator import PTPFFluxGenerator, PTPFMode
 from recursive_strategy_engine import RecursiveStrategyEngine
 from lantern_framework import LanternFramework
+from flux_memory_modules import MemoryModuleRegistry
+from flux_distributed import DistributedWorkerPool, DistributedModule
+from flux_quotas import QuotaManager, QuotaExceededError, AdmissionController, AdmissionRejectedError
+from keyword_router import KeywordRouter
+from lantern_jobs import JobManager, JobQueueFullError
+from lantern_cancellation import CancellationToken, QueryCancelled
+from lantern_planner import RequestBudget
 import os
 from dotenv import load_dotenv
 
@@ -33,6 +44,11 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'flux-lantern-secret-key')
 app.config['JSON_AS_ASCII'] = False
 app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
 
+# Behind a load balancer (e.g. Cloud Run), take the client address from this many X-Forwarded-For hops
+trusted_proxies = int(os.getenv('FLUX_TRUSTED_PROXIES', 0))
+if trusted_proxies:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted_proxies)
+
 # Configure CORS properly for security
 allowed_origins = [
     'http://localhost:3000',
@@ -56,8 +72,28 @@ strategy_engine = None
 lantern_framework = None
 active_connections = {}
 floating_memory = {}
+memory_refcounts = {}
+memory_lock = threading.RLock()
+quota_manager = QuotaManager()
+admission_controller = AdmissionController.from_env()
+resource_owners = {}
+distributed_pool = None  # created by the first distributed_module declaration
+distributed_pool_lock = threading.Lock()
+distributed_modules = {}
+concurrent_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('FLUX_CONCURRENT_WORKERS', 8)),
+    thread_name_prefix='flux-concurrent'
+)
 fingerprint_registry = {}
 siig_transfers = {}
+lantern_queries = {}  # Socket.IO sid -> {query_id: CancellationToken} for queries still running
+lantern_queries_lock = threading.Lock()
+memory_modules = MemoryModuleRegistry()
+
+# Scheduler classes come from the entry point, never from the caller: only live Socket.IO
+# queries are interactive, while REST requests, jobs and batches wait behind them
+SOCKET_PRIORITY = 'interactive'
+REST_PRIORITY = 'batch'
 
 @dataclass
 class FLUXConnection:
@@ -67,6 +103,8 @@ class FLUXConnection:
     created_at: float
     floating_data: Dict[str, Any]
     fingerprints: List[str]
+    memory_modules: List[str] = field(default_factory=list)
+    parent_id: Optional[str] = None
     
 @dataclass
 class FloatingMemory:
@@ -86,14 +124,41 @@ class CryptographicFingerprint:
     created_at: float
     verified: bool
 
+_id_counter = itertools.count()
+
 def generate_id(prefix: str = "") -> str:
     """Generate a unique ID"""
-    timestamp = str(time.time())
+    timestamp = f"{time.time()}:{next(_id_counter)}"
     return f"{prefix}{hashlib.md5(timestamp.encode()).hexdigest()[:8]}"
 
-def create_flux_connection(name: str) -> str:
+def request_principals(data: Optional[Dict] = None) -> Tuple[str, ...]:
+    """Quota principals for the current REST or Socket.IO request.
+
+    The client principal is the peer address, never a caller-chosen header or the
+    Socket.IO sid: a client cannot reset its usage by changing a header or
+    reconnecting, and a socket's usage stays charged to the same principal until
+    its resources are closed.
+    """
+    principals = [f"client:{request.remote_addr}"]
+
+    api_key = request.headers.get('X-API-Key') or (data or {}).get('api_key')
+    if api_key:
+        principals.append(f"key:{api_key}")
+
+    return tuple(principals)
+
+def memory_scope_for(principals: Tuple[str, ...]) -> str:
+    """Whose dialogue memory a request uses: its API key's if it sent one, else its address's.
+
+    Hashed, since scopes are stored with the memories, on disk when LANTERN_MEMORY_DIR is set.
+    """
+    return hashlib.sha256(principals[-1].encode()).hexdigest()[:32]
+
+def create_flux_connection(name: str, principals: Tuple[str, ...] = ()) -> str:
     """Create a new FLUX connection"""
+    quota_manager.acquire(principals, 'connections')
     connection_id = generate_id("conn_")
+    resource_owners[connection_id] = principals
 
     connection = FLUXConnection(
         id=connection_id,
@@ -109,15 +174,165 @@ def create_flux_connection(name: str) -> str:
 
     return connection_id
 
+def fork_flux_connection(connection_id: str, name: Optional[str] = None,
+                         principals: Optional[Tuple[str, ...]] = None) -> str:
+    """Fork a connection, sharing its floating memory blocks copy-on-write"""
+    parent = active_connections.get(connection_id)
+    if parent is None:
+        raise ValueError(f"Connection {connection_id} not found")
+
+    if principals is None:
+        principals = resource_owners.get(connection_id, ())
+    quota_manager.acquire(principals, 'connections')
+    fork_id = generate_id("conn_")
+    resource_owners[fork_id] = principals
+
+    # Blocks are shared by reference; write_floating_memory copies on mutation
+    with memory_lock:
+        for memory_id in parent.floating_data:
+            memory_refcounts[memory_id] = memory_refcounts.get(memory_id, 1) + 1
+
+    for fingerprint in parent.memory_modules:
+        memory_modules.attach(fingerprint, fork_id)
+
+    active_connections[fork_id] = FLUXConnection(
+        id=fork_id,
+        name=name or parent.name,
+        status='active',
+        created_at=time.time(),
+        floating_data=dict(parent.floating_data),
+        fingerprints=list(parent.fingerprints),
+        memory_modules=list(parent.memory_modules),
+        parent_id=connection_id
+    )
+    logger.info(f"Forked FLUX connection: {parent.name} (ID: {connection_id} -> {fork_id})")
+
+    return fork_id
+
+def write_floating_memory(connection_id: str, memory_id: str, content: Any) -> str:
+    """Write to a connection's floating memory block, copying it first if it is shared"""
+    connection = active_connections.get(connection_id)
+    if connection is None or memory_id not in connection.floating_data:
+        raise ValueError(f"Memory block {memory_id} not found on connection {connection_id}")
+
+    new_size = len(str(content))
+    owners = resource_owners.get(connection_id, ())
+
+    with memory_lock:
+        memory = connection.floating_data[memory_id]
+
+        if memory_refcounts.get(memory_id, 1) > 1:
+            quota_manager.acquire(owners, 'memory_bytes', new_size)
+            memory_refcounts[memory_id] -= 1
+            del connection.floating_data[memory_id]
+
+            memory_id = generate_id("mem_")
+            memory = FloatingMemory(
+                id=memory_id,
+                connection_id=connection_id,
+                data_type=memory.data_type,
+                content=memory.content,
+                size=memory.size,
+                created_at=time.time()
+            )
+            floating_memory[memory_id] = memory
+            memory_refcounts[memory_id] = 1
+            resource_owners[memory_id] = owners
+            connection.floating_data[memory_id] = memory
+        else:
+            block_owners = resource_owners.get(memory_id, ())
+            if new_size > memory.size:
+                quota_manager.acquire(block_owners, 'memory_bytes', new_size - memory.size)
+            else:
+                quota_manager.release(block_owners, 'memory_bytes', memory.size - new_size)
+
+        memory.content = content
+        memory.size = new_size
+
+    return memory_id
+
+def connection_state_fingerprint(connection_id: str) -> str:
+    """Fingerprint a connection's floating state by content, independent of block ids"""
+    connection = active_connections[connection_id]
+    with memory_lock:
+        state = sorted(
+            json.dumps([memory.data_type, memory.content], sort_keys=True, default=str)
+            for memory in connection.floating_data.values()
+        )
+    return hashlib.sha256(json.dumps(state).encode()).hexdigest()
+
+def share_floating_state(source_id: str, target_id: str):
+    """Replace the target's floating state with copy-on-write references to the source's"""
+    source = active_connections[source_id]
+    target = active_connections[target_id]
+
+    with memory_lock:
+        for memory_id in target.floating_data:
+            release_floating_memory(memory_id)
+        for memory_id in source.floating_data:
+            memory_refcounts[memory_id] = memory_refcounts.get(memory_id, 1) + 1
+        target.floating_data = dict(source.floating_data)
+
+def release_floating_memory(memory_id: str):
+    """Drop one reference to a floating memory block, freeing it when unreferenced"""
+    with memory_lock:
+        remaining = memory_refcounts.get(memory_id, 1) - 1
+        if remaining > 0:
+            memory_refcounts[memory_id] = remaining
+            return
+
+        memory_refcounts.pop(memory_id, None)
+        memory = floating_memory.pop(memory_id, None)
+        owners = resource_owners.pop(memory_id, ())
+        if memory is not None:
+            quota_manager.release(owners, 'memory_bytes', memory.size)
+
+def release_orphaned_memory() -> List[str]:
+    """Free blocks no open connection holds; shared blocks go only when their last holder closes"""
+    with memory_lock:
+        held = {memory_id for connection in active_connections.values() for memory_id in connection.floating_data}
+        orphaned = [
+            memory_id for memory_id in floating_memory
+            if memory_id not in held and memory_refcounts.get(memory_id, 1) <= 1
+        ]
+        for memory_id in orphaned:
+            release_floating_memory(memory_id)
+    return orphaned
+
+def release_fingerprint(fingerprint_id: str):
+    """Remove a fingerprint and return it to its owners' quota"""
+    if fingerprint_registry.pop(fingerprint_id, None) is not None:
+        quota_manager.release(resource_owners.pop(fingerprint_id, ()), 'fingerprints')
+
+def close_flux_connection(connection_id: str) -> bool:
+    """Close a FLUX connection and release the memory it holds"""
+    connection = active_connections.pop(connection_id, None)
+    memory_modules.release_connection(connection_id)
+    for module in list(distributed_modules.values()):
+        module.forget_client(connection_id)
+
+    if connection is None:
+        return False
+
+    for memory_id in connection.floating_data:
+        release_floating_memory(memory_id)
+    quota_manager.release(resource_owners.pop(connection_id, ()), 'connections')
+
+    logger.info(f"Closed FLUX connection: {connection.name} (ID: {connection_id})")
+    return True
+
 class FLUXInterpreter:
     """Basic FLUX language interpreter for parsing and executing FLUX code"""
     
     def __init__(self):
         self.connection_patterns = {
-            'connection_declaration': r'connection\s+(\w+)\s*{([^}]*)}',
+            'connection_declaration': r'connection\s+(\w+)\s*{',
             'floating_declaration': r'floating<(\w+)>\s+(\w+)\s*=\s*(.+)',
             'persistent_declaration': r'persistent<(\w+)>\s+(\w+)',
-            'memory_module': r'memory_module<(\w+)>\s+(\w+)\s*{([^}]*)}',
+            'use_module': r'\buse\s+(\w+)',
+            'memory_module': r'memory_module<(\w+)>\s+(\w+)\s*{',
+            'distributed_module': r'distributed_module<(\w+)>\s+(\w+)\s*{',
+            'distributed_nodes': r'nodes\s*:\s*\[([^\]]*)\]',
             'natural_interface': r'natural_interface\s+(\w+)\s*{([^}]*)}',
             'siig_transfer': r'siig_transfer\s+(\w+)\s*{([^}]*)}',
             'on_connect': r'on_connect\s*{([^}]*)}',
@@ -126,16 +341,38 @@ class FLUXInterpreter:
             'natural_command': r'natural\("([^"]+)"\)',
             'fingerprint_operation': r'(\w+)\.fingerprint\(\)',
             'restore_fingerprint': r'restore_fingerprint\("([^"]+)"\)',
-            'store_fingerprint': r'store_fingerprint\(([^,]+),\s*([^)]+)\)'
+            'store_fingerprint': r'store_fingerprint\(([^,]+),\s*([^)]+)\)',
+            'load_module': r'load_module\((\w+)\)',
+            'store_distributed': r'store_distributed\((\w+),\s*"([^"]+)",\s*([^)]+)\)',
+            'recall_distributed': r'recall_distributed\((\w+),\s*"([^"]+)"\)',
+            'concurrent_connections': r'concurrent_connections\s*{',
+            'concurrent_member': r'\bconnection\s+(\w+)',
+            'block_setting': r'(\w+)\s*:\s*([\w.]+)'
         }
     
+    def find_blocks(self, pattern_name: str, code: str):
+        """Yield (header match, body) pairs for brace-delimited blocks, honouring nesting"""
+        for match in re.finditer(self.connection_patterns[pattern_name], code):
+            depth = 1
+            position = match.end()
+            while position < len(code) and depth:
+                if code[position] == '{':
+                    depth += 1
+                elif code[position] == '}':
+                    depth -= 1
+                position += 1
+            body_end = position - 1 if depth == 0 else position
+            yield match, code[match.end():body_end]
+    
     def parse_flux_code(self, code: str) -> Dict[str, Any]:
         """Parse FLUX code and return structured representation"""
         parsed = {
             'connections': [],
             'memory_modules': [],
+            'distributed_modules': [],
             'natural_interfaces': [],
             'siig_transfers': [],
+            'concurrent_connections': [],
             'errors': []
         }
         
@@ -146,15 +383,14 @@ class FLUXInterpreter:
                 return parsed
             
             # Parse connections
-            connection_matches = re.finditer(self.connection_patterns['connection_declaration'], code, re.DOTALL)
-            for match in connection_matches:
+            for match, connection_body in self.find_blocks('connection_declaration', code):
                 connection_name = match.group(1)
-                connection_body = match.group(2)
                 
                 connection_info = {
                     'name': connection_name,
                     'floating_vars': [],
                     'persistent_vars': [],
+                    'memory_modules': [],
                     'on_connect_actions': [],
                     'on_disconnect_actions': []
                 }
@@ -176,6 +412,11 @@ class FLUXInterpreter:
                         'name': persist_match.group(2)
                     })
                 
+                # Parse memory modules used by the connection
+                use_matches = re.finditer(self.connection_patterns['use_module'], connection_body)
+                for use_match in use_matches:
+                    connection_info['memory_modules'].append(use_match.group(1))
+                
                 # Parse on_connect actions
                 connect_matches = re.finditer(self.connection_patterns['on_connect'], connection_body, re.DOTALL)
                 for connect_match in connect_matches:
@@ -191,12 +432,34 @@ class FLUXInterpreter:
                 parsed['connections'].append(connection_info)
             
             # Parse memory modules
-            memory_matches = re.finditer(self.connection_patterns['memory_module'], code, re.DOTALL)
-            for match in memory_matches:
+            for match, module_body in self.find_blocks('memory_module', code):
                 parsed['memory_modules'].append({
                     'type': match.group(1),
                     'name': match.group(2),
-                    'body': match.group(3)
+                    'body': module_body
+                })
+            
+            # Parse distributed modules
+            for match, module_body in self.find_blocks('distributed_module', code):
+                settings = dict(re.findall(self.connection_patterns['block_setting'], module_body))
+                nodes_match = re.search(self.connection_patterns['distributed_nodes'], module_body)
+                nodes = re.findall(r'"([^"]+)"', nodes_match.group(1)) if nodes_match else []
+                parsed['distributed_modules'].append({
+                    'type': match.group(1),
+                    'name': match.group(2),
+                    'nodes': nodes or ['node1'],
+                    'replication_factor': int(settings.get('replication_factor', 1)),
+                    'consistency_model': settings.get('consistency_model', 'eventual')
+                })
+            
+            # Parse concurrent connection groups
+            for match, group_body in self.find_blocks('concurrent_connections', code):
+                settings = dict(re.findall(self.connection_patterns['block_setting'], group_body))
+                parsed['concurrent_connections'].append({
+                    'connections': re.findall(self.connection_patterns['concurrent_member'], group_body),
+                    'synchronize_on': settings.get('synchronize_on', 'fingerprint_match'),
+                    'failover_mode': settings.get('failover_mode', 'automatic'),
+                    'timeout': float(settings.get('timeout', 30))
                 })
             
             # Parse natural interfaces
@@ -266,22 +529,89 @@ class FLUXInterpreter:
                 'fingerprint': match.group(2).strip()
             })
         
+        # Distributed module operations
+        store_matches = re.finditer(self.connection_patterns['store_distributed'], action_block)
+        for match in store_matches:
+            actions.append({
+                'type': 'store_distributed',
+                'module': match.group(1),
+                'key': match.group(2),
+                'value': match.group(3).strip().strip('"')
+            })
+        
+        recall_matches = re.finditer(self.connection_patterns['recall_distributed'], action_block)
+        for match in recall_matches:
+            actions.append({
+                'type': 'recall_distributed',
+                'module': match.group(1),
+                'key': match.group(2)
+            })
+        
+        # Memory module access
+        load_matches = re.finditer(self.connection_patterns['load_module'], action_block)
+        for match in load_matches:
+            actions.append({
+                'type': 'load_module',
+                'module': match.group(1)
+            })
+        
         return actions
     
-    def execute_flux_program(self, parsed_code: Dict[str, Any]) -> Dict[str, Any]:
+    def execute_flux_program(self, parsed_code: Dict[str, Any], principals: Tuple[str, ...] = ()) -> Dict[str, Any]:
         """Execute parsed FLUX code"""
         
         execution_log = []
         created_connections = []
+        concurrent_reports = []
+        
+        # on_connect blocks of concurrent connections are run by the group, not inline
+        concurrent_names = {
+            name
+            for group in parsed_code.get('concurrent_connections', [])
+            for name in group['connections']
+        }
+        connection_ids = {}
+        connection_actions = {}
+        module_fingerprints = {}
+        declared_fingerprints = []
         
         try:
+            # Declare memory modules; instances are materialized on first access
+            for module_info in parsed_code.get('memory_modules', []):
+                module_fingerprints[module_info['name']] = memory_modules.declare(
+                    module_info['type'],
+                    module_info['name'],
+                    module_info['body']
+                )
+                declared_fingerprints.append(module_fingerprints[module_info['name']])
+                execution_log.append(f"Declared memory module: {module_info['name']} ({module_info['type']})")
+            
+            # Declare distributed modules on the worker pool
+            for module_info in parsed_code.get('distributed_modules', []):
+                declare_distributed_module(module_info)
+                execution_log.append(
+                    f"Declared distributed module: {module_info['name']} "
+                    f"({len(module_info['nodes'])} nodes, replication {module_info['replication_factor']})"
+                )
+            
             # Execute connections
             for connection_info in parsed_code['connections']:
-                connection_id = create_flux_connection(connection_info['name'])
+                connection_id = create_flux_connection(connection_info['name'], principals)
                 created_connections.append(connection_id)
+                connection_ids[connection_info['name']] = connection_id
+                connection_actions[connection_info['name']] = connection_info['on_connect_actions']
                 
                 execution_log.append(f"Created connection: {connection_info['name']}")
                 
+                # Attach declared memory modules to the connection
+                for module_name in connection_info.get('memory_modules', []):
+                    if module_name not in module_fingerprints:
+                        execution_log.append(f"Unknown memory module: {module_name}")
+                        continue
+                    memory_modules.attach(module_fingerprints[module_name], connection_id)
+                    active_connections[connection_id].memory_modules.append(module_fingerprints[module_name])
+                    execution_log.append(f"Attached memory module: {module_name}")
+                
                 # Allocate floating memory for floating variables
                 for float_var in connection_info['floating_vars']:
                     memory_id = allocate_floating_memory(
@@ -292,17 +622,32 @@ class FLUXInterpreter:
                     execution_log.append(f"Allocated floating memory: {float_var['name']} ({float_var['type']})")
                 
                 # Execute on_connect actions
-                for action in connection_info['on_connect_actions']:
-                    result = execute_action(action, connection_id)
-                    execution_log.append(f"Executed {action['type']}: {result}")
+                if connection_info['name'] not in concurrent_names:
+                    execution_log.extend(self.run_actions(connection_info['on_connect_actions'], connection_id))
+            
+            # Execute concurrent connection groups
+            for group in parsed_code.get('concurrent_connections', []):
+                report = self.execute_concurrent_group(group, connection_ids, connection_actions)
+                execution_log.extend(report.pop('log'))
+                concurrent_reports.append(report)
             
             return {
                 'success': True,
                 'execution_log': execution_log,
                 'created_connections': created_connections,
+                'concurrent_groups': concurrent_reports,
                 'errors': parsed_code.get('errors', [])
             }
             
+        except QuotaExceededError as e:
+            return {
+                'success': False,
+                'execution_log': execution_log,
+                'created_connections': created_connections,
+                'error': str(e),
+                'quota': e.to_dict(),
+                'errors': parsed_code.get('errors', [])
+            }
         except Exception as e:
             return {
                 'success': False,
@@ -310,6 +655,123 @@ class FLUXInterpreter:
                 'error': str(e),
                 'errors': parsed_code.get('errors', [])
             }
+        finally:
+            # Only this program's declarations; another program may be between declare and attach
+            memory_modules.prune(declared_fingerprints)
+
+    def run_actions(self, actions: List[Dict[str, Any]], connection_id: str,
+                    stop: Optional[threading.Event] = None) -> List[str]:
+        """Execute a list of actions on a connection and return their log lines.
+
+        Setting stop makes a worker that has been given up on stop before its next action.
+        """
+        log = []
+        for action in actions:
+            if stop is not None and stop.is_set():
+                log.append(f"Stopped before {action['type']}")
+                break
+            result = execute_action(action, connection_id)
+            log.append(f"Executed {action['type']}: {result}")
+        return log
+    
+    def execute_concurrent_group(self, group: Dict[str, Any], connection_ids: Dict[str, str],
+                                 connection_actions: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Run a concurrent_connections group in parallel with fingerprint sync and failover"""
+        log = []
+        members = [name for name in group['connections'] if name in connection_ids]
+        for name in group['connections']:
+            if name not in connection_ids:
+                log.append(f"Unknown connection in concurrent group: {name}")
+        
+        report = {
+            'connections': members,
+            'primary': members[0] if members else None,
+            'failed': [],
+            'failover': None,
+            'synchronized': [],
+            'fingerprint': None,
+            'log': log
+        }
+        if not members:
+            return report
+        
+        timeout = group['timeout']
+        deadline = time.time() + timeout
+        stops = {name: threading.Event() for name in members}
+        futures = {
+            name: concurrent_executor.submit(
+                self.run_actions, connection_actions[name], connection_ids[name], stops[name]
+            )
+            for name in members
+        }
+        
+        healthy = []
+        for name in members:
+            try:
+                log.extend(futures[name].result(timeout=max(0.0, deadline - time.time())))
+                healthy.append(name)
+            except FutureTimeoutError:
+                # A running worker cannot be interrupted; it stops before its next action
+                stops[name].set()
+                futures[name].cancel()
+                report['failed'].append(name)
+                log.append(f"Connection {name} timed out after {timeout}s")
+            except Exception as e:
+                report['failed'].append(name)
+                log.append(f"Connection {name} failed: {e}")
+        
+        authority = report['primary']
+        if authority in report['failed']:
+            authority = None
+            if group['failover_mode'] == 'automatic':
+                # Failover shares the group's deadline, so the group never outlasts its timeout
+                for backup in list(healthy):
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        log.append(f"Failover abandoned: the group's {timeout}s timeout has passed")
+                        break
+                    stop = threading.Event()
+                    future = concurrent_executor.submit(
+                        self.run_actions, connection_actions[report['primary']], connection_ids[backup], stop
+                    )
+                    try:
+                        log.extend(future.result(timeout=remaining))
+                    except FutureTimeoutError:
+                        stop.set()
+                        future.cancel()
+                        log.append(f"Failover to {backup} timed out with the group after {timeout}s")
+                    except Exception as e:
+                        log.append(f"Failover to {backup} failed: {e}")
+                    else:
+                        authority = backup
+                        report['failover'] = {'from': report['primary'], 'to': backup}
+                        log.append(f"Failover: {report['primary']} -> {backup}")
+                        break
+                    # Half-replayed, and possibly still being written: neither a source nor a target of sync
+                    healthy.remove(backup)
+                    report['failed'].append(backup)
+        
+        for name in report['failed']:
+            active_connections[connection_ids[name]].status = 'failed'
+        
+        if authority is None:
+            log.append("No healthy connection available in concurrent group")
+            return report
+        
+        report['primary'] = authority
+        
+        if group['synchronize_on'] == 'fingerprint_match':
+            authority_id = connection_ids[authority]
+            report['fingerprint'] = connection_state_fingerprint(authority_id)
+            for name in healthy:
+                if name == authority:
+                    continue
+                if connection_state_fingerprint(connection_ids[name]) != report['fingerprint']:
+                    share_floating_state(authority_id, connection_ids[name])
+                    report['synchronized'].append(name)
+                    log.append(f"Synchronized {name} to {authority} (fingerprint {report['fingerprint'][:12]})")
+        
+        return report
 
 # Initialize FLUX interpreter
 flux_interpreter = FLUXInterpreter()
@@ -319,7 +781,8 @@ def initialize_lantern_hive():
     global lantern_hive
 
     api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
+    replaying = os.getenv('LANTERN_CASSETTE_MODE', '').lower() == 'replay'
+    if not api_key and not replaying and os.getenv('LANTERN_LLM_PROVIDER', 'openai').lower() == 'openai':
         logger.warning("Warning: OPENAI_API_KEY not found. LanternHive cognitive features will be disabled.")
         return False
 
@@ -401,6 +864,10 @@ def allocate_floating_memory(connection_id: str, data_type: str, content: Any) -
         if 'memory_strategy' in recommendations:
             logger.info(f"Applying memory strategy: {recommendations['memory_strategy']}")
 
+    owners = resource_owners.get(connection_id, ())
+    quota_manager.acquire(owners, 'memory_bytes', optimized_size)
+    resource_owners[memory_id] = owners
+
     memory = FloatingMemory(
         id=memory_id,
         connection_id=connection_id,
@@ -410,11 +877,12 @@ def allocate_floating_memory(connection_id: str, data_type: str, content: Any) -
         created_at=time.time()
     )
 
-    floating_memory[memory_id] = memory
-
-    # Add to connection's floating data
-    if connection_id in active_connections:
-        active_connections[connection_id].floating_data[memory_id] = memory
+    # Registered and handed to its connection at once, so a sweep never sees it unowned
+    with memory_lock:
+        floating_memory[memory_id] = memory
+        memory_refcounts[memory_id] = 1
+        if connection_id in active_connections:
+            active_connections[connection_id].floating_data[memory_id] = memory
 
     # Log memory_weaver interaction if it was used
     if optimization_advice and isinstance(optimization_advice, dict):
@@ -424,7 +892,10 @@ def allocate_floating_memory(connection_id: str, data_type: str, content: Any) -
 
 def generate_fingerprint(connection_id: str, data: Any) -> str:
     """Generate a cryptographic fingerprint for data"""
+    owners = resource_owners.get(connection_id, ())
+    quota_manager.acquire(owners, 'fingerprints')
     fingerprint_id = generate_id("fp_")
+    resource_owners[fingerprint_id] = owners
     
     # Create hash of the data
     data_str = json.dumps(data, sort_keys=True) if isinstance(data, dict) else str(data)
@@ -447,6 +918,46 @@ def generate_fingerprint(connection_id: str, data: Any) -> str:
     
     return fingerprint_id
 
+def get_distributed_pool() -> DistributedWorkerPool:
+    """The worker pool, sized by FLUX_DISTRIBUTED_WORKERS; nothing is spawned until a module is used"""
+    global distributed_pool
+    with distributed_pool_lock:
+        if distributed_pool is None:
+            distributed_pool = DistributedWorkerPool.from_env()
+        return distributed_pool
+
+def declare_distributed_module(module_info: Dict[str, Any]) -> DistributedModule:
+    """Create a distributed module, reusing an existing one with the same configuration.
+
+    Redeclaring a module with a different configuration moves its data onto the
+    new nodes and replication, keeping every key's newest version.
+    """
+    existing = distributed_modules.get(module_info['name'])
+    entries = {}
+    if existing is not None:
+        if (existing.module_type, existing.nodes, existing.consistency_model) == (
+                module_info['type'], module_info['nodes'], module_info['consistency_model']) \
+                and existing.replication_factor == min(module_info['replication_factor'], len(module_info['nodes'])):
+            return existing
+        entries = existing.export()
+        # Each worker's pipe is ordered, so the drop lands before the reloaded entries
+        existing.drop()
+
+    module = DistributedModule(
+        name=module_info['name'],
+        module_type=module_info['type'],
+        nodes=module_info['nodes'],
+        replication_factor=module_info['replication_factor'],
+        consistency_model=module_info['consistency_model'],
+        pool=get_distributed_pool()
+    )
+    if existing is not None:
+        module.load(entries, existing.sessions)
+        logger.info(f"Redeclared distributed module: {module.name}, kept {len(entries)} keys")
+    distributed_modules[module.name] = module
+    logger.info(f"Declared distributed module: {module.name} (nodes: {module.nodes})")
+    return module
+
 def execute_action(action: Dict[str, Any], connection_id: str) -> str:
     """Execute a FLUX action"""
     
@@ -458,7 +969,8 @@ def execute_action(action: Dict[str, Any], connection_id: str) -> str:
             # Process natural language command through LanternHive
             result = lantern_hive.process_prompt(
                 action['command'],
-                flux_context={'connection_id': connection_id}
+                flux_context={'connection_id': connection_id},
+                priority='batch'
             )
             return f"Natural command processed: {action['command']}"
         else:
@@ -476,6 +988,29 @@ def execute_action(action: Dict[str, Any], connection_id: str) -> str:
     elif action['type'] == 'store_fingerprint':
         return f"Stored fingerprint for: {action['data']}"
     
+    elif action['type'] == 'store_distributed':
+        module = distributed_modules.get(action['module'])
+        if module is None:
+            return f"Distributed module not declared: {action['module']}"
+        result = module.put(action['key'], action['value'], connection_id)
+        return f"Stored {action['key']} in {module.name} (version {result['version'][0]}, replicas: {', '.join(result['replicas'])})"
+    
+    elif action['type'] == 'recall_distributed':
+        module = distributed_modules.get(action['module'])
+        if module is None:
+            return f"Distributed module not declared: {action['module']}"
+        result = module.get(action['key'], connection_id)
+        if result is None:
+            return f"No value for {action['key']} in {module.name}"
+        return f"Recalled {action['key']} from {module.name}: {result['value']}"
+    
+    elif action['type'] == 'load_module':
+        fingerprint = memory_modules.find(connection_id, action['module'])
+        if fingerprint is None:
+            return f"Memory module not attached: {action['module']}"
+        module = memory_modules.get(fingerprint, connection_id)
+        return f"Loaded memory module: {module.name} ({len(module.structure)} fields)"
+    
     else:
         return f"Unknown action: {action['type']}"
 
@@ -519,7 +1054,14 @@ def health_check():
         'strategy_engine_enabled': strategy_engine is not None,
         'active_connections': len(active_connections),
         'floating_memory_blocks': len(floating_memory),
-        'fingerprints': len(fingerprint_registry)
+        'shared_memory_blocks': sum(1 for count in memory_refcounts.values() if count > 1),
+        'fingerprints': len(fingerprint_registry),
+        'memory_modules': memory_modules.get_statistics(),
+        'lantern_coalescing': lantern_hive.inflight.get_statistics() if lantern_hive else None,
+        'lantern_provider': lantern_hive.provider.get_statistics() if lantern_hive else None,
+        'lantern_resilience': lantern_hive.resilience.get_statistics() if lantern_hive else None,
+        'lantern_jobs': lantern_jobs.get_statistics(),
+        'distributed_modules': len(distributed_modules)
     })
 
 @app.route('/api/flux/parse', methods=['POST'])
@@ -545,13 +1087,17 @@ def execute_flux_code():
         return jsonify({'error': 'No code provided'}), 400
     
     try:
+        admission_controller.admit()
+        
         # Parse the code first
         parsed = flux_interpreter.parse_flux_code(data['code'])
         
         # Execute the parsed code
-        result = flux_interpreter.execute_flux_program(parsed)
+        result = flux_interpreter.execute_flux_program(parsed, request_principals(data))
         
-        return jsonify(result)
+        return jsonify(result), 429 if 'quota' in result else 200
+    except AdmissionRejectedError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -567,12 +1113,193 @@ def process_with_lantern_hive():
         return jsonify({'error': 'No prompt provided'}), 400
     
     try:
+        budget = RequestBudget.from_dict(data.get('budget'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        admission_controller.admit()
         flux_context = data.get('flux_context', {})
-        result = lantern_hive.process_prompt(data['prompt'], flux_context)
+        result = lantern_hive.process_prompt(
+            data['prompt'], flux_context, data.get('max_concurrency'), bool(data.get('bypass_cache')),
+            priority=REST_PRIORITY, budget=budget, memory_scope=memory_scope_for(request_principals(data))
+        )
         return jsonify(result)
+    except AdmissionRejectedError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/lantern/batch', methods=['POST'])
+def process_lantern_batch():
+    """Process many prompts at batch priority, streaming one NDJSON line per prompt as it completes"""
+    if not lantern_hive:
+        return jsonify({'error': 'LanternHive not available'}), 503
+    
+    data = request.get_json()
+    prompts = (data or {}).get('prompts')
+    
+    if not prompts or not isinstance(prompts, list):
+        return jsonify({'error': 'No prompts provided'}), 400
+    
+    max_prompts = int(os.getenv('LANTERN_BATCH_MAX_PROMPTS', 1000))
+    if len(prompts) > max_prompts:
+        return jsonify({'error': f'Too many prompts (max {max_prompts})'}), 400
+    
+    # Each prompt is a string, or an object with a prompt and optional flux_context and budget
+    items = [item if isinstance(item, dict) else {'prompt': item} for item in prompts]
+    if not all(isinstance(item.get('prompt'), str) and item['prompt'].strip() for item in items):
+        return jsonify({'error': 'Every prompt must be a non-empty string'}), 400
+    try:
+        for item in items:
+            RequestBudget.from_dict(item.get('budget'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        admission_controller.admit()
+    except AdmissionRejectedError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
+    
+    cancel_token = CancellationToken()
+    scope = memory_scope_for(request_principals(data))
+    
+    def generate():
+        try:
+            for line in lantern_hive.process_batch(items, bool(data.get('bypass_cache')), cancel_token, scope):
+                yield json.dumps(line, default=str) + "\n"
+        finally:
+            # The client went away before the batch finished
+            cancel_token.cancel('cancelled: client disconnected')
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def run_lantern_job(params: Dict[str, Any], on_token=None, cancel_token=None) -> Dict[str, Any]:
+    """Run one queued LanternHive query; params are the validated request body"""
+    if not lantern_hive:
+        raise RuntimeError('LanternHive not available')
+    return lantern_hive.process_prompt(
+        params['prompt'], params.get('flux_context', {}), params.get('max_concurrency'),
+        bool(params.get('bypass_cache')), on_token if params.get('stream', True) else None,
+        priority=REST_PRIORITY, cancel_token=cancel_token,
+        budget=RequestBudget.from_dict(params.get('budget')), memory_scope=params.get('memory_scope')
+    )
+
+def notify_lantern_job(job_id: str, event: str, payload: Dict[str, Any]):
+    """Push job status and streamed chunks to the clients subscribed to the job"""
+    socketio.emit(event, payload, to=f"lantern_job:{job_id}")
+
+lantern_jobs = JobManager.from_env(run_lantern_job, notify_lantern_job)
+
+@app.route('/api/lantern/jobs', methods=['POST'])
+def submit_lantern_job():
+    """Queue a LanternHive query and return its job ID without waiting for the result"""
+    if not lantern_hive:
+        return jsonify({'error': 'LanternHive not available'}), 503
+    
+    data = request.get_json()
+    
+    if not data or 'prompt' not in data:
+        return jsonify({'error': 'No prompt provided'}), 400
+    
+    try:
+        RequestBudget.from_dict(data.get('budget'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        admission_controller.admit()
+        # Set last, so a caller cannot name another client's memory
+        job = lantern_jobs.submit({**data, 'memory_scope': memory_scope_for(request_principals(data))})
+        return jsonify({**job.to_dict(), 'status_url': f"/api/lantern/jobs/{job.job_id}"}), 202
+    except (AdmissionRejectedError, JobQueueFullError) as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/lantern/jobs', methods=['GET'])
+def get_lantern_job_stats():
+    """Get LanternHive job queue depth, wait times and outcome counts"""
+    return jsonify(lantern_jobs.get_statistics())
+
+@app.route('/api/lantern/jobs/<job_id>', methods=['GET'])
+def get_lantern_job(job_id):
+    """Poll a LanternHive job; the result is included once it has succeeded"""
+    job = lantern_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    
+    return jsonify(job.to_dict())
+
+@app.route('/api/lantern/jobs/<job_id>', methods=['DELETE'])
+def cancel_lantern_job(job_id):
+    """Cancel a queued or running LanternHive job"""
+    job = lantern_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    
+    return jsonify(job.to_dict(include_result=False))
+
+@app.route('/api/lantern/cache', methods=['GET'])
+def get_lantern_cache_stats():
+    """Get LanternHive response cache metrics"""
+    if not lantern_hive:
+        return jsonify({'error': 'LanternHive not available'}), 503
+    
+    stats = lantern_hive.response_cache.get_statistics()
+    stats['semantic'] = lantern_hive.semantic_cache.get_statistics()
+    return jsonify(stats)
+
+@app.route('/api/lantern/scheduler', methods=['GET'])
+def get_lantern_scheduler_stats():
+    """Get LanternHive request scheduler queue depth and rate limit state"""
+    if not lantern_hive:
+        return jsonify({'error': 'LanternHive not available'}), 503
+    
+    return jsonify(lantern_hive.scheduler.get_statistics())
+
+@app.route('/api/lantern/memory', methods=['GET'])
+def get_lantern_memory_stats():
+    """Get Archiva's long-term dialogue memory size and recall counts"""
+    if not lantern_hive:
+        return jsonify({'error': 'LanternHive not available'}), 503
+    
+    return jsonify(lantern_hive.memory.get_statistics())
+
+@app.route('/api/lantern/planner', methods=['GET'])
+def get_lantern_planner_stats():
+    """Get LanternHive budget planning counts and the per-lantern latency estimates behind them"""
+    if not lantern_hive:
+        return jsonify({'error': 'LanternHive not available'}), 503
+    
+    return jsonify(lantern_hive.planner.get_statistics())
+
+@app.route('/api/lantern/models', methods=['GET'])
+def get_lantern_model_stats():
+    """Get LanternHive model routing table and per-route latency and quality statistics"""
+    if not lantern_hive:
+        return jsonify({'error': 'LanternHive not available'}), 503
+    
+    return jsonify(lantern_hive.model_router.get_statistics())
+
+@app.route('/api/lantern/sessions', methods=['GET'])
+def get_lantern_session_stats():
+    """Get LanternHive session store size and memory metrics"""
+    if not lantern_hive:
+        return jsonify({'error': 'LanternHive not available'}), 503
+    
+    return jsonify(lantern_hive.active_sessions.get_statistics())
+
+@app.route('/api/lantern/cache', methods=['DELETE'])
+def clear_lantern_cache():
+    """Clear the LanternHive response cache"""
+    if not lantern_hive:
+        return jsonify({'error': 'LanternHive not available'}), 503
+    
+    lantern_hive.response_cache.clear()
+    lantern_hive.semantic_cache.clear()
+    return jsonify({'message': 'Response cache cleared'})
+
 @app.route('/api/connections', methods=['GET'])
 def get_connections():
     """Get all active connections"""
@@ -585,11 +1312,90 @@ def create_connection():
     data = request.get_json()
     name = data.get('name', f'Connection_{len(active_connections) + 1}')
     
-    connection_id = create_flux_connection(name)
+    try:
+        connection_id = create_flux_connection(name, request_principals(data))
+    except QuotaExceededError as e:
+        return jsonify({'error': str(e), 'quota': e.to_dict()}), 429
     connection = active_connections[connection_id]
     
     return jsonify(asdict(connection))
 
+@app.route('/api/connections/<connection_id>/fork', methods=['POST'])
+def fork_connection(connection_id):
+    """Fork a connection, sharing floating memory copy-on-write"""
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        fork_id = fork_flux_connection(connection_id, data.get('name'), request_principals(data))
+    except QuotaExceededError as e:
+        return jsonify({'error': str(e), 'quota': e.to_dict()}), 429
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    
+    return jsonify(asdict(active_connections[fork_id]))
+
+@app.route('/api/connections/<connection_id>/memory/<memory_id>', methods=['PUT'])
+def update_connection_memory(connection_id, memory_id):
+    """Write a floating memory block, copying it if shared with a fork"""
+    data = request.get_json()
+    
+    if not data or 'content' not in data:
+        return jsonify({'error': 'No content provided'}), 400
+    
+    try:
+        new_memory_id = write_floating_memory(connection_id, memory_id, data['content'])
+    except QuotaExceededError as e:
+        return jsonify({'error': str(e), 'quota': e.to_dict()}), 429
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    
+    return jsonify({
+        'memory_id': new_memory_id,
+        'copied': new_memory_id != memory_id
+    })
+
+@app.route('/api/connections/<connection_id>', methods=['DELETE'])
+def delete_connection(connection_id):
+    """Close a connection and release its memory modules"""
+    if not close_flux_connection(connection_id):
+        return jsonify({'error': 'Connection not found'}), 404
+    
+    return jsonify({'message': f'Connection {connection_id} closed'})
+
+@app.route('/api/memory_modules', methods=['GET'])
+def get_memory_modules():
+    """Get declared memory modules and registry statistics"""
+    return jsonify({
+        'modules': memory_modules.list_modules(),
+        'statistics': memory_modules.get_statistics()
+    })
+
+@app.route('/api/distributed_modules', methods=['GET'])
+def get_distributed_modules():
+    """Get distributed modules and worker pool status"""
+    return jsonify({
+        'modules': [module.get_statistics() for module in distributed_modules.values()],
+        'pool': distributed_pool.get_statistics() if distributed_pool else None
+    })
+
+@app.route('/api/distributed_modules/<name>/sync', methods=['POST'])
+def sync_distributed_module(name):
+    """Run an anti-entropy pass over a distributed module's replicas"""
+    module = distributed_modules.get(name)
+    if module is None:
+        return jsonify({'error': 'Distributed module not found'}), 404
+    
+    return jsonify({'name': name, 'repaired': module.sync()})
+
+@app.route('/api/quotas', methods=['GET'])
+def get_quotas():
+    """Get the caller's quota usage and the admission controller state"""
+    return jsonify({
+        'principals': [quota_manager.usage_for(p) for p in request_principals()],
+        'statistics': quota_manager.get_statistics(),
+        'admission': admission_controller.get_statistics()
+    })
+
 @app.route('/api/memory', methods=['GET'])
 def get_floating_memory():
     """Get all floating memory blocks"""
@@ -825,6 +1631,20 @@ def translate_agi15():
         logger.error(f"Error translating AGI15: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# Thread operations for cluster input, checked in order; the first found wins
+CLUSTER_OPERATION_ROUTER = KeywordRouter({
+    'DETAILED_EXAMINATION': ['analyze', 'examine', 'study'],
+    'BREAKTHROUGH_INSIGHT': ['create', 'build', 'make'],
+    'RECURSIVE_THOUGHT': ['think', 'consider', 'ponder']
+})
+
+# Keywords that call each Warden lantern narration
+WARDEN_NARRATION_ROUTER = KeywordRouter({
+    'forge': ['create', 'build', 'make'],
+    'pool': ['analyze', 'understand', 'study'],
+    'grove': ['help', 'guide', 'assist']
+})
+
 @app.route('/api/lantern/cluster/process', methods=['POST'])
 def process_cluster():
     """Process input through cluster syntax"""
@@ -840,15 +1660,10 @@ def process_cluster():
         
         # Create threads based on input
         threads = []
-        operation = lantern_framework.cluster_syntax.ThreadOperation.BASIC_THOUGHT
         
         # Determine operation based on input content
-        if any(word in user_input.lower() for word in ['analyze', 'examine', 'study']):
-            operation = lantern_framework.cluster_syntax.ThreadOperation.DETAILED_EXAMINATION
-        elif any(word in user_input.lower() for word in ['create', 'build', 'make']):
-            operation = lantern_framework.cluster_syntax.ThreadOperation.BREAKTHROUGH_INSIGHT
-        elif any(word in user_input.lower() for word in ['think', 'consider', 'ponder']):
-            operation = lantern_framework.cluster_syntax.ThreadOperation.RECURSIVE_THOUGHT
+        operation_name = CLUSTER_OPERATION_ROUTER.first(user_input, default='BASIC_THOUGHT')
+        operation = lantern_framework.cluster_syntax.ThreadOperation[operation_name]
         
         thread = lantern_framework.cluster_syntax.create_thread(
             operation=operation,
@@ -883,18 +1698,19 @@ def synthesize_warden():
         
         # Generate lantern responses based on input
         lantern_responses = []
+        matched = WARDEN_NARRATION_ROUTER.match(user_input)
         
-        if any(word in user_input.lower() for word in ['create', 'build', 'make']):
+        if 'forge' in matched:
             lantern_responses.append(
                 lantern_framework.warden_reality.create_lantern_narration("🔥", "The forge is hot — let's build something amazing!")
             )
         
-        if any(word in user_input.lower() for word in ['analyze', 'understand', 'study']):
+        if 'pool' in matched:
             lantern_responses.append(
                 lantern_framework.warden_reality.create_lantern_narration("💧", "The pool ripples with insights... let us trace the patterns together.")
             )
         
-        if any(word in user_input.lower() for word in ['help', 'guide', 'assist']):
+        if 'grove' in matched:
             lantern_responses.append(
                 lantern_framework.warden_reality.create_lantern_narration("🌿", "The Grove stirs as you speak. I can help you find your path.")
             )
@@ -954,12 +1770,26 @@ def handle_connect():
         'lantern_framework_enabled': lantern_framework is not None
     })
 
+def cancel_lantern_queries(sid: str, query_id: Optional[str] = None, reason: str = 'cancelled') -> int:
+    """Cancel one or all of a client's running LanternHive queries; returns how many"""
+    with lantern_queries_lock:
+        queries = lantern_queries.get(sid, {})
+        tokens = [queries[query_id]] if query_id in queries else [] if query_id else list(queries.values())
+    for token in tokens:
+        token.cancel(reason)
+    return len(tokens)
+
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection with cleanup"""
     try:
         logger.info('Client disconnected - performing cleanup')
         
+        # Nobody is left to receive these answers; stop spending on them
+        cancelled = cancel_lantern_queries(request.sid, reason='cancelled: client disconnected')
+        if cancelled:
+            logger.info(f"Cancelled {cancelled} LanternHive query(ies) for disconnected client")
+        
         # Clean up any temporary connections or memory associated with this client
         # This is a basic cleanup - in a production system you'd want more sophisticated session management
         current_time = time.time()
@@ -971,18 +1801,13 @@ def handle_disconnect():
                 connections_to_remove.append(conn_id)
         
         for conn_id in connections_to_remove:
-            del active_connections[conn_id]
+            close_flux_connection(conn_id)
             logger.info(f"Cleaned up old connection: {conn_id}")
         
-        # Remove old memory blocks
-        memory_to_remove = []
-        for mem_id, memory in floating_memory.items():
-            if current_time - memory.created_at > 3600:  # 1 hour
-                memory_to_remove.append(mem_id)
-        
-        for mem_id in memory_to_remove:
-            del floating_memory[mem_id]
-            logger.info(f"Cleaned up old memory block: {mem_id}")
+        # Memory blocks belong to connections and were released with them; a block a
+        # younger copy-on-write fork still shares stays, whatever its age
+        for mem_id in release_orphaned_memory():
+            logger.info(f"Cleaned up orphaned memory block: {mem_id}")
         
         # Remove old fingerprints
         fingerprints_to_remove = []
@@ -991,7 +1816,7 @@ def handle_disconnect():
                 fingerprints_to_remove.append(fp_id)
         
         for fp_id in fingerprints_to_remove:
-            del fingerprint_registry[fp_id]
+            release_fingerprint(fp_id)
             logger.info(f"Cleaned up old fingerprint: {fp_id}")
             
     except Exception as e:
@@ -1015,14 +1840,19 @@ def handle_execute_flux(data):
             emit('execution_error', {'error': 'Code block too large (max 10KB)'})
             return
         
+        admission_controller.admit()
+        
         logger.info(f"Executing FLUX code (length: {len(code)})")
         
         # Parse and execute
         parsed = flux_interpreter.parse_flux_code(code)
-        result = flux_interpreter.execute_flux_program(parsed)
+        result = flux_interpreter.execute_flux_program(parsed, request_principals(data))
         
         # Emit results
-        emit('execution_result', result)
+        if 'quota' in result:
+            emit('execution_error', {'error': result['error'], 'quota': result['quota']})
+        else:
+            emit('execution_result', result)
         
         # Emit updated state
         emit('state_update', {
@@ -1033,6 +1863,9 @@ def handle_execute_flux(data):
         
         logger.info(f"FLUX execution completed successfully")
         
+    except AdmissionRejectedError as e:
+        logger.warning(f"FLUX execution shed: {e.reason}")
+        emit('execution_error', {'error': str(e), 'retry_after': e.retry_after})
     except ValueError as e:
         logger.error(f"Value error in FLUX execution: {e}")
         emit('execution_error', {'error': f'Invalid input: {str(e)}'})
@@ -1070,12 +1903,43 @@ def handle_lantern_query(data):
         
         logger.info(f"Processing LanternHive query (length: {len(prompt)})")
         
-        # Process with LanternHive
-        result = lantern_hive.process_prompt(prompt, flux_context)
-        
-        emit('lantern_response', result)
+        admission_controller.admit()
+        
+        # Stream tokens to this client as they arrive; consultations run on worker
+        # threads, so address the client explicitly instead of relying on emit()
+        sid = request.sid
+        query_id = str(data.get('query_id') or generate_id("query_"))
+        on_token = None
+        if data.get('stream', True):
+            def on_token(event):
+                socketio.emit('lantern_stream', {'query_id': query_id, **event}, to=sid)
+        
+        # Tie the query to this client so a disconnect or cancel_query stops it
+        cancel_token = CancellationToken()
+        with lantern_queries_lock:
+            lantern_queries.setdefault(sid, {})[query_id] = cancel_token
+        try:
+            result = lantern_hive.process_prompt(
+                prompt, flux_context, data.get('max_concurrency'), bool(data.get('bypass_cache')), on_token,
+                priority=SOCKET_PRIORITY, cancel_token=cancel_token, budget=RequestBudget.from_dict(data.get('budget')),
+                memory_scope=memory_scope_for(request_principals(data))
+            )
+        finally:
+            with lantern_queries_lock:
+                queries = lantern_queries.get(sid, {})
+                queries.pop(query_id, None)
+                if not queries:
+                    lantern_queries.pop(sid, None)
+        
+        emit('lantern_response', {'query_id': query_id, **result})
         logger.info("LanternHive query processed successfully")
         
+    except QueryCancelled as e:
+        logger.info(f"LanternHive query cancelled: {e}")
+        emit('lantern_cancelled', {'query_id': query_id, 'reason': str(e)})
+    except AdmissionRejectedError as e:
+        logger.warning(f"LanternHive query shed: {e.reason}")
+        emit('lantern_error', {'error': str(e), 'retry_after': e.retry_after})
     except ValueError as e:
         logger.error(f"Value error in LanternHive query: {e}")
         emit('lantern_error', {'error': f'Invalid input: {str(e)}'})
@@ -1083,6 +1947,23 @@ def handle_lantern_query(data):
         logger.error(f"Unexpected error in LanternHive query: {e}")
         emit('lantern_error', {'error': f'Query processing failed: {str(e)}'})
 
+@socketio.on('cancel_query')
+def handle_cancel_query(data):
+    """Cancel this client's running LanternHive query by query_id, or all of them"""
+    cancelled = cancel_lantern_queries(request.sid, (data or {}).get('query_id'))
+    emit('query_cancel_result', {'query_id': (data or {}).get('query_id'), 'cancelled': cancelled})
+
+@socketio.on('subscribe_lantern_job')
+def handle_subscribe_lantern_job(data):
+    """Receive a job's status changes and streamed chunks; replies with its current state"""
+    job = lantern_jobs.get((data or {}).get('job_id', ''))
+    if job is None:
+        emit('lantern_error', {'error': 'Job not found or expired'})
+        return
+    
+    join_room(f"lantern_job:{job.job_id}")
+    emit('lantern_job', job.to_dict())
+
 @socketio.on('get_system_state')
 def handle_get_system_state():
     """Get current system state"""
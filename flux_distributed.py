@@ -0,0 +1,304 @@
+"""
+FLUX Distributed Module Runtime
+A replicated key/value store for distributed_module state, held by a pool of local worker processes
+
+Workers only store, version and return values: store_distributed and
+recall_distributed cost a pipe round trip per replica they wait on, and all
+module work stays in the backend process, so the pool adds replication and
+isolation, not parallel speedup.
+"""
+
+import atexit
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+from dataclasses import dataclass, field
+import logging
+
+logger = logging.getLogger(__name__)
+
+# A version orders writes to a key: (logical clock, writing client)
+Version = Tuple[int, str]
+
+def _worker_main(channel):
+    """Serve one worker process: a set of (module, node) stores behind a pipe.
+
+    Messages are (op, reply, payload) tuples; a response is sent only when
+    reply is true, so fire-and-forget replication never desynchronizes the pipe.
+    """
+    stores: Dict[Tuple[str, str], Dict[str, Tuple[Version, str, Any]]] = {}
+
+    while True:
+        try:
+            op, reply, payload = channel.recv()
+        except EOFError:
+            return
+
+        response = None
+        if op == 'put':
+            module, node, key, version, fingerprint, value = payload
+            store = stores.setdefault((module, node), {})
+            current = store.get(key)
+            if current is None or tuple(version) > tuple(current[0]):
+                store[key] = (tuple(version), fingerprint, value)
+            response = store[key][0]
+        elif op == 'get':
+            module, node, key = payload
+            response = stores.get((module, node), {}).get(key)
+        elif op == 'digest':
+            module, node = payload
+            response = {
+                key: (version, fingerprint)
+                for key, (version, fingerprint, _) in stores.get((module, node), {}).items()
+            }
+        elif op == 'drop':
+            module = payload
+            for store_key in [k for k in stores if k[0] == module]:
+                del stores[store_key]
+        elif op == 'stats':
+            response = {f"{module}/{node}": len(store) for (module, node), store in stores.items()}
+        elif op == 'stop':
+            if reply:
+                channel.send(None)
+            return
+
+        if reply:
+            channel.send(response)
+
+class DistributedWorkerPool:
+    """Pool of local worker processes reached over duplex pipes, started on first use"""
+
+    def __init__(self, num_workers: int = 2):
+        self.num_workers = max(1, num_workers)
+        self._context = multiprocessing.get_context('spawn')
+        self._channels = []
+        self._locks = []
+        self._processes = []
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'DistributedWorkerPool':
+        return cls(int(os.getenv('FLUX_DISTRIBUTED_WORKERS', 2)))
+
+    def start(self):
+        with self._start_lock:
+            if self._started:
+                return
+            for index in range(self.num_workers):
+                parent_end, child_end = self._context.Pipe()
+                process = self._context.Process(
+                    target=_worker_main,
+                    args=(child_end,),
+                    name=f"flux-distributed-{index}",
+                    daemon=True
+                )
+                process.start()
+                child_end.close()
+                self._channels.append(parent_end)
+                self._locks.append(threading.Lock())
+                self._processes.append(process)
+            self._started = True
+            atexit.register(self.shutdown)
+            logger.info(f"Started {self.num_workers} distributed module workers")
+
+    def worker_for(self, node: str) -> int:
+        """Map a logical node name onto a worker process"""
+        digest = hashlib.sha256(node.encode()).digest()
+        return int.from_bytes(digest[:8], 'big') % self.num_workers
+
+    def call(self, worker: int, op: str, payload: Any) -> Any:
+        """Send a request and wait for its response"""
+        self.start()
+        with self._locks[worker]:
+            self._channels[worker].send((op, True, payload))
+            return self._channels[worker].recv()
+
+    def send(self, worker: int, op: str, payload: Any):
+        """Send a request without waiting for a response"""
+        self.start()
+        with self._locks[worker]:
+            self._channels[worker].send((op, False, payload))
+
+    def shutdown(self):
+        with self._start_lock:
+            if not self._started:
+                return
+            for channel, lock in zip(self._channels, self._locks):
+                try:
+                    with lock:
+                        channel.send(('stop', False, None))
+                    channel.close()
+                except (OSError, BrokenPipeError):
+                    pass
+            for process in self._processes:
+                process.join(timeout=1)
+            self._channels, self._locks, self._processes = [], [], []
+            self._started = False
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            'workers': self.num_workers,
+            'started': self._started,
+            'alive': sum(1 for process in self._processes if process.is_alive())
+        }
+
+@dataclass
+class DistributedModule:
+    """A distributed_module replicated over logical nodes hosted by the worker pool"""
+    name: str
+    module_type: str
+    nodes: List[str]
+    replication_factor: int
+    consistency_model: str
+    pool: DistributedWorkerPool
+    sessions: Dict[str, Dict[str, Version]] = field(default_factory=dict)
+    writes: int = 0
+    reads: int = 0
+    read_repairs: int = 0
+
+    def __post_init__(self):
+        self.replication_factor = max(1, min(self.replication_factor, len(self.nodes)))
+        self._clock = itertools.count(1)
+        self._lock = threading.Lock()
+        self._read_cursor = itertools.count()
+
+    def replicas_for(self, key: str) -> List[str]:
+        """Rendezvous-hash a key onto replication_factor nodes, owner first"""
+        ranked = sorted(
+            self.nodes,
+            key=lambda node: hashlib.sha256(f"{node}:{key}".encode()).digest(),
+            reverse=True
+        )
+        return ranked[:self.replication_factor]
+
+    def put(self, key: str, value: Any, client_id: str) -> Dict[str, Any]:
+        """Write a key: the owner replica acknowledges, the rest converge eventually"""
+        with self._lock:
+            version = (next(self._clock), client_id)
+        fingerprint = hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+        replicas = self.replicas_for(key)
+
+        for index, node in enumerate(replicas):
+            payload = (self.name, node, key, version, fingerprint, value)
+            worker = self.pool.worker_for(node)
+            if index == 0 or self.consistency_model == 'strong':
+                self.pool.call(worker, 'put', payload)
+            else:
+                self.pool.send(worker, 'put', payload)
+
+        with self._lock:
+            self.sessions.setdefault(client_id, {})[key] = version
+            self.writes += 1
+
+        return {'key': key, 'version': list(version), 'fingerprint': fingerprint, 'replicas': replicas}
+
+    def get(self, key: str, client_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Read a key from any replica, falling back to fresher ones for read-your-writes"""
+        replicas = self.replicas_for(key)
+        with self._lock:
+            self.reads += 1
+            start = next(self._read_cursor) % len(replicas)
+            required = self.sessions.get(client_id, {}).get(key) if client_id else None
+
+        # Spread reads across replicas, but always end on the owner, which acknowledged the write
+        order = replicas[start:] + replicas[:start]
+        order.remove(replicas[0])
+        order.append(replicas[0])
+
+        stale_nodes = []
+        entry = None
+        for node in order:
+            entry = self.pool.call(self.pool.worker_for(node), 'get', (self.name, node, key))
+            if required is None or (entry is not None and tuple(entry[0]) >= tuple(required)):
+                break
+            stale_nodes.append(node)
+
+        if entry is None:
+            return None
+
+        version, fingerprint, value = entry
+        for node in stale_nodes:
+            self.pool.send(self.pool.worker_for(node), 'put', (self.name, node, key, version, fingerprint, value))
+        if stale_nodes:
+            with self._lock:
+                self.read_repairs += len(stale_nodes)
+
+        return {'key': key, 'value': value, 'version': list(version), 'fingerprint': fingerprint}
+
+    def sync(self) -> int:
+        """Anti-entropy pass: push the newest version of every key to its stale replicas"""
+        digests = {
+            node: self.pool.call(self.pool.worker_for(node), 'digest', (self.name, node))
+            for node in self.nodes
+        }
+        repaired = 0
+        keys = set().union(*(digest.keys() for digest in digests.values())) if digests else set()
+
+        for key in keys:
+            replicas = self.replicas_for(key)
+            holders = [node for node in replicas if key in digests[node]]
+            newest = max(holders, key=lambda node: tuple(digests[node][key][0]))
+            newest_version = tuple(digests[newest][key][0])
+            stale = [
+                node for node in replicas
+                if key not in digests[node] or tuple(digests[node][key][0]) < newest_version
+            ]
+            if not stale:
+                continue
+            _, fingerprint, value = self.pool.call(self.pool.worker_for(newest), 'get', (self.name, newest, key))
+            for node in stale:
+                self.pool.call(self.pool.worker_for(node), 'put', (self.name, node, key, newest_version, fingerprint, value))
+                repaired += 1
+
+        return repaired
+
+    def export(self) -> Dict[str, Tuple[Version, str, Any]]:
+        """The newest (version, fingerprint, value) of every key held on any node"""
+        newest: Dict[str, Tuple[Version, str]] = {}
+        for node in self.nodes:
+            for key, (version, _) in self.pool.call(self.pool.worker_for(node), 'digest', (self.name, node)).items():
+                if key not in newest or tuple(version) > newest[key][0]:
+                    newest[key] = (tuple(version), node)
+        entries = {}
+        for key, (_, node) in newest.items():
+            version, fingerprint, value = self.pool.call(self.pool.worker_for(node), 'get', (self.name, node, key))
+            entries[key] = (tuple(version), fingerprint, value)
+        return entries
+
+    def load(self, entries: Dict[str, Tuple[Version, str, Any]], sessions: Dict[str, Dict[str, Version]]):
+        """Place exported entries on this module's replicas, keeping their versions and client sessions"""
+        for key, (version, fingerprint, value) in entries.items():
+            for node in self.replicas_for(key):
+                self.pool.call(self.pool.worker_for(node), 'put', (self.name, node, key, version, fingerprint, value))
+        with self._lock:
+            # New writes must order after every loaded one
+            self._clock = itertools.count(max((version[0] for version, _, _ in entries.values()), default=0) + 1)
+            self.sessions = {client_id: dict(keys) for client_id, keys in sessions.items()}
+
+    def forget_client(self, client_id: str):
+        """Drop a client's read-your-writes session"""
+        with self._lock:
+            self.sessions.pop(client_id, None)
+
+    def drop(self):
+        """Remove the module's data from every worker"""
+        for worker in {self.pool.worker_for(node) for node in self.nodes}:
+            self.pool.send(worker, 'drop', self.name)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'module_type': self.module_type,
+            'nodes': self.nodes,
+            'replication_factor': self.replication_factor,
+            'consistency_model': self.consistency_model,
+            'writes': self.writes,
+            'reads': self.reads,
+            'read_repairs': self.read_repairs,
+            'clients': len(self.sessions)
+        }
@@ -0,0 +1,212 @@
+"""
+FLUX Memory Module Runtime
+Shared, lazily materialized memory_module instances for FLUX connections
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, List, Any, Optional, Set, Iterable
+from dataclasses import dataclass, field
+import logging
+
+logger = logging.getLogger(__name__)
+
+FIELD_PATTERN = re.compile(r'^\s*([\w]+(?:<[^>]*>)?)\s+(\w+)\s*$')
+BEHAVIOR_PATTERN = re.compile(r'^\s*(\w+)\s*:\s*(.+?)\s*$')
+
+@dataclass
+class MemoryModuleDeclaration:
+    """A memory_module as declared in FLUX source, before materialization"""
+    fingerprint: str
+    module_type: str
+    name: str
+    body: str
+    declared_at: float
+    connections: Set[str] = field(default_factory=set)
+    # Programs that declared the module and have not yet attached it or finished
+    pending: int = 0
+
+@dataclass
+class MemoryModuleInstance:
+    """Materialized, read-only memory_module shared by every connection that uses it"""
+    fingerprint: str
+    module_type: str
+    name: str
+    structure: MappingProxyType
+    behavior: MappingProxyType
+    materialized_at: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'fingerprint': self.fingerprint,
+            'module_type': self.module_type,
+            'name': self.name,
+            'structure': dict(self.structure),
+            'behavior': dict(self.behavior),
+            'materialized_at': self.materialized_at
+        }
+
+def module_fingerprint(module_type: str, name: str, body: str) -> str:
+    """Fingerprint a memory_module declaration independent of whitespace layout"""
+    normalized_body = " ".join(body.split())
+    payload = json.dumps([module_type, name, normalized_body])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class MemoryModuleRegistry:
+    """Reference-counted registry of memory_module declarations and their instances.
+
+    Declaring a module is cheap; the instance is only built the first time a
+    connection accesses it, and it is dropped when the last connection releases it.
+    A declaration stays pending until the program that declared it calls prune,
+    so a module is never dropped between another program's declare and attach.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.declarations: Dict[str, MemoryModuleDeclaration] = {}
+        self.instances: Dict[str, MemoryModuleInstance] = {}
+        self.connection_modules: Dict[str, Set[str]] = {}
+        self.materializations = 0
+        self.unloads = 0
+
+    def declare(self, module_type: str, name: str, body: str) -> str:
+        """Register a memory_module declaration and return its fingerprint"""
+        fingerprint = module_fingerprint(module_type, name, body)
+        with self._lock:
+            if fingerprint not in self.declarations:
+                self.declarations[fingerprint] = MemoryModuleDeclaration(
+                    fingerprint=fingerprint,
+                    module_type=module_type,
+                    name=name,
+                    body=body,
+                    declared_at=time.time()
+                )
+            self.declarations[fingerprint].pending += 1
+        return fingerprint
+
+    def attach(self, fingerprint: str, connection_id: str):
+        """Take a reference on a declared module for a connection"""
+        with self._lock:
+            if fingerprint not in self.declarations:
+                raise KeyError(f"Unknown memory module: {fingerprint[:12]}")
+            self.declarations[fingerprint].connections.add(connection_id)
+            self.connection_modules.setdefault(connection_id, set()).add(fingerprint)
+
+    def get(self, fingerprint: str, connection_id: str) -> MemoryModuleInstance:
+        """Access a module from a connection, materializing it on first use"""
+        with self._lock:
+            declaration = self.declarations.get(fingerprint)
+            if declaration is None or connection_id not in declaration.connections:
+                raise KeyError(f"Memory module {fingerprint[:12]} is not attached to {connection_id}")
+
+            instance = self.instances.get(fingerprint)
+            if instance is None:
+                instance = self._materialize(declaration)
+                self.instances[fingerprint] = instance
+                self.materializations += 1
+                logger.info(f"Materialized memory module: {declaration.name} ({fingerprint[:12]})")
+            return instance
+
+    def release(self, fingerprint: str, connection_id: str):
+        """Drop a connection's reference; unload the module when nobody holds it"""
+        with self._lock:
+            declaration = self.declarations.get(fingerprint)
+            if declaration is None:
+                return
+            declaration.connections.discard(connection_id)
+            held = self.connection_modules.get(connection_id)
+            if held is not None:
+                held.discard(fingerprint)
+                if not held:
+                    del self.connection_modules[connection_id]
+
+            if not declaration.connections and not declaration.pending:
+                del self.declarations[fingerprint]
+                if self.instances.pop(fingerprint, None) is not None:
+                    self.unloads += 1
+                    logger.info(f"Unloaded memory module: {declaration.name} ({fingerprint[:12]})")
+
+    def release_connection(self, connection_id: str):
+        """Release every module held by a connection"""
+        with self._lock:
+            for fingerprint in list(self.connection_modules.get(connection_id, ())):
+                self.release(fingerprint, connection_id)
+
+    def find(self, connection_id: str, name: str) -> Optional[str]:
+        """Resolve a module name to the fingerprint attached to a connection"""
+        with self._lock:
+            for fingerprint in self.connection_modules.get(connection_id, ()):
+                if self.declarations[fingerprint].name == name:
+                    return fingerprint
+        return None
+
+    def prune(self, fingerprints: Iterable[str]):
+        """End a program's claim on the modules it declared, forgetting those nothing else holds"""
+        with self._lock:
+            for fingerprint in fingerprints:
+                declaration = self.declarations.get(fingerprint)
+                if declaration is None:
+                    continue
+                declaration.pending = max(0, declaration.pending - 1)
+                if not declaration.pending and not declaration.connections:
+                    del self.declarations[fingerprint]
+                    self.instances.pop(fingerprint, None)
+
+    def modules_for(self, connection_id: str) -> List[str]:
+        with self._lock:
+            return sorted(self.connection_modules.get(connection_id, ()))
+
+    def _materialize(self, declaration: MemoryModuleDeclaration) -> MemoryModuleInstance:
+        """Build the read-only runtime view of a module body"""
+        structure = {}
+        behavior = {}
+
+        for line in declaration.body.splitlines():
+            line = line.strip().strip('{}').strip()
+            if not line or line in ('structure', 'behavior', 'methods'):
+                continue
+            behavior_match = BEHAVIOR_PATTERN.match(line)
+            if behavior_match:
+                behavior[behavior_match.group(1)] = behavior_match.group(2).strip('"')
+                continue
+            field_match = FIELD_PATTERN.match(line)
+            if field_match:
+                structure[field_match.group(2)] = field_match.group(1)
+
+        return MemoryModuleInstance(
+            fingerprint=declaration.fingerprint,
+            module_type=declaration.module_type,
+            name=declaration.name,
+            structure=MappingProxyType(structure),
+            behavior=MappingProxyType(behavior),
+            materialized_at=time.time()
+        )
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get registry statistics"""
+        with self._lock:
+            return {
+                'declared_modules': len(self.declarations),
+                'loaded_modules': len(self.instances),
+                'attached_connections': len(self.connection_modules),
+                'references': sum(len(d.connections) for d in self.declarations.values()),
+                'materializations': self.materializations,
+                'unloads': self.unloads
+            }
+
+    def list_modules(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    'fingerprint': d.fingerprint,
+                    'module_type': d.module_type,
+                    'name': d.name,
+                    'references': len(d.connections),
+                    'loaded': d.fingerprint in self.instances
+                }
+                for d in self.declarations.values()
+            ]
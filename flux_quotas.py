@@ -0,0 +1,207 @@
+"""
+FLUX Quotas and Admission Control
+Per-client resource quotas and process-wide load shedding for the FLUX runtime
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, Optional, Iterable
+from dataclasses import dataclass, asdict
+import logging
+
+logger = logging.getLogger(__name__)
+
+RESOURCES = ('connections', 'memory_bytes', 'fingerprints')
+
+class QuotaExceededError(Exception):
+    """Raised when an allocation would take a principal over its quota"""
+
+    def __init__(self, principal: str, resource: str, limit: int, used: int, requested: int):
+        self.principal = principal
+        self.resource = resource
+        self.limit = limit
+        self.used = used
+        self.requested = requested
+        super().__init__(
+            f"Quota exceeded for {resource}: {principal} uses {used} of {limit}, requested {requested}"
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'principal': self.principal,
+            'resource': self.resource,
+            'limit': self.limit,
+            'used': self.used,
+            'requested': self.requested
+        }
+
+class AdmissionRejectedError(Exception):
+    """Raised when the process is over its memory or CPU budget"""
+
+    def __init__(self, reason: str, retry_after: int = 5):
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"Server busy: {reason}")
+
+@dataclass
+class QuotaLimits:
+    """Resource limits for one principal; 0 means unlimited"""
+    connections: int = 100
+    memory_bytes: int = 10 * 1024 * 1024
+    fingerprints: int = 1000
+
+    @classmethod
+    def from_env(cls) -> 'QuotaLimits':
+        return cls(
+            connections=int(os.getenv('FLUX_QUOTA_CONNECTIONS', cls.connections)),
+            memory_bytes=int(os.getenv('FLUX_QUOTA_MEMORY_BYTES', cls.memory_bytes)),
+            fingerprints=int(os.getenv('FLUX_QUOTA_FINGERPRINTS', cls.fingerprints))
+        )
+
+def load_api_key_limits() -> Dict[str, QuotaLimits]:
+    """Load per-API-key overrides from FLUX_API_KEY_QUOTAS (JSON object keyed by API key)"""
+    raw = os.getenv('FLUX_API_KEY_QUOTAS')
+    if not raw:
+        return {}
+    try:
+        return {key: QuotaLimits(**limits) for key, limits in json.loads(raw).items()}
+    except (ValueError, TypeError) as e:
+        logger.error(f"Invalid FLUX_API_KEY_QUOTAS: {e}")
+        return {}
+
+class QuotaManager:
+    """Counts resource usage per principal and enforces limits in O(1) per allocation.
+
+    A principal is a string such as "client:<sid>" or "key:<api key>"; one
+    allocation is charged to every principal of the caller at once.
+    """
+
+    def __init__(self, default_limits: Optional[QuotaLimits] = None,
+                 api_key_limits: Optional[Dict[str, QuotaLimits]] = None):
+        self.default_limits = default_limits or QuotaLimits.from_env()
+        self.api_key_limits = api_key_limits if api_key_limits is not None else load_api_key_limits()
+        self.usage: Dict[str, Dict[str, int]] = {}
+        self.rejections = 0
+        self._lock = threading.Lock()
+
+    def limits_for(self, principal: str) -> QuotaLimits:
+        if principal.startswith('key:'):
+            return self.api_key_limits.get(principal[4:], self.default_limits)
+        return self.default_limits
+
+    def acquire(self, principals: Iterable[str], resource: str, amount: int = 1):
+        """Charge an allocation to every principal, or raise without charging any"""
+        principals = tuple(principals)
+        with self._lock:
+            for principal in principals:
+                limit = getattr(self.limits_for(principal), resource)
+                used = self.usage.get(principal, {}).get(resource, 0)
+                if limit and used + amount > limit:
+                    self.rejections += 1
+                    raise QuotaExceededError(principal, resource, limit, used, amount)
+            for principal in principals:
+                counters = self.usage.setdefault(principal, {})
+                counters[resource] = counters.get(resource, 0) + amount
+
+    def release(self, principals: Iterable[str], resource: str, amount: int = 1):
+        """Return an allocation to every principal it was charged to"""
+        with self._lock:
+            for principal in principals:
+                counters = self.usage.get(principal)
+                if counters is None:
+                    continue
+                counters[resource] = max(0, counters.get(resource, 0) - amount)
+                if not any(counters.values()):
+                    del self.usage[principal]
+
+    def usage_for(self, principal: str) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.usage.get(principal, {}))
+        return {
+            'principal': principal,
+            'usage': {resource: counters.get(resource, 0) for resource in RESOURCES},
+            'limits': asdict(self.limits_for(principal))
+        }
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'principals': len(self.usage),
+                'rejections': self.rejections,
+                'default_limits': asdict(self.default_limits),
+                'api_key_overrides': len(self.api_key_limits)
+            }
+
+def process_rss_bytes() -> int:
+    """Resident set size of this process"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is the peak, in kilobytes on Linux; good enough as a fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class AdmissionController:
+    """Sheds new executions while the process is over its memory or CPU budget"""
+
+    def __init__(self, max_rss_bytes: int = 0, max_cpu_percent: float = 0.0, sample_interval: float = 1.0):
+        self.max_rss_bytes = max_rss_bytes
+        self.max_cpu_percent = max_cpu_percent
+        self.sample_interval = sample_interval
+        self.admitted = 0
+        self.shed = 0
+        self._lock = threading.Lock()
+        self._last_wall = time.monotonic()
+        self._last_cpu = time.process_time()
+        self._cpu_percent = 0.0
+
+    @classmethod
+    def from_env(cls) -> 'AdmissionController':
+        return cls(
+            max_rss_bytes=int(float(os.getenv('FLUX_MAX_RSS_MB', 0)) * 1024 * 1024),
+            max_cpu_percent=float(os.getenv('FLUX_MAX_CPU_PERCENT', 0))
+        )
+
+    def cpu_percent(self) -> float:
+        """Process CPU usage over the last sample interval, as a share of all cores"""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._last_wall
+            if elapsed >= self.sample_interval:
+                cpu = time.process_time()
+                self._cpu_percent = 100.0 * (cpu - self._last_cpu) / (elapsed * (os.cpu_count() or 1))
+                self._last_wall, self._last_cpu = now, cpu
+            return self._cpu_percent
+
+    def admit(self):
+        """Raise AdmissionRejectedError if the process is over budget"""
+        reason = None
+        if self.max_rss_bytes:
+            rss = process_rss_bytes()
+            if rss > self.max_rss_bytes:
+                reason = f"memory {rss // (1024 * 1024)}MB over budget {self.max_rss_bytes // (1024 * 1024)}MB"
+        if reason is None and self.max_cpu_percent:
+            cpu = self.cpu_percent()
+            if cpu > self.max_cpu_percent:
+                reason = f"CPU {cpu:.0f}% over budget {self.max_cpu_percent:.0f}%"
+
+        with self._lock:
+            if reason is None:
+                self.admitted += 1
+                return
+            self.shed += 1
+        logger.warning(f"Admission rejected: {reason}")
+        raise AdmissionRejectedError(reason)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            'rss_bytes': process_rss_bytes(),
+            'cpu_percent': round(self.cpu_percent(), 1),
+            'max_rss_bytes': self.max_rss_bytes,
+            'max_cpu_percent': self.max_cpu_percent,
+            'admitted': self.admitted,
+            'shed': self.shed
+        }
@@ -0,0 +1,86 @@
+"""
+LanternHive Cancellation
+Cancellation tokens that stop a query's queued and in-flight lantern calls
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import List, Optional, Callable
+import logging
+
+logger = logging.getLogger(__name__)
+
+class QueryCancelled(Exception):
+    """Raised when work is abandoned because its query was cancelled"""
+
+class CancellationToken:
+    """Set once, by whoever owns the query; checked by everything working on it.
+
+    future resolves on cancellation, so it can be passed to
+    concurrent.futures.wait alongside the futures being waited for.
+    """
+
+    def __init__(self):
+        self.future: Future = Future()
+        self.reason: Optional[str] = None
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.future.done()
+
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            if self.future.done():
+                return
+            self.reason = reason
+            self.future.set_result(reason)
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Cancellation callback failed: {e}")
+
+    def add_callback(self, callback: Callable[[], None]):
+        """Run callback on cancellation, or now if already cancelled"""
+        with self._lock:
+            if not self.future.done():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise QueryCancelled(f"Query {self.reason}")
+
+class CancellationGroup(CancellationToken):
+    """Cancelled once every member has cancelled, for work shared by several callers.
+
+    A member joining without a token can never cancel, so it keeps the work alive.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._members = 0
+        self._live = 0
+
+    def join(self, token: Optional[CancellationToken]):
+        with self._lock:
+            self._members += 1
+            self._live += 1
+        if token is not None:
+            token.add_callback(lambda: self.leave(token.reason or "cancelled"))
+
+    def leave(self, reason: str):
+        with self._lock:
+            self._live -= 1
+            everyone_left = self._live == 0
+        if everyone_left:
+            self.cancel(reason)
@@ -0,0 +1,242 @@
+"""
+LanternHive Cassettes
+Records chat-completion calls to a file and replays them, for deterministic end-to-end benchmarks
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Any, Optional, Iterator
+
+import logging
+
+from lantern_providers import LLMProvider, ProviderError
+
+logger = logging.getLogger(__name__)
+
+def request_key(model: str, messages: List[Dict], temperature: float) -> str:
+    """Everything that determines a completion, hashed"""
+    payload = json.dumps([model, messages, temperature], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class RecordingProvider(LLMProvider):
+    """Passes calls through to another provider, appending each request and response to a cassette.
+
+    A cassette is JSON lines. Each call records its chunks with the delay before
+    each one, so replay can reproduce time to first token and token rate, or an
+    error with its status.
+    """
+    name = "recording"
+
+    def __init__(self, inner: LLMProvider, path: str):
+        self.inner = inner
+        self.path = path
+        self._lock = threading.Lock()
+        self.stats = {'recorded': 0, 'errors': 0}
+
+    def write(self, record: Dict[str, Any]):
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as cassette:
+                cassette.write(json.dumps(record) + "\n")
+
+    def note_prompt(self, prompt: str, flux_context: Optional[Dict] = None):
+        """Record a top-level prompt, so a replay benchmark can run the same workload"""
+        self.write({'type': 'prompt', 'prompt': prompt, 'flux_context': flux_context or {}})
+
+    def stream(self, model: str, messages: List[Dict], temperature: float, timeout: float) -> Iterator[str]:
+        chunks = []
+        error = None
+        cut_off = False
+        last = time.monotonic()
+        try:
+            for text in self.inner.stream(model, messages, temperature, timeout):
+                now = time.monotonic()
+                chunks.append([round(now - last, 6), text])
+                last = now
+                yield text
+        except GeneratorExit:
+            # Closed by the caller, e.g. a losing hedge; a partial response is no recording
+            cut_off = True
+            raise
+        except Exception as e:
+            # Replayed as a ProviderError with the same status; timeouts and dropped connections as 504
+            status = getattr(e, 'status', None) or getattr(e, 'status_code', None) or 504
+            error = {'status': status, 'message': str(e), 'delay': round(time.monotonic() - last, 6)}
+            raise
+        finally:
+            if not cut_off and (error or chunks):
+                self.write({
+                    'type': 'call',
+                    'key': request_key(model, messages, temperature),
+                    'model': model,
+                    'messages': messages,
+                    'temperature': temperature,
+                    'chunks': chunks if error is None else [],
+                    'error': error
+                })
+                with self._lock:
+                    self.stats['recorded'] += 1
+                    self.stats['errors'] += int(error is not None)
+
+    def complete(self, model: str, messages: List[Dict], temperature: float, timeout: float) -> str:
+        return "".join(self.stream(model, messages, temperature, timeout))
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'provider': self.name, 'cassette': self.path, 'inner': self.inner.get_statistics(), **self.stats}
+
+class ReplayProvider(LLMProvider):
+    """Serves calls from a cassette, with the recorded latencies or none at all.
+
+    A request recorded several times replays its recordings in turn. A request
+    missing from the cassette fails with status 404, which is not retried.
+    """
+    name = "replay"
+
+    def __init__(self, path: str, latency: str = "recorded"):
+        if latency not in ("recorded", "zero"):
+            raise ValueError(f"Unknown replay latency: {latency}")
+        self.path = path
+        self.latency = latency
+        self.calls: Dict[str, List[Dict]] = {}
+        self.prompts: List[Dict] = []
+        self._turns: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.stats = {'replayed': 0, 'misses': 0}
+
+        with open(path, encoding='utf-8') as cassette:
+            for line in cassette:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record['type'] == 'prompt':
+                    self.prompts.append(record)
+                else:
+                    self.calls.setdefault(record['key'], []).append(record)
+
+    def next_recording(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            recordings = self.calls.get(key)
+            if not recordings:
+                self.stats['misses'] += 1
+                return None
+            turn = self._turns.get(key, 0)
+            self._turns[key] = turn + 1
+            self.stats['replayed'] += 1
+            return recordings[turn % len(recordings)]
+
+    def pause(self, delay: float):
+        if self.latency == "recorded" and delay > 0:
+            time.sleep(delay)
+
+    def stream(self, model: str, messages: List[Dict], temperature: float, timeout: float) -> Iterator[str]:
+        recording = self.next_recording(request_key(model, messages, temperature))
+        if recording is None:
+            raise ProviderError("No recording of this request in the cassette", status=404)
+        if recording['error']:
+            self.pause(min(recording['error']['delay'], timeout))
+            raise ProviderError(recording['error']['message'], status=recording['error']['status'])
+        for delay, text in recording['chunks']:
+            self.pause(delay)
+            yield text
+
+    def complete(self, model: str, messages: List[Dict], temperature: float, timeout: float) -> str:
+        return "".join(self.stream(model, messages, temperature, timeout))
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'provider': self.name,
+                'cassette': self.path,
+                'latency': self.latency,
+                'recordings': sum(len(recordings) for recordings in self.calls.values()),
+                **self.stats
+            }
+
+def cassette_provider(inner_factory, mode: str, path: str) -> LLMProvider:
+    """Wrap the provider inner_factory() builds for recording, or replace it for replay"""
+    if mode == "record":
+        return RecordingProvider(inner_factory(), path)
+    if mode == "replay":
+        return ReplayProvider(path, os.getenv('LANTERN_CASSETTE_LATENCY', 'recorded'))
+    raise ValueError(f"Unknown cassette mode: {mode}")
+
+def fresh_hive(provider: LLMProvider):
+    """A hive whose output depends only on the provider: no shared caches or persisted memory"""
+    from enhanced_lanternhive import FLUXLanternHive
+    from lantern_memory import DialogueMemory
+
+    hive = FLUXLanternHive(provider=provider)
+    # Archiva's memory changes its prompts, so every run must start from the same (empty) one
+    hive.memory = DialogueMemory(capacity=hive.memory.capacity)
+    return hive
+
+def run_prompt(hive, prompt: str, flux_context: Dict) -> Dict[str, Any]:
+    """One recorded or replayed dialogue.
+
+    Unbudgeted, so the plan is always the full dialogue: a budgeted plan follows
+    the live latencies, which differ between recording and replay, and a different
+    plan makes calls the cassette does not have.
+    """
+    return hive.process_prompt(prompt, flux_context, bypass_cache=True, priority="batch", budget=None)
+
+def record(path: str, prompts: List[str], inner: LLMProvider) -> Dict[str, Any]:
+    """Run prompts through a fresh hive, one at a time, recording every call"""
+    provider = RecordingProvider(inner, path)
+    hive = fresh_hive(provider)
+    for prompt in prompts:
+        provider.note_prompt(prompt)
+        run_prompt(hive, prompt, {})
+    return provider.get_statistics()
+
+def replay(path: str, runs: int = 5, latency: str = "zero") -> Dict[str, Any]:
+    """Replay a recorded workload runs times, timing process_prompt end to end"""
+    timings: List[float] = []
+    provider = None
+    for _ in range(runs):
+        provider = ReplayProvider(path, latency)
+        hive = fresh_hive(provider)
+        started = time.perf_counter()
+        for item in provider.prompts:
+            run_prompt(hive, item['prompt'], item['flux_context'])
+        timings.append(time.perf_counter() - started)
+
+    timings.sort()
+    return {
+        'runs': runs,
+        'prompts': len(provider.prompts) if provider else 0,
+        'latency': latency,
+        'min': round(timings[0], 4),
+        'median': round(timings[len(timings) // 2], 4),
+        'max': round(timings[-1], 4),
+        'last_run': provider.get_statistics() if provider else None
+    }
+
+if __name__ == "__main__":
+    # Record against the configured provider, then benchmark the orchestration offline:
+    #   python lantern_cassette.py record dialogues.jsonl "Design a FLUX connection" ...
+    #   python lantern_cassette.py replay dialogues.jsonl --runs 10 --latency zero
+    import argparse
+
+    from lantern_providers import backend_provider
+
+    parser = argparse.ArgumentParser(description="Record and replay LanternHive dialogues")
+    parser.add_argument('mode', choices=['record', 'replay'])
+    parser.add_argument('cassette')
+    parser.add_argument('prompts', nargs='*', help="prompts to record")
+    parser.add_argument('--prompts-file', help="file with one prompt per line to record")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--latency', choices=['recorded', 'zero'], default='zero')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.mode == 'record':
+        prompts = list(args.prompts)
+        if args.prompts_file:
+            with open(args.prompts_file, encoding='utf-8') as handle:
+                prompts.extend(line.strip() for line in handle if line.strip())
+        print(json.dumps(record(args.cassette, prompts, backend_provider(os.getenv('OPENAI_API_KEY'))), indent=2))
+    else:
+        print(json.dumps(replay(args.cassette, args.runs, args.latency), indent=2))
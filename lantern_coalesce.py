@@ -0,0 +1,122 @@
+"""
+LanternHive Request Coalescing
+Single-flight execution of identical concurrent prompts
+"""
+
+import copy
+import hashlib
+import json
+import re
+import threading
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from typing import Dict, List, Any, Optional, Callable, Tuple
+import logging
+
+from lantern_cancellation import CancellationToken, CancellationGroup
+
+logger = logging.getLogger(__name__)
+
+class Flight:
+    """One in-flight computation shared by a leader and any followers"""
+
+    def __init__(self):
+        self.future: Future = Future()
+        self.events: List[Dict] = []
+        self.subscribers: List[Callable[[Dict], None]] = []
+        self.followers = 0
+        # Whether any event has reached a listener, live or replayed; a subscriber
+        # returning False has only passed it on to nobody
+        self.delivered = False
+        # Cancelled only once every caller sharing the flight has cancelled
+        self.cancellation = CancellationGroup()
+        self._lock = threading.Lock()
+
+    def subscribe(self, on_event: Optional[Callable[[Dict], None]]):
+        """Replay the events published so far, then receive the rest as they happen"""
+        if on_event is None:
+            return
+        with self._lock:
+            for event in self.events:
+                if on_event(event) is not False:
+                    self.delivered = True
+            self.subscribers.append(on_event)
+
+    def publish(self, event: Dict) -> bool:
+        """Send event to every subscriber; returns whether any event has reached a listener yet"""
+        with self._lock:
+            self.events.append(event)
+            subscribers = list(self.subscribers)
+        for on_event in subscribers:
+            try:
+                if on_event(event) is not False:
+                    self.delivered = True
+            except Exception as e:
+                logger.warning(f"Coalesced stream subscriber failed: {e}")
+        return self.delivered
+
+class SingleFlight:
+    """Runs at most one computation per key; concurrent callers with the same key share it"""
+
+    def __init__(self):
+        self._flights: Dict[str, Flight] = {}
+        self._lock = threading.Lock()
+        self.stats = {'leaders': 0, 'followers': 0}
+
+    @staticmethod
+    def make_key(prompt: str, context: Optional[Dict] = None) -> str:
+        """Hash a prompt with insignificant whitespace and case removed, plus its context"""
+        normalized = re.sub(r'\s+', ' ', prompt).strip().casefold()
+        payload = json.dumps([normalized, context or {}], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def run(self, key: str, compute: Callable[[Callable[[Dict], None], CancellationToken], Any],
+            on_event: Optional[Callable[[Dict], None]] = None,
+            cancel_token: Optional[CancellationToken] = None) -> Tuple[Any, bool]:
+        """Return (result, shared). compute(publish, cancellation) runs only in the leader;
+        its published events reach every subscriber, including followers who join late.
+
+        cancellation is set once every caller's cancel_token has been; a follower whose
+        own token is cancelled stops waiting straight away with QueryCancelled.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            # A flight everyone has abandoned is winding down; start afresh instead of joining it
+            leader = flight is None or flight.cancellation.cancelled
+            if leader:
+                flight = self._flights[key] = Flight()
+                self.stats['leaders'] += 1
+            else:
+                flight.followers += 1
+                self.stats['followers'] += 1
+            flight.cancellation.join(cancel_token)
+        flight.subscribe(on_event)
+
+        if not leader:
+            if cancel_token is not None:
+                wait([flight.future, cancel_token.future], return_when=FIRST_COMPLETED)
+                if not flight.future.done():
+                    cancel_token.raise_if_cancelled()
+            # Followers get their own copy so nobody mutates the leader's result
+            return copy.deepcopy(flight.future.result()), True
+
+        try:
+            result = compute(flight.publish, flight.cancellation)
+            flight.future.set_result(result)
+            return result, False
+        except BaseException as e:
+            flight.future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            if flight.followers:
+                logger.info(f"Coalesced {flight.followers} identical request(s) into one")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'in_flight': len(self._flights),
+                'leaders': self.stats['leaders'],
+                'followers': self.stats['followers']
+            }
@@ -0,0 +1,91 @@
+"""
+LanternHive Context Assembly
+Per-lantern budget allocation and extractive summaries for dialogue prompts
+"""
+
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from lantern_tokens import estimate_tokens, content_words
+
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+|\n+")
+
+def allocate_budget(demands: Dict[str, int], budget: int) -> Dict[str, int]:
+    """Split a token budget between contributors, max-min fair.
+
+    Short contributions get everything they need; the rest share what is left
+    equally, so one long answer cannot crowd out the others.
+    """
+    allocation = {key: 0 for key in demands}
+    remaining = dict(demands)
+    left = budget
+    while remaining and left > 0:
+        share = left // len(remaining)
+        if share == 0:
+            break
+        satisfied = {key: need for key, need in remaining.items() if need <= share}
+        if not satisfied:
+            for key in remaining:
+                allocation[key] = share
+            left -= share * len(remaining)
+            break
+        for key, need in satisfied.items():
+            allocation[key] = need
+            left -= need
+            del remaining[key]
+    return allocation
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in SENTENCE_PATTERN.split(text) if sentence.strip()]
+
+def summarize(text: str, max_tokens: int) -> str:
+    """Extractive summary within max_tokens: the highest-scoring sentences, in original order.
+
+    Sentences score by the document frequency of their content words, with a bonus
+    for the opening sentence, which usually states the point.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+
+    sentences = split_sentences(text)
+    words = [content_words(sentence) for sentence in sentences]
+    frequency = Counter(word for sentence_words in words for word in set(sentence_words))
+
+    scored: List[Tuple[float, int]] = []
+    for index, sentence_words in enumerate(words):
+        score = sum(frequency[word] for word in sentence_words) / (len(sentence_words) ** 0.5 or 1)
+        if index == 0:
+            score *= 1.5
+        scored.append((score, index))
+
+    chosen = []
+    used = 0
+    for _, index in sorted(scored, reverse=True):
+        cost = estimate_tokens(sentences[index])
+        if used + cost <= max_tokens:
+            chosen.append(index)
+            used += cost
+
+    if not chosen:
+        # Even the best sentence is too long: keep as many of its leading tokens as fit
+        kept = []
+        for word in sentences[max(scored)[1]].split():
+            used += estimate_tokens(word)
+            if used > max_tokens:
+                break
+            kept.append(word)
+        return " ".join(kept) + " …"
+
+    return " ".join(sentences[index] for index in sorted(chosen))
+
+def build_digest(contributions: List[Tuple[str, str]], budget: int) -> List[Tuple[str, str]]:
+    """Fit labelled contributions into a total token budget, summarizing the ones over their share"""
+    demands = {index: estimate_tokens(text) for index, (_, text) in enumerate(contributions)}
+    allocation = allocate_budget(demands, budget)
+    return [
+        (label, summarize(text, allocation[index]))
+        for index, (label, text) in enumerate(contributions)
+    ]
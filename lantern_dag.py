@@ -0,0 +1,146 @@
+"""
+LanternHive Dialogue DAG
+Runs a dialogue as a dependency graph of lantern calls, firing each call as soon as its inputs are ready
+"""
+
+import time
+from concurrent.futures import Executor, wait, FIRST_COMPLETED
+from typing import Dict, List, Any, Optional, Callable
+from dataclasses import dataclass, field
+import logging
+
+from lantern_cancellation import CancellationToken
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class DialogueNode:
+    """One lantern call; build_prompt receives the results of its dependencies by node id"""
+    node_id: str
+    lantern_id: str
+    phase: str
+    build_prompt: Callable[[Dict[str, Any]], str]
+    depends_on: List[str] = field(default_factory=list)
+    skip_if: Optional[Callable[[Dict[str, Any]], bool]] = None
+    skipped: bool = False
+    result: Any = None
+    started: Optional[float] = None
+    finished: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+class DialogueDAG:
+    """A dependency graph of lantern calls, executed on a shared thread pool"""
+
+    def __init__(self):
+        self.nodes: Dict[str, DialogueNode] = {}
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def add(self, node: DialogueNode) -> DialogueNode:
+        missing = [dep for dep in node.depends_on if dep not in self.nodes]
+        if missing:
+            raise ValueError(f"Node {node.node_id} depends on unknown nodes: {missing}")
+        self.nodes[node.node_id] = node
+        return node
+
+    def run(self, call: Callable[[DialogueNode, str], Any], executor: Executor,
+            max_concurrency: int, timeout: float, on_timeout: Callable[[DialogueNode], Any],
+            cancel_token: Optional[CancellationToken] = None):
+        """Execute every node, at most max_concurrency at a time, each as soon as its dependencies finish.
+
+        call(node, prompt) returns the node's result; a call still running after
+        timeout seconds is abandoned and its result is on_timeout(node). Once
+        cancel_token is cancelled no further node starts, queued calls are dropped
+        and the run returns with the unfinished nodes left without results.
+        """
+        self.started = time.monotonic()
+        waiting = dict(self.nodes)
+        ready: List[DialogueNode] = []
+        pending = {}
+
+        def release_ready():
+            for node_id, node in list(waiting.items()):
+                if all(self.nodes[dep].finished is not None for dep in node.depends_on):
+                    ready.append(waiting.pop(node_id))
+
+        def submit(node: DialogueNode):
+            # Skipped nodes pass nothing on: dependents see only the results that exist
+            dependencies = {
+                dep: self.nodes[dep].result for dep in node.depends_on if not self.nodes[dep].skipped
+            }
+            node.started = time.monotonic()
+            if node.skip_if is not None and node.skip_if(dependencies):
+                node.skipped = True
+                node.finished = node.started
+                return
+            future = executor.submit(call, node, node.build_prompt(dependencies))
+            pending[future] = (node, node.started + timeout)
+
+        release_ready()
+        while ready or pending:
+            if cancel_token is not None and cancel_token.cancelled:
+                for future in pending:
+                    future.cancel()
+                break
+            while ready and len(pending) < max_concurrency:
+                submit(ready.pop(0))
+                release_ready()
+            if not pending:
+                continue
+
+            next_deadline = min(deadline for _, deadline in pending.values())
+            watched = set(pending) | ({cancel_token.future} if cancel_token is not None else set())
+            done, _ = wait(watched, timeout=max(0.0, next_deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+
+            for future in list(pending):
+                node, deadline = pending[future]
+                if future in done:
+                    node.result = future.result()
+                elif now >= deadline:
+                    future.cancel()
+                    node.result = on_timeout(node)
+                else:
+                    continue
+                node.finished = now
+                del pending[future]
+            release_ready()
+
+        self.finished = time.monotonic()
+
+    def critical_path(self) -> List[DialogueNode]:
+        """The chain of calls that determined total latency: from the last node to
+        finish, repeatedly step to the dependency that finished last"""
+        finished = [node for node in self.nodes.values() if node.finished is not None and not node.skipped]
+        if not finished:
+            return []
+        node = max(finished, key=lambda candidate: candidate.finished)
+        path = [node]
+        while True:
+            dependencies = [self.nodes[dep] for dep in node.depends_on if not self.nodes[dep].skipped]
+            if not dependencies:
+                break
+            node = max(dependencies, key=lambda dep: dep.finished)
+            path.append(node)
+        return list(reversed(path))
+
+    def critical_path_report(self) -> Dict[str, Any]:
+        path = self.critical_path()
+        return {
+            "total_seconds": round((self.finished or 0.0) - (self.started or 0.0), 3),
+            "path": [
+                {
+                    "node": node.node_id,
+                    "lantern": node.lantern_id,
+                    "phase": node.phase,
+                    "start": round(node.started - self.started, 3),
+                    "seconds": round(node.duration, 3)
+                }
+                for node in path
+            ]
+        }
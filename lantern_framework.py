@@ -11,6 +11,7 @@ from dataclasses import dataclass, field
 from enum import Enum
 import asyncio
 from datetime import datetime
+from keyword_router import KeywordRouter
 
 class DomainType(Enum):
     """AGI15 Domain Types"""
@@ -529,6 +530,14 @@ class BrackRosettaStone:
         
         return expression
 
+# Keywords that call a Warden lantern narration, and Brack code, into a response
+NARRATION_ROUTER = KeywordRouter({
+    "forge": ["create", "build"],
+    "pool": ["analyze", "understand"],
+    "grove": ["help", "guide"],
+    "brack": ["brack", "["]
+})
+
 class LanternFramework:
     """Main Lantern Framework Integration"""
     
@@ -599,17 +608,18 @@ class LanternFramework:
         lantern_responses = []
         
         # Generate lantern responses based on input
-        if "create" in user_input.lower() or "build" in user_input.lower():
+        matched = NARRATION_ROUTER.match(user_input)
+        if "forge" in matched:
             lantern_responses.append(
                 self.warden_reality.create_lantern_narration("🔥", "The forge is hot — let's build something amazing!")
             )
         
-        if "analyze" in user_input.lower() or "understand" in user_input.lower():
+        if "pool" in matched:
             lantern_responses.append(
                 self.warden_reality.create_lantern_narration("💧", "The pool ripples with insights... let us trace the patterns together.")
             )
         
-        if "help" in user_input.lower() or "guide" in user_input.lower():
+        if "grove" in matched:
             lantern_responses.append(
                 self.warden_reality.create_lantern_narration("🌿", "The Grove stirs as you speak. I can help you find your path.")
             )
@@ -618,7 +628,7 @@ class LanternFramework:
             result["warden_synthesis"] = self.warden_reality.create_reality_frame(user_input, lantern_responses)
         
         # Step 5: Brack Execution (if applicable)
-        if "brack" in user_input.lower() or "[" in user_input:
+        if "brack" in matched:
             # Extract potential Brack code
             brack_match = re.search(r'\[.*?\]', user_input)
             if brack_match:
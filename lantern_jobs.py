@@ -0,0 +1,206 @@
+"""
+LanternHive Jobs
+Runs long LanternHive queries in the background on a bounded pool, for polling or streaming
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, Callable
+import logging
+
+from lantern_cancellation import CancellationToken
+
+logger = logging.getLogger(__name__)
+
+# Job states; the last three are final
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINAL_STATES = frozenset({SUCCEEDED, FAILED, CANCELLED})
+
+class JobQueueFullError(Exception):
+    """Raised when no more jobs can be queued"""
+
+    def __init__(self, depth: int, retry_after: int = 5):
+        self.depth = depth
+        self.retry_after = retry_after
+        super().__init__(f"LanternHive job queue is full ({depth} queued)")
+
+@dataclass
+class LanternJob:
+    """One background query; params are the arguments for the job runner"""
+    job_id: str
+    params: Dict[str, Any]
+    status: str = QUEUED
+    submitted: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    future: Optional[Future] = None
+    cancel_token: CancellationToken = field(default_factory=CancellationToken)
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINAL_STATES
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            'job_id': self.job_id,
+            'status': self.status,
+            'submitted': self.submitted,
+            'started': self.started,
+            'finished': self.finished,
+            'wait_seconds': round((self.started or self.finished or time.time()) - self.submitted, 3)
+        }
+        if self.error:
+            data['error'] = self.error
+        if include_result and self.result is not None:
+            data['result'] = self.result
+        return data
+
+class JobManager:
+    """Queues jobs on a fixed-size pool and keeps their results for ttl seconds after they finish.
+
+    run(params, on_token, cancel_token) performs one job. notify(job_id, event_name, payload),
+    when given, receives status changes ('lantern_job') and streamed chunks ('lantern_stream').
+    Cancelling a queued job stops it from starting; a running job has its cancel_token
+    cancelled, which stops its pending lantern calls.
+    """
+
+    def __init__(self, run: Callable[[Dict[str, Any], Optional[Callable[[Dict], None]], CancellationToken],
+                                     Dict[str, Any]],
+                 notify: Optional[Callable[[str, str, Dict], None]] = None,
+                 max_workers: int = 4, max_queued: int = 100, ttl: float = 3600.0):
+        self.run = run
+        self.notify = notify
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='lantern-job')
+        self._jobs: "OrderedDict[str, LanternJob]" = OrderedDict()
+        self._waits = deque(maxlen=500)
+        self._lock = threading.RLock()
+        self.stats = {'submitted': 0, 'succeeded': 0, 'failed': 0, 'cancelled': 0, 'expired': 0, 'rejected': 0}
+
+    @classmethod
+    def from_env(cls, run: Callable, notify: Optional[Callable] = None) -> 'JobManager':
+        return cls(
+            run, notify,
+            max_workers=int(os.getenv('LANTERN_JOB_WORKERS', 4)),
+            max_queued=int(os.getenv('LANTERN_JOB_QUEUE_LIMIT', 100)),
+            ttl=float(os.getenv('LANTERN_JOB_TTL', 3600))
+        )
+
+    def submit(self, params: Dict[str, Any]) -> LanternJob:
+        self.expire()
+        with self._lock:
+            depth = self.queue_depth()
+            if self.max_queued and depth >= self.max_queued:
+                self.stats['rejected'] += 1
+                raise JobQueueFullError(depth)
+            job = LanternJob(job_id=str(uuid.uuid4()), params=params)
+            self._jobs[job.job_id] = job
+            self.stats['submitted'] += 1
+            job.future = self.executor.submit(self.execute, job)
+        return job
+
+    def execute(self, job: LanternJob):
+        with self._lock:
+            if job.status != QUEUED:
+                return
+            job.status = RUNNING
+            job.started = time.time()
+            self._waits.append(job.started - job.submitted)
+        self.publish(job)
+
+        on_token = None
+        if self.notify:
+            def on_token(event: Dict):
+                if job.status == RUNNING:
+                    self.notify(job.job_id, 'lantern_stream', {'job_id': job.job_id, **event})
+
+        try:
+            result, error = self.run(job.params, on_token, job.cancel_token), None
+        except Exception as e:
+            logger.error(f"LanternHive job {job.job_id} failed: {e}")
+            result, error = None, str(e)
+
+        with self._lock:
+            job.finished = time.time()
+            if job.status == CANCELLED:
+                return
+            if error is None:
+                job.status, job.result = SUCCEEDED, result
+            else:
+                job.status, job.error = FAILED, error
+            self.stats[job.status] += 1
+        self.publish(job)
+
+    def publish(self, job: LanternJob):
+        if self.notify:
+            try:
+                self.notify(job.job_id, 'lantern_job', job.to_dict())
+            except Exception as e:
+                logger.warning(f"LanternHive job notification failed: {e}")
+
+    def get(self, job_id: str) -> Optional[LanternJob]:
+        self.expire()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[LanternJob]:
+        """Cancel a job that has not finished; returns the job, or None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.done:
+                return job
+            if job.future is not None:
+                job.future.cancel()
+            job.cancel_token.cancel("cancelled")
+            job.status = CANCELLED
+            job.finished = time.time()
+            self.stats['cancelled'] += 1
+        self.publish(job)
+        return job
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status == QUEUED)
+
+    def expire(self) -> int:
+        """Forget finished jobs older than the TTL; jobs are kept in submission order"""
+        cutoff = time.time() - self.ttl
+        expired = 0
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if job.submitted >= cutoff:
+                    break
+                if job.done and job.finished < cutoff:
+                    del self._jobs[job_id]
+                    expired += 1
+            self.stats['expired'] += expired
+        return expired
+
+    def get_statistics(self) -> Dict[str, Any]:
+        self.expire()
+        with self._lock:
+            jobs = list(self._jobs.values())
+            waits = sorted(self._waits)
+            now = time.time()
+            queued = [job for job in jobs if job.status == QUEUED]
+            return {
+                'workers': self.max_workers,
+                'max_queued': self.max_queued,
+                'ttl': self.ttl,
+                'queue_depth': len(queued),
+                'running': sum(1 for job in jobs if job.status == RUNNING),
+                'retained': len(jobs),
+                'oldest_queued_seconds': round(max((now - job.submitted for job in queued), default=0.0), 3),
+                'wait_p50': round(waits[len(waits) // 2], 3) if waits else None,
+                'wait_p95': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else None,
+                **self.stats
+            }
@@ -0,0 +1,184 @@
+"""
+LanternHive Long-Term Memory
+Past dialogue syntheses indexed by prompt embedding, in memory-mapped NumPy matrices, for Archiva
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+import numpy as np
+import logging
+
+from lantern_coalesce import SingleFlight
+from lantern_semantic_cache import embed
+
+logger = logging.getLogger(__name__)
+
+# Set bits per byte value, for Hamming distances between packed sign sketches
+POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+class DialogueMemory:
+    """A ring of remembered dialogues, searched approximately by embedding.
+
+    Each prompt embedding is kept twice: as float32 and as a packed sign sketch
+    (one bit per dimension, 32x smaller). A search ranks every sketch by Hamming
+    distance, which tracks angle, then scores only the closest candidates
+    against the full vectors. With a directory both matrices are memory-mapped
+    .npy files and the texts live in SQLite, so memory survives restarts and
+    the OS pages in only the rows a search touches; without one, everything is
+    held in process.
+
+    Every dialogue belongs to a scope, such as the client that ran it, and is only
+    ever recalled within that scope. A prompt is remembered once per scope, with
+    its latest synthesis, and is never recalled for itself: asking the same
+    question again sees the same memories as the first time.
+    """
+
+    def __init__(self, capacity: int = 10000, dim: int = 512, directory: Optional[str] = None,
+                 candidates: int = 64):
+        self.capacity = capacity
+        self.dim = dim
+        self.directory = directory
+        self.candidates = candidates
+        self._lock = threading.Lock()
+        self.stats = {'stores': 0, 'refreshes': 0, 'searches': 0, 'recalled': 0}
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.vectors = self.open_matrix(os.path.join(directory, "vectors.npy"), np.float32, dim)
+            self.sketches = self.open_matrix(os.path.join(directory, "sketches.npy"), np.uint8, dim // 8)
+            self._db = sqlite3.connect(os.path.join(directory, "memory.sqlite3"), check_same_thread=False)
+        else:
+            self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+            self.sketches = np.zeros((capacity, dim // 8), dtype=np.uint8)
+            self._db = sqlite3.connect(":memory:", check_same_thread=False)
+
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS dialogues ("
+            "slot INTEGER PRIMARY KEY, prompt TEXT NOT NULL, synthesis TEXT NOT NULL, created_at REAL NOT NULL, "
+            "scope TEXT, prompt_key TEXT)"
+        )
+        # Dialogues remembered before scoping have no scope, so nobody recalls them
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(dialogues)")}
+        for column in ("scope", "prompt_key"):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE dialogues ADD COLUMN {column} TEXT")
+        self._db.commit()
+        self.size, newest = self._db.execute("SELECT COUNT(*), MAX(created_at) FROM dialogues").fetchone()
+        self.cursor = 0
+        if newest is not None:
+            slot = self._db.execute("SELECT slot FROM dialogues WHERE created_at = ?", (newest,)).fetchone()[0]
+            self.cursor = (slot + 1) % capacity
+
+        # Which slots each scope owns, and the slot holding each (scope, prompt)
+        self.owners: List[Optional[Tuple[str, str]]] = [None] * capacity
+        self.scope_slots: Dict[str, Set[int]] = {}
+        self.slots: Dict[Tuple[str, str], int] = {}
+        for slot, scope, prompt_key in self._db.execute("SELECT slot, scope, prompt_key FROM dialogues"):
+            if scope is not None:
+                self.claim(slot, scope, prompt_key)
+
+    def claim(self, slot: int, scope: str, prompt_key: str):
+        """Record that slot now holds scope's dialogue for prompt_key, forgetting its previous owner"""
+        previous = self.owners[slot]
+        if previous is not None:
+            self.scope_slots[previous[0]].discard(slot)
+            if self.slots.get(previous) == slot:
+                del self.slots[previous]
+        self.owners[slot] = (scope, prompt_key)
+        self.scope_slots.setdefault(scope, set()).add(slot)
+        self.slots[(scope, prompt_key)] = slot
+
+    def open_matrix(self, path: str, dtype, width: int) -> np.ndarray:
+        """Memory-map an existing matrix of the right shape, or create a fresh one"""
+        shape = (self.capacity, width)
+        if os.path.exists(path):
+            matrix = np.load(path, mmap_mode="r+")
+            if matrix.shape == shape and matrix.dtype == dtype:
+                return matrix
+            logger.warning(f"Discarding {path}: shape {matrix.shape} does not match {shape}")
+            del matrix
+            # The rows no longer line up with the stored texts
+            database = os.path.join(self.directory, "memory.sqlite3")
+            if os.path.exists(database):
+                os.remove(database)
+        return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
+    def remember(self, prompt: str, synthesis: str, scope: str):
+        """Store a finished dialogue for scope, overwriting the oldest once the ring is full.
+
+        A prompt scope has already asked only has its synthesis refreshed.
+        """
+        prompt_key = SingleFlight.make_key(prompt)
+        with self._lock:
+            slot = self.slots.get((scope, prompt_key))
+            if slot is not None:
+                self._db.execute("UPDATE dialogues SET synthesis = ? WHERE slot = ?", (synthesis, slot))
+                self._db.commit()
+                self.stats['refreshes'] += 1
+                return
+
+            vector = embed(prompt, self.dim)
+            slot = self.cursor
+            self.vectors[slot] = vector
+            self.sketches[slot] = np.packbits(vector > 0)
+            self._db.execute(
+                "INSERT OR REPLACE INTO dialogues (slot, prompt, synthesis, created_at, scope, prompt_key) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (slot, prompt, synthesis, time.time(), scope, prompt_key)
+            )
+            self._db.commit()
+            if isinstance(self.vectors, np.memmap):
+                self.vectors.flush()
+                self.sketches.flush()
+            self.claim(slot, scope, prompt_key)
+            self.cursor = (slot + 1) % self.capacity
+            self.size = min(self.size + 1, self.capacity)
+            self.stats['stores'] += 1
+
+    def recall(self, prompt: str, scope: str, k: int = 3, min_similarity: float = 0.3) -> List[Dict[str, Any]]:
+        """Up to k of scope's past dialogues most similar to prompt, most similar first, never prompt's own"""
+        query = embed(prompt, self.dim)
+        with self._lock:
+            self.stats['searches'] += 1
+            own = self.slots.get((scope, SingleFlight.make_key(prompt)))
+            eligible = np.array(sorted(self.scope_slots.get(scope, set()) - {own}), dtype=np.int64)
+            if not len(eligible):
+                return []
+            if len(eligible) > self.candidates:
+                distances = POPCOUNT[np.bitwise_xor(self.sketches[eligible], np.packbits(query > 0))].sum(axis=1)
+                candidates = eligible[np.argpartition(distances, self.candidates)[:self.candidates]]
+            else:
+                candidates = eligible
+            similarities = self.vectors[candidates] @ query
+            order = np.argsort(-similarities)[:k]
+            chosen = [(int(candidates[i]), float(similarities[i])) for i in order if similarities[i] >= min_similarity]
+
+            recalled = []
+            for slot, similarity in chosen:
+                row = self._db.execute(
+                    "SELECT prompt, synthesis, created_at FROM dialogues WHERE slot = ?", (slot,)
+                ).fetchone()
+                if row is not None:
+                    recalled.append({
+                        'prompt': row[0],
+                        'synthesis': row[1],
+                        'created_at': row[2],
+                        'similarity': round(similarity, 4)
+                    })
+            self.stats['recalled'] += len(recalled)
+            return recalled
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': self.size,
+                'capacity': self.capacity,
+                'dim': self.dim,
+                'scopes': sum(1 for slots in self.scope_slots.values() if slots),
+                'persistent': self.directory is not None,
+                **self.stats
+            }
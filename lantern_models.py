@@ -0,0 +1,147 @@
+"""
+LanternHive Model Routing
+Chooses the model for each lantern call by bloom level, lantern and phase, and tracks how each route performs
+"""
+
+import json
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+ROUTE_FIELDS = ("bloom_level", "lantern", "phase")
+
+@dataclass
+class ModelRoute:
+    """Serves model to calls matching every field given; an empty field matches anything"""
+    model: str
+    bloom_level: List[int] = field(default_factory=list)
+    lantern: List[str] = field(default_factory=list)
+    phase: List[str] = field(default_factory=list)
+    name: str = ""
+
+    def __post_init__(self):
+        if not self.name:
+            parts = [f"{key}={','.join(str(value) for value in getattr(self, key))}"
+                     for key in ROUTE_FIELDS if getattr(self, key)]
+            self.name = "/".join(parts) or "default"
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ModelRoute':
+        if not data.get("model"):
+            raise ValueError(f"Model route without a model: {data}")
+        unknown = set(data) - set(ROUTE_FIELDS) - {"model", "name"}
+        if unknown:
+            raise ValueError(f"Unknown model route fields: {sorted(unknown)}")
+        # Single values and lists are both accepted
+        listed = {
+            key: value if isinstance(value, list) else [value]
+            for key, value in data.items() if key in ROUTE_FIELDS
+        }
+        return cls(model=data["model"], name=data.get("name", ""), **listed)
+
+    @property
+    def specificity(self) -> int:
+        return sum(1 for key in ROUTE_FIELDS if getattr(self, key))
+
+    def matches(self, bloom_level: Optional[int], lantern_id: str, phase: str) -> bool:
+        return ((not self.bloom_level or bloom_level in self.bloom_level)
+                and (not self.lantern or lantern_id in self.lantern)
+                and (not self.phase or phase in self.phase))
+
+class ModelRouter:
+    """A routing table of models; the most specific matching route wins, then the earliest listed.
+
+    Calls no route matches use default_model. Each route keeps recent latencies,
+    completion sizes, error counts and a quality score: how closely its answers
+    track the hive's consensus (the synthesis, or the other lanterns' answers).
+    """
+
+    def __init__(self, default_model: str, routes: Optional[List[ModelRoute]] = None, window: int = 200):
+        self.default_model = default_model
+        # Stable sort keeps listed order among equally specific routes
+        self.routes = sorted(routes or [], key=lambda route: -route.specificity)
+        self.window = window
+        self._stats: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, default_model: str) -> 'ModelRouter':
+        """Routes from LANTERN_MODEL_ROUTES (a JSON list) or the JSON file at LANTERN_MODEL_ROUTES_FILE"""
+        raw = os.getenv('LANTERN_MODEL_ROUTES')
+        path = os.getenv('LANTERN_MODEL_ROUTES_FILE')
+        if not raw and path:
+            with open(path, encoding='utf-8') as handle:
+                raw = handle.read()
+        routes = [ModelRoute.from_dict(item) for item in json.loads(raw)] if raw else []
+        return cls(default_model, routes)
+
+    def route(self, bloom_level: Optional[int], lantern_id: str, phase: str) -> Tuple[str, str]:
+        """(route name, model) for one call"""
+        for route in self.routes:
+            if route.matches(bloom_level, lantern_id, phase):
+                return route.name, route.model
+        return "default", self.default_model
+
+    def models(self) -> List[str]:
+        """Every model the table can serve, the default first"""
+        return list(dict.fromkeys([self.default_model] + [route.model for route in self.routes]))
+
+    def entry(self, route: str, model: str) -> Dict[str, Any]:
+        return self._stats.setdefault((route, model), {
+            'calls': 0,
+            'errors': 0,
+            'latencies': deque(maxlen=self.window),
+            'tokens': deque(maxlen=self.window),
+            'quality': deque(maxlen=self.window)
+        })
+
+    def record(self, route: str, model: str, seconds: float, tokens: int = 0, error: bool = False):
+        with self._lock:
+            stats = self.entry(route, model)
+            stats['calls'] += 1
+            if error:
+                stats['errors'] += 1
+            else:
+                stats['latencies'].append(seconds)
+                stats['tokens'].append(tokens)
+
+    def record_quality(self, route: str, model: str, score: float):
+        with self._lock:
+            self.entry(route, model)['quality'].append(score)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        def mean(values) -> Optional[float]:
+            return round(sum(values) / len(values), 3) if values else None
+
+        def percentile(values, q: float) -> Optional[float]:
+            ordered = sorted(values)
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * q / 100.0))], 3) if ordered else None
+
+        with self._lock:
+            usage = [
+                {
+                    'route': route,
+                    'model': model,
+                    'calls': stats['calls'],
+                    'error_rate': round(stats['errors'] / stats['calls'], 3) if stats['calls'] else 0.0,
+                    'latency_p50': percentile(stats['latencies'], 50),
+                    'latency_p95': percentile(stats['latencies'], 95),
+                    'mean_completion_tokens': mean(stats['tokens']),
+                    'quality': mean(stats['quality'])
+                }
+                for (route, model), stats in self._stats.items()
+            ]
+        return {
+            'default_model': self.default_model,
+            'routes': [
+                {'name': route.name, 'model': route.model,
+                 **{key: getattr(route, key) for key in ROUTE_FIELDS if getattr(route, key)}}
+                for route in self.routes
+            ],
+            'usage': usage
+        }
@@ -0,0 +1,271 @@
+"""
+LanternHive Budget Planning
+Fits each dialogue's lanterns, phases and models to a request's latency and token budget
+"""
+
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Any, Optional, Tuple, Callable
+import logging
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class RequestBudget:
+    """Limits for one request: wall-clock seconds and total tokens; None leaves a limit open"""
+    latency: Optional[float] = None
+    tokens: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> Optional['RequestBudget']:
+        """Parse a request's budget object, e.g. {"latency": 8, "tokens": 20000}; None means no budget"""
+        if data is None or isinstance(data, RequestBudget):
+            return data
+        if not isinstance(data, dict):
+            raise ValueError("Budget must be an object with latency and/or tokens")
+        unknown = set(data) - {"latency", "tokens"}
+        if unknown:
+            raise ValueError(f"Unknown budget fields: {sorted(unknown)}")
+        try:
+            budget = cls(
+                latency=float(data["latency"]) if data.get("latency") is not None else None,
+                tokens=int(data["tokens"]) if data.get("tokens") is not None else None
+            )
+        except (TypeError, ValueError):
+            raise ValueError(f"Budget limits must be numbers: {data}")
+        if any(limit is not None and limit <= 0 for limit in (budget.latency, budget.tokens)):
+            raise ValueError("Budget limits must be positive")
+        return budget
+
+    def allows(self, seconds: float, tokens: int) -> bool:
+        return ((self.latency is None or seconds <= self.latency)
+                and (self.tokens is None or tokens <= self.tokens))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+@dataclass
+class PlannedCall:
+    lantern_id: str
+    phase: str
+    model: str
+    route: str
+    estimated_seconds: float
+    estimated_tokens: int
+
+@dataclass
+class DialoguePlan:
+    """The dialogue a request will run, with its estimated latency and token cost"""
+    lanterns: List[str]
+    phases: List[str]
+    calls: List[PlannedCall]
+    estimated_seconds: float
+    estimated_tokens: int
+    budget: Optional[RequestBudget] = None
+    fits: bool = True
+    degradations: List[str] = field(default_factory=list)
+    dropped_lanterns: List[str] = field(default_factory=list)
+
+    @property
+    def degraded(self) -> bool:
+        return bool(self.degradations)
+
+    def model_for(self, lantern_id: str, phase: str) -> Optional[str]:
+        for call in self.calls:
+            if call.lantern_id == lantern_id and call.phase == phase:
+                return call.model
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'budget': self.budget.to_dict() if self.budget else None,
+            'lanterns': self.lanterns,
+            'dropped_lanterns': self.dropped_lanterns,
+            'phases': self.phases,
+            'calls': [
+                {'lantern': call.lantern_id, 'phase': call.phase, 'model': call.model,
+                 'estimated_seconds': call.estimated_seconds, 'estimated_tokens': call.estimated_tokens}
+                for call in self.calls
+            ],
+            'estimated_seconds': self.estimated_seconds,
+            'estimated_tokens': self.estimated_tokens,
+            'fits': self.fits,
+            'degradations': self.degradations
+        }
+
+def makespan(durations: List[float], concurrency: int) -> float:
+    """Wall-clock time for durations run at most concurrency at a time, longest first"""
+    if not durations:
+        return 0.0
+    lanes = [0.0] * max(1, min(concurrency, len(durations)))
+    for duration in sorted(durations, reverse=True):
+        lanes[lanes.index(min(lanes))] += duration
+    return max(lanes)
+
+class DialoguePlanner:
+    """Picks the deepest dialogue that fits a budget, from live per-lantern statistics.
+
+    Each lantern and model keeps its recent call latencies and completion sizes.
+    A call is estimated at the given percentile of its own history, or of its
+    model's across lanterns while it has fewer than min_samples, or else at the
+    prior. Calls within a phase run concurrently and phases one after another,
+    so a plan's latency is the sum of its phases' makespans. Over budget, a plan
+    gives up depth one step at a time: cross-consultation, then the routed models
+    for faster ones, then the synthesis call, then lanterns from the end of the
+    selection. If even one lantern is over budget, that plan runs anyway, marked
+    as not fitting. Without a budget the full dialogue is planned; only the
+    caller can trade depth for speed.
+    """
+
+    def __init__(self, percentile: float = 90.0, prior_seconds: float = 5.0, min_samples: int = 5,
+                 window: int = 200):
+        self.percentile = percentile
+        self.prior_seconds = prior_seconds
+        self.min_samples = min_samples
+        self.window = window
+        self._latencies: Dict[Tuple[str, str], deque] = {}
+        self._tokens: Dict[Tuple[str, str], deque] = {}
+        self._lock = threading.Lock()
+        self.stats = {'plans': 0, 'budgeted': 0, 'degraded': 0, 'over_budget': 0, 'degradations': {}}
+
+    @classmethod
+    def from_env(cls) -> 'DialoguePlanner':
+        return cls(
+            percentile=float(os.getenv('LANTERN_PLAN_PERCENTILE', 90)),
+            prior_seconds=float(os.getenv('LANTERN_PLAN_PRIOR_LATENCY', 5)),
+            min_samples=int(os.getenv('LANTERN_PLAN_MIN_SAMPLES', 5))
+        )
+
+    def observe(self, lantern_id: str, model: str, seconds: float, completion_tokens: int):
+        """Record one finished provider call"""
+        with self._lock:
+            key = (lantern_id, model)
+            self._latencies.setdefault(key, deque(maxlen=self.window)).append(seconds)
+            self._tokens.setdefault(key, deque(maxlen=self.window)).append(completion_tokens)
+
+    def samples(self, series: Dict[Tuple[str, str], deque], lantern_id: str, model: str) -> List[float]:
+        """A lantern's own history with a model, or the model's across lanterns while that is too short"""
+        own = list(series.get((lantern_id, model), ()))
+        if len(own) >= self.min_samples:
+            return own
+        pooled = [value for (_, pooled_model), values in series.items() if pooled_model == model for value in values]
+        return pooled if len(pooled) >= self.min_samples else []
+
+    def estimate_seconds(self, lantern_id: str, model: str) -> float:
+        with self._lock:
+            ordered = sorted(self.samples(self._latencies, lantern_id, model))
+        if not ordered:
+            return self.prior_seconds
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100.0))]
+
+    def estimate_completion(self, lantern_id: str, model: str, default: int) -> int:
+        with self._lock:
+            sizes = self.samples(self._tokens, lantern_id, model)
+        return int(sum(sizes) / len(sizes)) if sizes else default
+
+    def plan(self, lanterns: List[str], phases: List[str],
+             shape: Callable[[List[str], List[str]], List[Tuple[str, str]]],
+             route: Callable[[str, str], Tuple[str, str]],
+             prompt_tokens: Callable[[str, str], int],
+             completion_tokens: int, concurrency: int, models: List[str],
+             budget: Optional[RequestBudget] = None) -> DialoguePlan:
+        """The deepest dialogue within budget.
+
+        shape(lanterns, phases) lists the (phase, lantern) calls such a dialogue
+        makes, route(lantern, phase) gives the (route, model) it would normally
+        use, and prompt_tokens(lantern, phase) the prompt size of that call.
+        models are the alternatives a call may move to for speed.
+        """
+
+        def build(plan_lanterns: List[str], plan_phases: List[str], fast: bool,
+                  degradations: List[str]) -> DialoguePlan:
+            calls = []
+            for phase, lantern_id in shape(plan_lanterns, plan_phases):
+                route_name, model = route(lantern_id, phase)
+                if fast:
+                    # Ties keep the routed model
+                    model = min(models, key=lambda candidate: (self.estimate_seconds(lantern_id, candidate),
+                                                               candidate != model))
+                calls.append(PlannedCall(
+                    lantern_id, phase, model, route_name,
+                    round(self.estimate_seconds(lantern_id, model), 3),
+                    prompt_tokens(lantern_id, phase) + self.estimate_completion(lantern_id, model, completion_tokens)
+                ))
+            seconds = sum(
+                makespan([call.estimated_seconds for call in calls if call.phase == phase], concurrency)
+                for phase in plan_phases
+            )
+            tokens = sum(call.estimated_tokens for call in calls)
+            return DialoguePlan(
+                lanterns=list(plan_lanterns),
+                phases=list(plan_phases),
+                calls=calls,
+                estimated_seconds=round(seconds, 3),
+                estimated_tokens=tokens,
+                budget=budget,
+                fits=budget is None or budget.allows(seconds, tokens),
+                degradations=list(degradations),
+                dropped_lanterns=[lantern_id for lantern_id in lanterns if lantern_id not in plan_lanterns]
+            )
+
+        def ladder():
+            plan_lanterns, plan_phases, fast, degradations = list(lanterns), list(phases), False, []
+            current = build(plan_lanterns, plan_phases, fast, degradations)
+            yield current
+            if "cross_consultation" in plan_phases:
+                plan_phases.remove("cross_consultation")
+                degradations.append("skip_cross_consultation")
+                current = build(plan_lanterns, plan_phases, fast, degradations)
+                yield current
+            faster = build(plan_lanterns, plan_phases, True, degradations + ["faster_models"])
+            if any(call.model != routed.model for call, routed in zip(faster.calls, current.calls)):
+                fast = True
+                degradations.append("faster_models")
+                yield faster
+            if "synthesis" in plan_phases:
+                # One round of consultation, combined locally instead of by Eidolon
+                plan_phases = ["consultation"]
+                degradations.append("skip_synthesis")
+                yield build(plan_lanterns, plan_phases, fast, degradations)
+            while len(plan_lanterns) > 1:
+                plan_lanterns.pop()
+                if "fewer_lanterns" not in degradations:
+                    degradations.append("fewer_lanterns")
+                yield build(plan_lanterns, plan_phases, fast, degradations)
+
+        chosen = None
+        for candidate in ladder():
+            chosen = candidate
+            if candidate.fits:
+                break
+
+        with self._lock:
+            self.stats['plans'] += 1
+            self.stats['budgeted'] += int(budget is not None)
+            self.stats['degraded'] += int(chosen.degraded)
+            self.stats['over_budget'] += int(not chosen.fits)
+            for step in chosen.degradations:
+                self.stats['degradations'][step] = self.stats['degradations'].get(step, 0) + 1
+        return chosen
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {key: len(values) for key, values in self._latencies.items()}
+            stats = {**self.stats, 'degradations': dict(self.stats['degradations'])}
+        return {
+            'percentile': self.percentile,
+            'prior_seconds': self.prior_seconds,
+            **stats,
+            'estimates': [
+                {
+                    'lantern': lantern_id,
+                    'model': model,
+                    'samples': samples,
+                    'estimated_seconds': round(self.estimate_seconds(lantern_id, model), 3),
+                    'mean_completion_tokens': self.estimate_completion(lantern_id, model, 0)
+                }
+                for (lantern_id, model), samples in counts.items()
+            ]
+        }
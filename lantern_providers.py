@@ -0,0 +1,363 @@
+"""
+LanternHive LLM Providers
+Pluggable chat-completion backends, plus a deterministic stub for offline benchmarking
+"""
+
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any, Optional, Iterator
+from dataclasses import dataclass, asdict
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gpt-4-turbo"
+
+class ProviderError(Exception):
+    """Raised by a provider when a completion fails"""
+
+    def __init__(self, message: str, status: int = 500):
+        self.status = status
+        super().__init__(message)
+
+class LLMProvider:
+    """Interface for chat-completion backends used by the hive"""
+    name = "base"
+
+    def complete(self, model: str, messages: List[Dict], temperature: float, timeout: float) -> str:
+        """Return the full completion text"""
+        raise NotImplementedError
+
+    def stream(self, model: str, messages: List[Dict], temperature: float, timeout: float) -> Iterator[str]:
+        """Yield the completion text chunk by chunk"""
+        yield self.complete(model, messages, temperature, timeout)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {'provider': self.name}
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI chat completions, or any server speaking the same API via base_url"""
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+        import openai
+
+        self.base_url = base_url
+        try:
+            self.client = openai.OpenAI(api_key=api_key, base_url=base_url)
+        except Exception as e:
+            print(f"OpenAI client initialization failed: {e}")
+            # Fallback initialization with minimal parameters
+            if api_key:
+                os.environ['OPENAI_API_KEY'] = api_key
+            try:
+                # Try with explicit parameters to avoid proxy issues
+                self.client = openai.OpenAI(
+                    api_key=os.getenv('OPENAI_API_KEY'),
+                    base_url=base_url,
+                    timeout=30.0
+                )
+            except Exception as e2:
+                print(f"Fallback initialization also failed: {e2}")
+                # Last resort: try without any parameters
+                self.client = openai.OpenAI()
+
+    def complete(self, model: str, messages: List[Dict], temperature: float, timeout: float) -> str:
+        response = self.client.chat.completions.create(
+            model=model, messages=messages, temperature=temperature, timeout=timeout
+        )
+        return response.choices[0].message.content
+
+    def stream(self, model: str, messages: List[Dict], temperature: float, timeout: float) -> Iterator[str]:
+        for chunk in self.client.chat.completions.create(
+            model=model, messages=messages, temperature=temperature, timeout=timeout, stream=True
+        ):
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                yield text
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {'provider': self.name, 'base_url': self.base_url}
+
+@dataclass
+class StubSettings:
+    """Behaviour of the stub backend; latencies are in seconds"""
+    latency_distribution: str = "lognormal"  # fixed, uniform, normal, lognormal or exponential
+    latency_mean: float = 0.5
+    latency_spread: float = 0.5
+    tokens_per_second: float = 50.0
+    completion_tokens: int = 120
+    failure_rate: float = 0.0
+    failure_status: int = 500
+    seed: int = 0
+
+    @classmethod
+    def from_env(cls) -> 'StubSettings':
+        return cls(
+            latency_distribution=os.getenv('LANTERN_STUB_LATENCY', cls.latency_distribution),
+            latency_mean=float(os.getenv('LANTERN_STUB_LATENCY_MEAN', cls.latency_mean)),
+            latency_spread=float(os.getenv('LANTERN_STUB_LATENCY_SPREAD', cls.latency_spread)),
+            tokens_per_second=float(os.getenv('LANTERN_STUB_TOKENS_PER_SECOND', cls.tokens_per_second)),
+            completion_tokens=int(os.getenv('LANTERN_STUB_COMPLETION_TOKENS', cls.completion_tokens)),
+            failure_rate=float(os.getenv('LANTERN_STUB_FAILURE_RATE', cls.failure_rate)),
+            failure_status=int(os.getenv('LANTERN_STUB_FAILURE_STATUS', cls.failure_status)),
+            seed=int(os.getenv('LANTERN_STUB_SEED', cls.seed))
+        )
+
+STUB_VOCABULARY = (
+    "connection floating memory fingerprint lantern module session synthesis risk pattern "
+    "architecture compliance latency throughput boundary principle protocol integrity state "
+    "the a of to and with for in across through ensures requires suggests because therefore"
+).split()
+
+class StubProvider(LLMProvider):
+    """Deterministic in-process backend with synthetic latency, token rate and failures.
+
+    Completion text depends only on the request; timings and injected failures come
+    from a generator seeded by settings.seed, so runs are repeatable.
+    """
+    name = "stub"
+
+    def __init__(self, settings: Optional[StubSettings] = None):
+        self.settings = settings or StubSettings.from_env()
+        self._random = random.Random(self.settings.seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'failures': 0, 'tokens': 0}
+
+    def sample_latency(self) -> float:
+        """Time to first token, drawn from the configured distribution"""
+        s = self.settings
+        with self._lock:
+            if s.latency_distribution == "fixed":
+                value = s.latency_mean
+            elif s.latency_distribution == "uniform":
+                value = self._random.uniform(s.latency_mean - s.latency_spread, s.latency_mean + s.latency_spread)
+            elif s.latency_distribution == "normal":
+                value = self._random.gauss(s.latency_mean, s.latency_spread)
+            elif s.latency_distribution == "exponential":
+                value = self._random.expovariate(1.0 / s.latency_mean) if s.latency_mean > 0 else 0.0
+            else:
+                # lognormal with the given mean; spread is sigma of the underlying normal
+                mu = math.log(max(s.latency_mean, 1e-6)) - s.latency_spread ** 2 / 2
+                value = self._random.lognormvariate(mu, s.latency_spread)
+        return max(0.0, value)
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.settings.failure_rate
+
+    def tokens_for(self, model: str, messages: List[Dict]) -> List[str]:
+        """Deterministic completion for a request, one word per token"""
+        digest = hashlib.sha256(json.dumps([model, messages], sort_keys=True).encode()).digest()
+        role = messages[0]['content'].split('.')[0] if messages else "Stub"
+        words = [f"[{role}]"]
+        while len(words) < self.settings.completion_tokens:
+            digest = hashlib.sha256(digest).digest()
+            words.extend(STUB_VOCABULARY[byte % len(STUB_VOCABULARY)] for byte in digest)
+        words = words[:self.settings.completion_tokens]
+        return [word + ' ' for word in words[:-1]] + words[-1:]
+
+    def begin(self, timeout: float):
+        """Wait out the time to first token, or fail as configured"""
+        with self._lock:
+            self.stats['requests'] += 1
+        latency = self.sample_latency()
+        if latency > timeout:
+            time.sleep(timeout)
+            self.record_failure()
+            raise ProviderError(f"Stub request timed out after {timeout}s", status=504)
+        time.sleep(latency)
+        if self.should_fail():
+            self.record_failure()
+            raise ProviderError(f"Injected stub failure ({self.settings.failure_status})",
+                                status=self.settings.failure_status)
+
+    def record_failure(self):
+        with self._lock:
+            self.stats['failures'] += 1
+
+    def stream(self, model: str, messages: List[Dict], temperature: float, timeout: float) -> Iterator[str]:
+        self.begin(timeout)
+        interval = 1.0 / self.settings.tokens_per_second if self.settings.tokens_per_second > 0 else 0.0
+        for token in self.tokens_for(model, messages):
+            if interval:
+                time.sleep(interval)
+            with self._lock:
+                self.stats['tokens'] += 1
+            yield token
+
+    def complete(self, model: str, messages: List[Dict], temperature: float, timeout: float) -> str:
+        return "".join(self.stream(model, messages, temperature, timeout))
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'provider': self.name, 'settings': asdict(self.settings), **self.stats}
+
+def create_provider(api_key: Optional[str] = None) -> LLMProvider:
+    """Build the provider selected by LANTERN_LLM_PROVIDER (openai or stub)"""
+    cassette_mode = os.getenv('LANTERN_CASSETTE_MODE', '').lower()
+    if cassette_mode:
+        # Record calls to LANTERN_CASSETTE_PATH, or serve them back from it without a backend
+        from lantern_cassette import cassette_provider
+        path = os.getenv('LANTERN_CASSETTE_PATH', 'lantern_cassette.jsonl')
+        return cassette_provider(lambda: backend_provider(api_key), cassette_mode, path)
+    return backend_provider(api_key)
+
+def backend_provider(api_key: Optional[str] = None) -> LLMProvider:
+    kind = os.getenv('LANTERN_LLM_PROVIDER', 'openai').lower()
+    if kind == 'stub':
+        return StubProvider()
+    if kind != 'openai':
+        raise ValueError(f"Unknown LLM provider: {kind}")
+    return OpenAIProvider(api_key, base_url=os.getenv('LANTERN_LLM_BASE_URL') or None)
+
+def default_model() -> str:
+    return os.getenv('LANTERN_MODEL') or os.getenv('OPENAI_MODEL') or DEFAULT_MODEL
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    """Serves POST /v1/chat/completions in the OpenAI response shape, including SSE streaming"""
+    provider: StubProvider = None
+
+    def do_POST(self):
+        if self.path.rstrip('/') not in ('/v1/chat/completions', '/chat/completions'):
+            self.send_json(404, {'error': {'message': f"Unknown path {self.path}"}})
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        model = body.get('model', DEFAULT_MODEL)
+        messages = body.get('messages', [])
+        completion_id = f"chatcmpl-stub-{hashlib.sha256(os.urandom(8)).hexdigest()[:12]}"
+        tokens = self.provider.stream(model, messages, body.get('temperature', 1.0), float('inf'))
+
+        try:
+            if body.get('stream'):
+                first = next(tokens)
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.end_headers()
+                for token in self.chain(first, tokens):
+                    self.send_event({
+                        'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                        'model': model,
+                        'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]
+                    })
+                self.send_event({
+                    'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                    'model': model, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]
+                })
+                self.wfile.write(b"data: [DONE]\n\n")
+            else:
+                content = "".join(tokens)
+                completion_tokens = len(content.split())
+                prompt_tokens = sum(len(m.get('content', '').split()) for m in messages)
+                self.send_json(200, {
+                    'id': completion_id, 'object': 'chat.completion', 'created': int(time.time()),
+                    'model': model,
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': content},
+                        'finish_reason': 'stop'
+                    }],
+                    'usage': {
+                        'prompt_tokens': prompt_tokens,
+                        'completion_tokens': completion_tokens,
+                        'total_tokens': prompt_tokens + completion_tokens
+                    }
+                })
+        except ProviderError as e:
+            self.send_json(e.status, {'error': {'message': str(e), 'type': 'stub_error'}})
+
+    @staticmethod
+    def chain(first: str, rest: Iterator[str]) -> Iterator[str]:
+        yield first
+        yield from rest
+
+    def send_event(self, payload: Dict):
+        self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+        self.wfile.flush()
+
+    def send_json(self, status: int, payload: Dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+def serve_stub(host: str = '127.0.0.1', port: int = 8900, settings: Optional[StubSettings] = None) -> ThreadingHTTPServer:
+    """Start the stub chat-completions server on a background thread"""
+    handler = type('BoundStubRequestHandler', (StubRequestHandler,), {'provider': StubProvider(settings)})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name='lantern-stub-server', daemon=True).start()
+    logger.info(f"Stub LLM server listening on http://{host}:{port}/v1")
+    return server
+
+def run_benchmark(requests: int, concurrency: int, settings: Optional[StubSettings] = None) -> Dict[str, Any]:
+    """Drive full dialogues through the hive against the in-process stub"""
+    from concurrent.futures import ThreadPoolExecutor
+    from enhanced_lanternhive import FLUXLanternHive
+
+    provider = StubProvider(settings)
+    hive = FLUXLanternHive(provider=provider)
+    prompts = [
+        f"Design and evaluate a FLUX connection architecture with floating memory, variant {index}"
+        for index in range(requests)
+    ]
+
+    def timed(prompt: str) -> float:
+        started = time.perf_counter()
+        hive.process_prompt(prompt, bypass_cache=True)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(timed, prompts))
+    elapsed = time.perf_counter() - started
+
+    def percentile(p: float) -> float:
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3)
+
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'elapsed': round(elapsed, 3),
+        'throughput': round(requests / elapsed, 2),
+        'p50': percentile(0.50),
+        'p95': percentile(0.95),
+        'p99': percentile(0.99),
+        'provider': provider.get_statistics()
+    }
+
+if __name__ == "__main__":
+    # Serve the stub; point the hive at it with
+    # LANTERN_LLM_BASE_URL=http://127.0.0.1:8900/v1 OPENAI_API_KEY=stub
+    # or benchmark the dialogue pipeline in-process with --benchmark N
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Deterministic OpenAI-compatible stub server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--benchmark', type=int, metavar='N', help="run N dialogues in-process and exit")
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.benchmark:
+        print(json.dumps(run_benchmark(args.benchmark, args.concurrency), indent=2))
+    else:
+        server = serve_stub(args.host, args.port)
+        print(f"Stub LLM server on http://{args.host}:{args.port}/v1 with {StubSettings.from_env()}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
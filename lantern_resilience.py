@@ -0,0 +1,246 @@
+"""
+LanternHive Call Resilience
+Per-lantern latency tracking, hedged duplicate requests and jittered retries within a time budget
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Any, Optional, Callable, Iterator
+import logging
+
+from lantern_cancellation import CancellationToken, QueryCancelled
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth another attempt: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+class AttemptCancelled(Exception):
+    """Raised inside an attempt that lost the race to another"""
+
+class LatencyTracker:
+    """Recent time-to-first-token samples per key, for percentile estimates"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key: str, q: float) -> Optional[float]:
+        """The q-th percentile of key's samples, or None until min_samples have been seen"""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * q / 100.0))]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            keys = list(self._samples)
+        return {
+            key: {
+                'samples': len(self._samples[key]),
+                'p50': self.percentile(key, 50),
+                'p95': self.percentile(key, 95)
+            }
+            for key in keys
+        }
+
+@dataclass
+class RetryPolicy:
+    """How a lantern call is hedged and retried; delays are in seconds"""
+    max_retries: int = 2
+    base_delay: float = 0.25
+    max_delay: float = 4.0
+    hedging: bool = True
+    hedge_percentile: float = 95.0
+
+    @classmethod
+    def from_env(cls) -> 'RetryPolicy':
+        return cls(
+            max_retries=int(os.getenv('LANTERN_MAX_RETRIES', cls.max_retries)),
+            base_delay=float(os.getenv('LANTERN_RETRY_BASE_DELAY', cls.base_delay)),
+            max_delay=float(os.getenv('LANTERN_RETRY_MAX_DELAY', cls.max_delay)),
+            hedging=os.getenv('LANTERN_HEDGING', 'on').lower() not in ('off', 'false', '0'),
+            hedge_percentile=float(os.getenv('LANTERN_HEDGE_PERCENTILE', cls.hedge_percentile))
+        )
+
+    def backoff(self, retry: int, rng: random.Random) -> float:
+        """Full-jitter exponential backoff before the given retry (0 for the first)"""
+        return rng.uniform(0.0, min(self.max_delay, self.base_delay * (2 ** retry)))
+
+    @staticmethod
+    def retryable(error: Exception) -> bool:
+        status = getattr(error, 'status', None) or getattr(error, 'status_code', None)
+        if status is not None:
+            return status in RETRYABLE_STATUSES
+        # openai's timeout and connection errors carry no status
+        return isinstance(error, (TimeoutError, ConnectionError)) or \
+            type(error).__name__ in ('APITimeoutError', 'APIConnectionError')
+
+class ResilientCaller:
+    """Runs streamed provider calls with hedging and retries inside one time budget.
+
+    Once an attempt has gone longer than the key's p95 time to first token without
+    producing one, a duplicate is started; whichever produces first wins and the
+    other is cancelled by closing its stream. Failed rounds are retried with
+    jittered exponential backoff while the budget allows, but never after tokens
+    have reached a listener, since they cannot be taken back. on_chunk returns
+    False while nobody is listening, which leaves the call free to retry.
+    """
+
+    def __init__(self, policy: Optional[RetryPolicy] = None, tracker: Optional[LatencyTracker] = None,
+                 max_workers: int = 8, seed: Optional[int] = None):
+        self.policy = policy or RetryPolicy.from_env()
+        self.tracker = tracker or LatencyTracker()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lantern-attempt")
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {
+            'calls': 0,
+            'attempts': 0,
+            'hedges': 0,
+            'hedge_wins': 0,
+            'cancelled': 0,
+            'retries': 0,
+            'failures': 0
+        }
+
+    def count(self, stat: str, amount: int = 1):
+        with self._lock:
+            self.stats[stat] += amount
+
+    def call(self, key: str, start: Callable[[float], Iterator[str]], budget: float,
+             on_chunk: Optional[Callable[[str], None]] = None,
+             cancel_token: Optional[CancellationToken] = None) -> str:
+        """Return the full text of the first successful attempt.
+
+        start(timeout) opens one attempt's stream; on_chunk receives the winning
+        attempt's chunks as they arrive, and returns False if they reached nobody. Raises the last error, TimeoutError once
+        budget seconds have passed, or QueryCancelled as soon as cancel_token is.
+        """
+        self.count('calls')
+        deadline = time.monotonic() + budget
+        state = {'emitted': False}
+        retry = 0
+        while True:
+            try:
+                return self.race(key, start, deadline, on_chunk, state, cancel_token)
+            except QueryCancelled:
+                raise
+            except Exception as e:
+                delay = self.policy.backoff(retry, self._random)
+                if (retry >= self.policy.max_retries or state['emitted'] or not self.policy.retryable(e)
+                        or time.monotonic() + delay >= deadline):
+                    self.count('failures')
+                    raise
+                logger.info(f"Retrying {key} in {delay:.2f}s after: {e}")
+                self.count('retries')
+                retry += 1
+                if cancel_token is not None:
+                    # Backoff ends early if the query is cancelled meanwhile
+                    wait([cancel_token.future], timeout=delay)
+                    cancel_token.raise_if_cancelled()
+                else:
+                    time.sleep(delay)
+
+    def race(self, key: str, start: Callable[[float], Iterator[str]], deadline: float,
+             on_chunk: Optional[Callable[[str], None]], state: Dict[str, Any],
+             cancel_token: Optional[CancellationToken] = None) -> str:
+        """One round: an attempt, plus a hedge if it is slow to produce its first token"""
+        lock = threading.Lock()
+        claim = {'winner': None}
+        cancelled: List[threading.Event] = []
+
+        def attempt(index: int, stop: threading.Event) -> str:
+            started = time.monotonic()
+            stream = start(max(0.0, deadline - started))
+            chunks = []
+            try:
+                for text in stream:
+                    if stop.is_set() or (cancel_token is not None and cancel_token.cancelled):
+                        raise AttemptCancelled()
+                    if not chunks:
+                        self.tracker.record(key, time.monotonic() - started)
+                        # The first attempt to produce a token wins, which also rules out a hedge
+                        with lock:
+                            if claim['winner'] is None:
+                                claim['winner'] = index
+                        if claim['winner'] != index:
+                            raise AttemptCancelled()
+                    chunks.append(text)
+                    if on_chunk and on_chunk(text) is not False:
+                        state['emitted'] = True
+            finally:
+                close = getattr(stream, 'close', None)
+                if close:
+                    close()
+            return "".join(chunks)
+
+        def launch() -> Any:
+            stop = threading.Event()
+            cancelled.append(stop)
+            self.count('attempts')
+            return self.executor.submit(attempt, len(cancelled) - 1, stop)
+
+        pending = {launch(): 0}
+        hedge_after = self.tracker.percentile(key, self.policy.hedge_percentile) if self.policy.hedging else None
+        hedge_at = time.monotonic() + hedge_after if hedge_after is not None else None
+        error: Optional[Exception] = None
+
+        try:
+            while pending:
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                now = time.monotonic()
+                if now >= deadline:
+                    raise TimeoutError(f"no response within the {key} time budget")
+                until = deadline if hedge_at is None else min(deadline, hedge_at)
+                # The token's future wakes this wait the moment the query is cancelled
+                waiting = set(pending) | ({cancel_token.future} if cancel_token is not None else set())
+                done, _ = wait(waiting, timeout=max(0.0, until - now), return_when=FIRST_COMPLETED)
+
+                for future in done & set(pending):
+                    index = pending.pop(future)
+                    try:
+                        text = future.result()
+                    except AttemptCancelled:
+                        continue
+                    except Exception as e:
+                        # A failed attempt only fails the round once no other is still running
+                        error = e
+                        continue
+                    if index > 0:
+                        self.count('hedge_wins')
+                    return text
+
+                if hedge_at is not None and time.monotonic() >= hedge_at:
+                    hedge_at = None
+                    if pending and claim['winner'] is None:
+                        self.count('hedges')
+                        hedge = launch()
+                        pending[hedge] = len(cancelled) - 1
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            raise error or TimeoutError(f"no response within the {key} time budget")
+        finally:
+            # Losers stop at their next chunk; one still waiting for a slot never starts
+            for future in pending:
+                cancelled[pending[future]].set()
+                future.cancel()
+                self.count('cancelled')
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        return {'policy': asdict(self.policy), 'latency': self.tracker.get_statistics(), **stats}
@@ -0,0 +1,195 @@
+"""
+LanternHive Request Scheduler
+Token-bucket pacing and priority ordering for calls to the LLM provider
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Tuple, Optional
+import logging
+
+from lantern_cancellation import CancellationToken
+
+logger = logging.getLogger(__name__)
+
+# Request classes, most urgent first
+PRIORITY_CLASSES = {'interactive': 0, 'batch': 1}
+
+# Dialogue phases, most urgent first: a synthesis finishes a request, a cross-consultation only refines it
+PHASE_PRIORITIES = {'synthesis': 0, 'consultation': 1, 'initial': 1, 'cross_consultation': 2}
+
+class TokenBucket:
+    """Refills at rate_per_minute up to capacity; may go negative to record debt"""
+
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken; a request larger than capacity waits for a full bucket"""
+        if self.unlimited:
+            return 0.0
+        self.refill(now)
+        needed = min(amount, self.capacity)
+        return 0.0 if self.tokens >= needed else (needed - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        if not self.unlimited:
+            self.tokens -= amount
+
+class RequestScheduler:
+    """Admits provider calls in priority order, within requests- and tokens-per-minute budgets.
+
+    Priorities are tuples compared lexicographically, lowest first; ties are served
+    in arrival order. 0 disables a limit.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0, max_in_flight: int = 0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._queue = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self.stats = {
+            'admitted': 0,
+            'throttled': 0,
+            'timeouts': 0,
+            'cancelled': 0,
+            'max_queue_depth': 0,
+            'total_wait': 0.0
+        }
+
+    @classmethod
+    def from_env(cls) -> 'RequestScheduler':
+        return cls(
+            requests_per_minute=float(os.getenv('LANTERN_RPM_LIMIT', 0)),
+            tokens_per_minute=float(os.getenv('LANTERN_TPM_LIMIT', 0)),
+            max_in_flight=int(os.getenv('LANTERN_MAX_IN_FLIGHT', 0))
+        )
+
+    @staticmethod
+    def priority_for(request_class: str, phase: str, lantern_id: str = None) -> Tuple[int, int]:
+        """Rank a call; memory_weaver consultations are background work and rank as batch"""
+        class_rank = PRIORITY_CLASSES.get(request_class, PRIORITY_CLASSES['batch'])
+        if lantern_id == 'memory_weaver':
+            class_rank = max(class_rank, PRIORITY_CLASSES['batch'])
+        return class_rank, PHASE_PRIORITIES.get(phase, 1)
+
+    def acquire(self, priority: Tuple[int, ...], estimated_tokens: int, timeout: float,
+                cancel_token: Optional[CancellationToken] = None):
+        """Block until this call is at the head of the queue and within budget, or its query is cancelled"""
+        entry = (tuple(priority), next(self._sequence))
+        enqueued = time.monotonic()
+        deadline = enqueued + timeout
+
+        def wake():
+            with self._condition:
+                self._condition.notify_all()
+
+        if cancel_token is not None:
+            cancel_token.add_callback(wake)
+        try:
+            self.wait_turn(entry, estimated_tokens, timeout, deadline, enqueued, cancel_token)
+        finally:
+            if cancel_token is not None:
+                cancel_token.remove_callback(wake)
+
+    def wait_turn(self, entry: Tuple, estimated_tokens: int, timeout: float, deadline: float, enqueued: float,
+                  cancel_token: Optional[CancellationToken]):
+        throttled = False
+        with self._condition:
+            heapq.heappush(self._queue, entry)
+            self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], len(self._queue))
+            try:
+                while True:
+                    if cancel_token is not None and cancel_token.cancelled:
+                        self.stats['cancelled'] += 1
+                        cancel_token.raise_if_cancelled()
+                    now = time.monotonic()
+                    wait = 0.0
+                    if self._queue[0] == entry:
+                        wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(estimated_tokens, now))
+                        if wait == 0.0 and (not self.max_in_flight or self.in_flight < self.max_in_flight):
+                            break
+                        throttled = throttled or wait > 0
+                    if now >= deadline:
+                        self.stats['timeouts'] += 1
+                        raise TimeoutError(f"Queued for {timeout}s without being scheduled")
+                    # Without a known refill time, wait to be notified by a release or a new head
+                    self._condition.wait(timeout=min(wait or deadline - now, deadline - now))
+            except BaseException:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._condition.notify_all()
+                raise
+
+            heapq.heappop(self._queue)
+            self.requests.take(1)
+            self.tokens.take(estimated_tokens)
+            self.in_flight += 1
+            self.stats['admitted'] += 1
+            self.stats['throttled'] += int(throttled)
+            self.stats['total_wait'] += time.monotonic() - enqueued
+            self._condition.notify_all()
+
+    def release(self, estimated_tokens: int, actual_tokens: int):
+        """Finish a call, charging the tokens-per-minute budget for any underestimate"""
+        with self._condition:
+            self.in_flight -= 1
+            self.tokens.take(actual_tokens - estimated_tokens)
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, priority: Tuple[int, ...], estimated_tokens: int, timeout: float,
+             cancel_token: Optional[CancellationToken] = None):
+        """Hold a scheduled slot for one provider call; set usage['tokens'] to the actual count"""
+        self.acquire(priority, estimated_tokens, timeout, cancel_token)
+        usage = {'tokens': estimated_tokens}
+        try:
+            yield usage
+        finally:
+            self.release(estimated_tokens, usage['tokens'])
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._condition:
+            now = time.monotonic()
+            depth_by_priority: Dict[str, int] = {}
+            for priority, _ in self._queue:
+                label = "/".join(str(rank) for rank in priority)
+                depth_by_priority[label] = depth_by_priority.get(label, 0) + 1
+            if not self.requests.unlimited:
+                self.requests.refill(now)
+            if not self.tokens.unlimited:
+                self.tokens.refill(now)
+            admitted = self.stats['admitted']
+            return {
+                'queue_depth': len(self._queue),
+                'queue_depth_by_priority': depth_by_priority,
+                'in_flight': self.in_flight,
+                'admitted': admitted,
+                'throttled': self.stats['throttled'],
+                'timeouts': self.stats['timeouts'],
+                'cancelled': self.stats['cancelled'],
+                'max_queue_depth': self.stats['max_queue_depth'],
+                'average_wait': round(self.stats['total_wait'] / admitted, 4) if admitted else 0.0,
+                'requests_per_minute': self.requests.rate * 60,
+                'tokens_per_minute': self.tokens.rate * 60,
+                'request_tokens_available': None if self.requests.unlimited else round(self.requests.tokens, 1),
+                'tpm_tokens_available': None if self.tokens.unlimited else round(self.tokens.tokens, 1)
+            }
@@ -0,0 +1,167 @@
+"""
+LanternHive Semantic Cache
+Serves final responses for near-duplicate prompts using local hashed n-gram embeddings
+"""
+
+import copy
+import hashlib
+import json
+import re
+import threading
+import time
+import zlib
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+import logging
+
+from lantern_tokens import content_words
+
+logger = logging.getLogger(__name__)
+
+NEGATION_PATTERN = re.compile(r"\b(?:not|no|never|without|none|nor|neither|cannot|except|\w+n't)\b")
+
+# Request verbs and spellings that do not change what is being asked for
+SYNONYMS = {
+    "create": "design", "build": "design", "make": "design", "implement": "design",
+    "construct": "design", "develop": "design",
+    "optimise": "optimize", "improve": "optimize", "tune": "optimize",
+    "describe": "explain", "clarify": "explain",
+    "authentication": "auth", "authenticate": "auth", "login": "auth"
+}
+
+def embed(text: str, dim: int = 1024) -> np.ndarray:
+    """Unit vector of signed, hashed word and character-trigram features.
+
+    Word features carry the meaning; trigrams of each word make inflections and
+    small spelling differences ("connection" / "connections") land close together.
+    crc32 keeps the hashing stable across processes, unlike hash().
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    words = [SYNONYMS.get(word, word) for word in content_words(text)]
+    features = [(f"w:{word}", 1.0) for word in words]
+    for word in words:
+        padded = f"<{word}>"
+        features.extend((f"c:{padded[i:i + 3]}", 0.25) for i in range(len(padded) - 2))
+
+    for feature, weight in features:
+        bucket = zlib.crc32(feature.encode())
+        vector[bucket % dim] += weight if bucket & 0x80000000 else -weight
+
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def agreement(texts: List[str], dim: int = 1024) -> float:
+    """Mean pairwise cosine similarity of texts' embeddings; 1.0 for fewer than two texts"""
+    if len(texts) < 2:
+        return 1.0
+    vectors = np.stack([embed(text, dim) for text in texts])
+    similarities = vectors @ vectors.T
+    count = len(texts)
+    return float((similarities.sum() - np.trace(similarities)) / (count * (count - 1)))
+
+def consensus(text: str, others: List[str], dim: int = 1024) -> float:
+    """Cosine similarity of text to the centroid of others; 0.0 when there are none"""
+    if not others:
+        return 0.0
+    centroid = np.sum([embed(other, dim) for other in others], axis=0)
+    norm = np.linalg.norm(centroid)
+    return float(embed(text, dim) @ centroid / norm) if norm else 0.0
+
+def negations(text: str) -> List[str]:
+    """The negating words in text, which flip a prompt's meaning while barely moving its embedding"""
+    return sorted({"not" if word.endswith("n't") else word for word in NEGATION_PATTERN.findall(text.lower())})
+
+def match_key(prompt: str, context: Optional[Dict], scope: Any = None) -> str:
+    """What must be identical for two prompts to share a response: flux_context, scope and negations"""
+    key = [context or {}, scope, negations(prompt)]
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+class SemanticCache:
+    """Final responses indexed by prompt embedding, in a fixed-size ring of vectors.
+
+    A lookup scores every stored prompt with one matrix-vector product, keeps the
+    top_k candidates and serves the best one whose cosine similarity reaches
+    threshold and whose match_key is the same: flux_context, the caller's scope
+    (the dialogue's Bloom level and lanterns) and negating words all match exactly.
+    Reworded prompts that ask for something else still score around 0.9, so the
+    threshold sits well above that, and a disabled cache neither serves nor stores.
+    """
+
+    def __init__(self, max_entries: int = 2048, dim: int = 1024, threshold: float = 0.97,
+                 top_k: int = 5, ttl: float = 3600.0, enabled: bool = True):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.dim = dim
+        self.threshold = threshold
+        self.top_k = top_k
+        self.ttl = ttl
+        self.vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self.created = np.zeros(max_entries, dtype=np.float64)
+        self.entries: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self.size = 0
+        self.cursor = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0}
+
+    def lookup(self, prompt: str, context: Optional[Dict] = None, scope: Any = None) -> Optional[Dict[str, Any]]:
+        """Return a copy of the closest cached result, annotated with its similarity, or None"""
+        if not self.enabled:
+            return None
+        query = embed(prompt, self.dim)
+        wanted = match_key(prompt, context, scope)
+        with self._lock:
+            if self.size:
+                similarities = self.vectors[:self.size] @ query
+                similarities[self.created[:self.size] < time.time() - self.ttl] = -1.0
+                k = min(self.top_k, self.size)
+                candidates = np.argpartition(-similarities, k - 1)[:k]
+                for index in candidates[np.argsort(-similarities[candidates])]:
+                    similarity = float(similarities[index])
+                    if similarity < self.threshold:
+                        break
+                    entry = self.entries[index]
+                    if entry['key'] == wanted:
+                        self.stats['hits'] += 1
+                        result = copy.deepcopy(entry['result'])
+                        result['semantic_cache'] = {
+                            'similarity': round(similarity, 4),
+                            'matched_prompt': entry['prompt']
+                        }
+                        return result
+            self.stats['misses'] += 1
+            return None
+
+    def store(self, prompt: str, context: Optional[Dict], result: Dict[str, Any], scope: Any = None):
+        """Add a result, overwriting the oldest entry once the ring is full"""
+        if not self.enabled:
+            return
+        vector = embed(prompt, self.dim)
+        with self._lock:
+            index = self.cursor
+            self.vectors[index] = vector
+            self.created[index] = time.time()
+            self.entries[index] = {
+                'prompt': prompt, 'key': match_key(prompt, context, scope), 'result': copy.deepcopy(result)
+            }
+            self.cursor = (self.cursor + 1) % self.max_entries
+            self.size = min(self.size + 1, self.max_entries)
+            self.stats['stores'] += 1
+
+    def clear(self):
+        with self._lock:
+            self.entries = [None] * self.max_entries
+            self.size = 0
+            self.cursor = 0
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                'enabled': self.enabled,
+                'entries': self.size,
+                'max_entries': self.max_entries,
+                'threshold': self.threshold,
+                'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else 0.0,
+                **self.stats
+            }
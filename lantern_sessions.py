@@ -0,0 +1,154 @@
+"""
+LanternHive Session Store
+Bounded, expiring storage for cognitive sessions with compacted dialogue history
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Any, Iterator, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+def compact_dialogue(entry: Dict, summary_chars: int = 300) -> Dict:
+    """Reduce a dialogue_history entry to what is worth keeping once it is no longer recent"""
+    dialogue_log = entry.get('dialogue_log', [])
+    final = dialogue_log[-1]['content'] if dialogue_log else ''
+    return {
+        'prompt': entry.get('prompt', ''),
+        'timestamp': entry.get('timestamp'),
+        'phases': sorted({item['phase'] for item in dialogue_log}),
+        'lanterns': sorted({item['lantern'] for item in dialogue_log}),
+        'entries': len(dialogue_log),
+        'summary': final[:summary_chars],
+        'compacted': True
+    }
+
+def history_size(history: List[Dict]) -> int:
+    """Approximate bytes held by a dialogue history's text"""
+    size = 0
+    for entry in history:
+        size += len(entry.get('prompt', '')) + len(entry.get('summary', ''))
+        for item in entry.get('dialogue_log', []):
+            size += len(item.get('content', ''))
+    return size
+
+class SessionStore:
+    """Dict-like LRU of sessions that expire ttl seconds after their last use.
+
+    Only the newest full_history dialogues across the whole store keep their full
+    logs; older ones are compacted into summaries as new dialogues are recorded,
+    whichever session holds them. Each prompt runs in a session of its own, so a
+    per-session window would never compact anything.
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl: float = 3600.0, full_history: int = 2):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.full_history = full_history
+        self._sessions: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # (history, index) of every dialogue still held in full, oldest first
+        self._full: deque = deque()
+        self._lock = threading.RLock()
+        self.stats = {
+            'created': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'compactions': 0
+        }
+
+    def __setitem__(self, session_id: str, session: Any):
+        with self._lock:
+            if session_id not in self._sessions:
+                self.stats['created'] += 1
+            self._sessions[session_id] = (time.time(), session)
+            self._sessions.move_to_end(session_id)
+            self.expire()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def get(self, session_id: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return default
+            last_used, session = entry
+            now = time.time()
+            if now - last_used > self.ttl:
+                del self._sessions[session_id]
+                self.stats['expirations'] += 1
+                return default
+            self._sessions[session_id] = (now, session)
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def __getitem__(self, session_id: str) -> Any:
+        session = self.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        return session
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def __delitem__(self, session_id: str):
+        with self._lock:
+            del self._sessions[session_id]
+
+    def pop(self, session_id: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            return default if entry is None else entry[1]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._sessions))
+
+    def expire(self) -> int:
+        """Drop sessions idle past the TTL; the LRU order makes this a scan from the front"""
+        cutoff = time.time() - self.ttl
+        expired = 0
+        with self._lock:
+            while self._sessions:
+                session_id, (last_used, _) = next(iter(self._sessions.items()))
+                if last_used >= cutoff:
+                    break
+                del self._sessions[session_id]
+                expired += 1
+            self.stats['expirations'] += expired
+        return expired
+
+    def record_dialogue(self, session: Any, entry: Dict):
+        """Append a dialogue to a session's history, compacting the oldest full ones in the store"""
+        with self._lock:
+            history = session.dialogue_history
+            history.append(entry)
+            self._full.append((history, len(history) - 1))
+            while len(self._full) > self.full_history:
+                held, index = self._full.popleft()
+                if not held[index].get('compacted'):
+                    held[index] = compact_dialogue(held[index])
+                    self.stats['compactions'] += 1
+
+    def get_statistics(self) -> Dict[str, Any]:
+        self.expire()
+        with self._lock:
+            sessions = [session for _, session in self._sessions.values()]
+            dialogues = sum(len(session.dialogue_history) for session in sessions)
+            compacted = sum(
+                1 for session in sessions for entry in session.dialogue_history if entry.get('compacted')
+            )
+            return {
+                'sessions': len(sessions),
+                'max_sessions': self.max_sessions,
+                'ttl': self.ttl,
+                'dialogues': dialogues,
+                'compacted_dialogues': compacted,
+                'history_bytes': sum(history_size(session.dialogue_history) for session in sessions),
+                **self.stats
+            }
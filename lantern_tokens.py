@@ -0,0 +1,28 @@
+"""
+LanternHive Tokens
+The one token estimator and word tokenizer shared by budgeting, context assembly and the semantic cache
+"""
+
+import re
+from typing import List
+
+# Words, numbers and individual punctuation marks each count as a token; long words
+# count as several, which tracks BPE tokenizers closely enough for budgeting
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Function words only: negations and question words change what a prompt asks, so they stay content
+STOPWORDS = frozenset(
+    "a an the and or but if then of to in on at by for with from as is are was were be been "
+    "this that these those it its we you they he she i me my our your their can could should would "
+    "will may might must so such than too very also into over under about all any each more most "
+    "other some only own same just do does did please".split()
+)
+
+def estimate_tokens(text: str) -> int:
+    """Approximate model tokens in text"""
+    return sum(1 + len(token) // 8 for token in TOKEN_PATTERN.findall(text))
+
+def content_words(text: str) -> List[str]:
+    """Lower-cased words of text, without stopwords"""
+    return [word for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS]
@@ -12,9 +12,17 @@ from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
 import logging
+from keyword_router import KeywordRouter
 
 logger = logging.getLogger(__name__)
 
+# Tone indicators, checked in order; the first tone found wins
+TONE_ROUTER = KeywordRouter({
+    "urgent": ["urgent", "asap", "immediately", "quickly"],
+    "casual": ["casual", "informal", "relaxed", "friendly"],
+    "formal": ["formal", "professional", "official", "business"]
+})
+
 class PTPFMode(Enum):
     GENERATE = "generate"
     TRAINER = "trainer"
@@ -196,17 +204,7 @@ class PTPFFluxGenerator:
     def _prep_vibe_profile(self, user_input: str) -> Dict[str, Any]:
         """Derive vibe directives from user input"""
         # Analyze user input for tone, pacing, register
-        tone_indicators = {
-            "urgent": ["urgent", "asap", "immediately", "quickly"],
-            "casual": ["casual", "informal", "relaxed", "friendly"],
-            "formal": ["formal", "professional", "official", "business"]
-        }
-        
-        detected_tone = "direct"  # default
-        for tone, indicators in tone_indicators.items():
-            if any(indicator in user_input.lower() for indicator in indicators):
-                detected_tone = tone
-                break
+        detected_tone = TONE_ROUTER.first(user_input, default="direct")
         
         return {
             "tone": detected_tone,
@@ -0,0 +1,27 @@
+import os
+import sys
+
+# The runtime modules live flat at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+STUB_ENV = {
+    'LANTERN_LLM_PROVIDER': 'stub',
+    'LANTERN_STUB_LATENCY': 'fixed',
+    'LANTERN_STUB_LATENCY_MEAN': '0',
+    'LANTERN_STUB_TOKENS_PER_SECOND': '0',
+}
+
+@pytest.fixture
+def stub_env(monkeypatch):
+    """Point the LLM provider at the deterministic in-process stub"""
+    for name, value in STUB_ENV.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv('LANTERN_CASSETTE_MODE', raising=False)
+    monkeypatch.delenv('LANTERN_MEMORY_DIR', raising=False)
+
+@pytest.fixture
+def hive(stub_env):
+    from enhanced_lanternhive import FLUXLanternHive
+    return FLUXLanternHive()
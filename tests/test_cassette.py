@@ -0,0 +1,31 @@
+from lantern_cassette import ReplayProvider, fresh_hive, record, replay, run_prompt
+from lantern_providers import StubProvider, StubSettings
+
+PROMPTS = [
+    "Design a FLUX connection pool with floating memory",
+    "Explain memory module fingerprints",
+    "Evaluate the security of a siig transfer",
+]
+
+def test_replay_serves_every_call_recorded_at_a_different_speed(stub_env, tmp_path):
+    cassette = str(tmp_path / "dialogues.jsonl")
+    slow = StubProvider(StubSettings(latency_distribution="fixed", latency_mean=0.05, tokens_per_second=0))
+    recorded = record(cassette, PROMPTS, slow)
+    assert recorded['recorded'] > 0 and recorded['errors'] == 0
+
+    benchmark = replay(cassette, runs=2, latency="zero")
+    assert benchmark['prompts'] == len(PROMPTS)
+    assert benchmark['last_run']['misses'] == 0
+    assert benchmark['last_run']['replayed'] == recorded['recorded']
+
+def test_replays_give_the_same_answers(stub_env, tmp_path):
+    cassette = str(tmp_path / "dialogues.jsonl")
+    instant = StubProvider(StubSettings(latency_distribution="fixed", latency_mean=0.0, tokens_per_second=0))
+    record(cassette, PROMPTS, instant)
+    answers = []
+    for _ in range(2):
+        hive = fresh_hive(ReplayProvider(cassette, "zero"))
+        results = [run_prompt(hive, prompt, {}) for prompt in PROMPTS]
+        answers.append([result.get("final_response") or result.get("synthesis") for result in results])
+    assert answers[0] == answers[1]
+    assert all(answers[0])
@@ -0,0 +1,89 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from lantern_cancellation import CancellationToken, QueryCancelled
+from lantern_coalesce import SingleFlight
+
+def test_concurrent_callers_share_one_computation_and_its_events():
+    flights = SingleFlight()
+    joined = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute(publish, cancellation):
+        calls.append(1)
+        publish({"text": "early"})
+        joined.set()
+        release.wait(2)
+        publish({"text": "late"})
+        return {"answer": 42}
+
+    follower_events = []
+    with ThreadPoolExecutor(2) as executor:
+        leader = executor.submit(flights.run, "k", compute)
+        joined.wait(2)
+        follower = executor.submit(flights.run, "k", compute, follower_events.append)
+        while flights.get_statistics()['followers'] == 0:
+            pass
+        release.set()
+        (leader_result, leader_shared), (follower_result, follower_shared) = leader.result(), follower.result()
+
+    assert calls == [1]
+    assert (leader_shared, follower_shared) == (False, True)
+    assert follower_result == leader_result == {"answer": 42}
+    assert follower_result is not leader_result
+    # A late joiner gets the events it missed, then the rest
+    assert [event["text"] for event in follower_events] == ["early", "late"]
+
+def test_a_cancelled_follower_stops_waiting_without_cancelling_the_leader():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def compute(publish, cancellation):
+        started.set()
+        release.wait(2)
+        return "done" if not cancellation.cancelled else "cancelled"
+
+    token = CancellationToken()
+    with ThreadPoolExecutor(2) as executor:
+        leader = executor.submit(flights.run, "k", compute)
+        started.wait(2)
+        follower = executor.submit(flights.run, "k", compute, None, token)
+        while flights.get_statistics()['followers'] == 0:
+            pass
+        token.cancel()
+        with pytest.raises(QueryCancelled):
+            follower.result(2)
+        release.set()
+        assert leader.result() == ("done", False)
+
+@pytest.fixture
+def slow_hive(stub_env, monkeypatch):
+    monkeypatch.setenv('LANTERN_STUB_LATENCY_MEAN', '0.05')
+    from enhanced_lanternhive import FLUXLanternHive
+    return FLUXLanternHive()
+
+def run_together(hive, first, second):
+    prompt = "Design a FLUX connection pool"
+    with ThreadPoolExecutor(2) as executor:
+        leader = executor.submit(hive.process_prompt, prompt, {}, **first)
+        while hive.inflight.get_statistics()['in_flight'] == 0:
+            pass
+        follower = executor.submit(hive.process_prompt, prompt, {}, **second)
+        return leader.result(), follower.result()
+
+def test_identical_requests_share_a_dialogue(slow_hive):
+    _, follower = run_together(slow_hive, {}, {})
+    assert follower.get("coalesced")
+
+@pytest.mark.parametrize("first, second", [
+    ({}, {'bypass_cache': True}),
+    ({'priority': 'batch'}, {'priority': 'interactive'}),
+])
+def test_requests_that_differ_in_cache_choice_or_priority_run_separately(slow_hive, first, second):
+    leader, follower = run_together(slow_hive, first, second)
+    assert not leader.get("coalesced") and not follower.get("coalesced")
+    assert slow_hive.inflight.get_statistics()['followers'] == 0
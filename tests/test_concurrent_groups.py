@@ -0,0 +1,92 @@
+import logging
+import threading
+import time
+
+import pytest
+
+logging.disable(logging.CRITICAL)
+flux_backend = pytest.importorskip("flux_backend")
+
+@pytest.fixture
+def group_connections():
+    names = ["primary", "backup_a", "backup_b"]
+    ids = {name: flux_backend.create_flux_connection(name) for name in names}
+    yield ids
+    for connection_id in ids.values():
+        flux_backend.close_flux_connection(connection_id)
+
+def group(names, timeout):
+    return {'connections': names, 'timeout': timeout, 'failover_mode': 'automatic',
+            'synchronize_on': 'fingerprint_match'}
+
+def test_failover_shares_the_group_deadline(group_connections, monkeypatch):
+    executed = []
+    release = threading.Event()
+
+    def slow_action(action, connection_id):
+        executed.append(connection_id)
+        release.wait(2)
+        return "done"
+
+    monkeypatch.setattr(flux_backend, "execute_action", slow_action)
+    actions = {name: [{'type': 'allocate'}, {'type': 'allocate'}] for name in group_connections}
+    started = time.monotonic()
+    report = flux_backend.flux_interpreter.execute_concurrent_group(
+        group(list(group_connections), 0.2), group_connections, actions
+    )
+    elapsed = time.monotonic() - started
+    release.set()
+
+    assert elapsed < 0.6
+    assert report['failover'] is None
+    assert set(report['failed']) == set(group_connections)
+    assert report['synchronized'] == []
+    # Every worker was told to stop, so none runs its second action after being given up on
+    time.sleep(0.1)
+    assert len(executed) == len(group_connections)
+
+def test_timed_out_backup_is_neither_authority_nor_synchronized(group_connections, monkeypatch):
+    primary, slow_backup, fast_backup = (group_connections[name] for name in ("primary", "backup_a", "backup_b"))
+    failing = {primary}
+    stalled = threading.Event()
+
+    def action(action, connection_id):
+        if connection_id in failing:
+            raise RuntimeError("primary lost")
+        if action['type'] == 'replay' and connection_id == slow_backup:
+            stalled.wait(2)
+        return "ok"
+
+    monkeypatch.setattr(flux_backend, "execute_action", action)
+    actions = {
+        'primary': [{'type': 'replay'}],
+        'backup_a': [{'type': 'local'}],
+        'backup_b': [{'type': 'local'}],
+    }
+    report = flux_backend.flux_interpreter.execute_concurrent_group(
+        group(["primary", "backup_a", "backup_b"], 0.3), group_connections, actions
+    )
+    stalled.set()
+
+    assert report['failover'] is None
+    assert report['failed'] == ["primary", "backup_a"]
+    assert flux_backend.active_connections[slow_backup].status == 'failed'
+    assert "backup_a" not in report['synchronized']
+
+def test_failed_primary_fails_over_within_the_deadline(group_connections, monkeypatch):
+    primary = group_connections["primary"]
+
+    def action(action, connection_id):
+        if connection_id == primary:
+            raise RuntimeError("primary lost")
+        return "ok"
+
+    monkeypatch.setattr(flux_backend, "execute_action", action)
+    actions = {name: [{'type': 'local'}] for name in group_connections}
+    report = flux_backend.flux_interpreter.execute_concurrent_group(
+        group(["primary", "backup_a", "backup_b"], 1), group_connections, actions
+    )
+
+    assert report['failover'] == {'from': 'primary', 'to': 'backup_a'}
+    assert report['primary'] == 'backup_a'
+    assert report['failed'] == ["primary"]
@@ -0,0 +1,75 @@
+import logging
+
+import pytest
+
+logging.disable(logging.CRITICAL)
+flux_backend = pytest.importorskip("flux_backend")
+
+def memory_used(principal):
+    return flux_backend.quota_manager.usage_for(principal)['usage']['memory_bytes']
+
+def test_fork_shares_blocks_until_written():
+    owner = ("client:fork-write",)
+    parent = flux_backend.create_flux_connection("parent", owner)
+    block = flux_backend.allocate_floating_memory(parent, "string", "hello")
+    fork = flux_backend.fork_flux_connection(parent)
+    assert flux_backend.memory_refcounts[block] == 2
+    assert memory_used(owner[0]) == 5
+
+    copied = flux_backend.write_floating_memory(fork, block, "changed!")
+
+    assert copied != block
+    assert flux_backend.active_connections[parent].floating_data[block].content == "hello"
+    assert flux_backend.active_connections[fork].floating_data[copied].content == "changed!"
+    assert flux_backend.memory_refcounts[block] == 1
+    assert memory_used(owner[0]) == 5 + 8
+
+    flux_backend.close_flux_connection(parent)
+    flux_backend.close_flux_connection(fork)
+    assert memory_used(owner[0]) == 0
+
+def test_closing_the_parent_keeps_blocks_a_fork_shares():
+    owner = ("client:fork-close",)
+    parent = flux_backend.create_flux_connection("parent", owner)
+    block = flux_backend.allocate_floating_memory(parent, "string", "shared")
+    fork = flux_backend.fork_flux_connection(parent)
+
+    flux_backend.close_flux_connection(parent)
+
+    assert block in flux_backend.floating_memory
+    assert memory_used(owner[0]) == 6
+    # Now the fork's own block: written in place and still counted
+    assert flux_backend.write_floating_memory(fork, block, "shared and longer") == block
+    assert memory_used(owner[0]) == len("shared and longer")
+
+    flux_backend.close_flux_connection(fork)
+    assert block not in flux_backend.floating_memory
+    assert memory_used(owner[0]) == 0
+
+def test_disconnect_cleanup_keeps_old_blocks_a_younger_fork_shares():
+    owner = ("client:fork-disconnect",)
+    parent = flux_backend.create_flux_connection("parent", owner)
+    block = flux_backend.allocate_floating_memory(parent, "string", "old data")
+    fork = flux_backend.fork_flux_connection(parent)
+    flux_backend.active_connections[parent].created_at -= 7200
+    flux_backend.floating_memory[block].created_at -= 7200
+
+    client = flux_backend.socketio.test_client(flux_backend.app)
+    client.disconnect()
+
+    assert parent not in flux_backend.active_connections
+    assert block in flux_backend.floating_memory
+    assert memory_used(owner[0]) == len("old data")
+    flux_backend.close_flux_connection(fork)
+    assert memory_used(owner[0]) == 0
+
+def test_disconnect_cleanup_frees_orphaned_blocks():
+    owner = ("client:orphan",)
+    block = flux_backend.allocate_floating_memory("conn_missing", "string", "orphan")
+    # Never handed to a connection, so nothing else would release it
+    flux_backend.resource_owners[block] = owner
+    flux_backend.quota_manager.acquire(owner, 'memory_bytes', 6)
+
+    assert block in flux_backend.release_orphaned_memory()
+    assert block not in flux_backend.floating_memory
+    assert memory_used(owner[0]) == 0
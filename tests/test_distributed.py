@@ -0,0 +1,65 @@
+import logging
+
+import pytest
+
+from flux_distributed import DistributedWorkerPool, DistributedModule
+
+logging.disable(logging.CRITICAL)
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = DistributedWorkerPool(2)
+    yield pool
+    pool.shutdown()
+
+def module_info(name, nodes, replication_factor=2, consistency_model="eventual"):
+    return {'name': name, 'type': 'kv', 'nodes': nodes,
+            'replication_factor': replication_factor, 'consistency_model': consistency_model}
+
+def test_strong_writes_reach_every_replica(pool):
+    module = DistributedModule("strong", "kv", ["a", "b", "c"], 3, "strong", pool)
+    module.put("k", {"n": 1}, "client-1")
+
+    for node in module.replicas_for("k"):
+        version, _, value = pool.call(pool.worker_for(node), 'get', ("strong", node, "k"))
+        assert value == {"n": 1}
+    assert module.get("k")["value"] == {"n": 1}
+
+def test_later_writes_win_and_sync_repairs_replicas(pool):
+    module = DistributedModule("eventual", "kv", ["a", "b", "c"], 3, "eventual", pool)
+    module.put("k", "first", "client-1")
+    module.put("k", "second", "client-2")
+
+    module.sync()
+    for node in module.replicas_for("k"):
+        assert pool.call(pool.worker_for(node), 'get', ("eventual", node, "k"))[2] == "second"
+    assert module.get("k", "client-1")["value"] == "second"
+
+def test_redeclaring_with_new_nodes_keeps_the_data(pool, monkeypatch):
+    flux_backend = pytest.importorskip("flux_backend")
+    monkeypatch.setattr(flux_backend, "distributed_pool", pool)
+    monkeypatch.setattr(flux_backend, "distributed_modules", {})
+
+    original = flux_backend.declare_distributed_module(module_info("moving", ["a", "b"]))
+    written = original.put("k", "kept", "client-1")
+    assert flux_backend.declare_distributed_module(module_info("moving", ["a", "b"])) is original
+
+    moved = flux_backend.declare_distributed_module(module_info("moving", ["c", "d", "e"], 3, "strong"))
+
+    assert moved is not original
+    entry = moved.get("k", "client-1")
+    assert entry["value"] == "kept"
+    assert entry["version"] == written["version"]
+    # New writes order after the moved ones
+    assert moved.put("k", "newer", "client-2")["version"][0] > written["version"][0]
+    assert moved.get("k")["value"] == "newer"
+
+def test_backend_pool_is_created_on_first_use_and_sized_from_config(monkeypatch):
+    flux_backend = pytest.importorskip("flux_backend")
+    monkeypatch.setattr(flux_backend, "distributed_pool", None)
+    monkeypatch.setenv("FLUX_DISTRIBUTED_WORKERS", "3")
+
+    pool = flux_backend.get_distributed_pool()
+    assert pool.num_workers == 3
+    assert not pool.get_statistics()['started']
+    assert flux_backend.get_distributed_pool() is pool
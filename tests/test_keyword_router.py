@@ -0,0 +1,39 @@
+import copy
+
+import pytest
+
+from enhanced_lanternhive import BLOOM_ROUTER, LANTERN_ROUTER
+from keyword_router import KeywordRouter
+
+TEXTS = [
+    "Design a FLUX connection with floating memory",
+    "",
+    "memory",
+    "module",
+    "What is a memory module?",
+    "Evaluate the security risk of a siig transfer",
+    "lorem ipsum dolor sit amet",
+    "Explain the API COMMAND history",
+    "connection",
+]
+
+def scan_only(router):
+    router = copy.copy(router)
+    router.automaton = None
+    return router
+
+@pytest.mark.parametrize("router", [BLOOM_ROUTER, LANTERN_ROUTER, scan_only(BLOOM_ROUTER), scan_only(LANTERN_ROUTER)])
+def test_match_many_agrees_with_match(router):
+    assert router.match_many(TEXTS) == [router.match(text) for text in TEXTS]
+
+def test_matches_never_span_two_texts():
+    router = KeywordRouter({"pool": ["pool"]})
+    for variant in (router, scan_only(router)):
+        assert variant.match_many(["po", "ol", "a pool"]) == [set(), set(), {"pool"}]
+
+def test_classify_prompts_agrees_with_one_at_a_time(hive):
+    expected = []
+    for text in TEXTS:
+        level = hive.classify_bloom_level(text)
+        expected.append((level, hive.select_lanterns(text, level)))
+    assert hive.classify_prompts(TEXTS + TEXTS) == expected + expected
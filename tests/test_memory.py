@@ -0,0 +1,122 @@
+import logging
+import sqlite3
+
+import pytest
+
+from lantern_memory import DialogueMemory
+
+logging.disable(logging.CRITICAL)
+
+def test_recall_stays_within_a_scope():
+    memory = DialogueMemory(capacity=16, dim=256)
+    memory.remember("Design a FLUX connection pool", "pool answer", "alice")
+    memory.remember("Design a FLUX session cache", "cache answer", "bob")
+
+    recalled = memory.recall("Design a FLUX connection pool for sessions", "alice")
+    assert [past['synthesis'] for past in recalled] == ["pool answer"]
+    assert memory.recall("Design a FLUX connection pool for sessions", "mallory") == []
+
+def test_a_repeated_prompt_is_stored_once_and_never_recalls_itself():
+    memory = DialogueMemory(capacity=16, dim=256)
+    memory.remember("Design a FLUX connection pool", "first", "alice")
+    assert memory.recall("Design a FLUX connection pool", "alice") == []
+
+    memory.remember("design a  FLUX connection pool", "second", "alice")
+    assert memory.size == 1
+    assert memory.get_statistics()['refreshes'] == 1
+    assert memory.recall("Design a FLUX connection pool now", "alice")[0]['synthesis'] == "second"
+
+def test_ring_overwrites_the_oldest_dialogue():
+    memory = DialogueMemory(capacity=3, dim=256)
+    for index in range(5):
+        memory.remember(f"Design FLUX connection pool number {index}", f"answer {index}", "alice")
+
+    assert memory.size == 3
+    recalled = memory.recall("Design FLUX connection pool", "alice", k=10, min_similarity=-1)
+    assert sorted(past['synthesis'] for past in recalled) == ["answer 2", "answer 3", "answer 4"]
+    assert sum(len(slots) for slots in memory.scope_slots.values()) == 3
+
+def test_sketch_search_only_ranks_the_scope_rows():
+    memory = DialogueMemory(capacity=64, dim=256, candidates=4)
+    for index in range(20):
+        memory.remember(f"Design FLUX connection pool variant {index}", "theirs", "bob")
+    for index in range(6):
+        memory.remember(f"Explain memory module fingerprint {index}", "mine", "alice")
+
+    recalled = memory.recall("Design FLUX connection pool variant 3", "alice", k=5, min_similarity=-1)
+    assert recalled and {past['synthesis'] for past in recalled} == {"mine"}
+
+def test_memory_survives_a_restart(tmp_path):
+    memory = DialogueMemory(capacity=4, dim=256, directory=str(tmp_path))
+    memory.remember("Design a FLUX connection pool", "pool answer", "alice")
+    memory.remember("Design a FLUX session cache", "cache answer", "alice")
+    del memory
+
+    reopened = DialogueMemory(capacity=4, dim=256, directory=str(tmp_path))
+    assert reopened.size == 2
+    assert reopened.recall("Design a FLUX connection pool please", "alice")[0]['synthesis'] == "pool answer"
+    assert reopened.recall("Design a FLUX connection pool please", "bob") == []
+    # New dialogues go after the restored ones instead of overwriting them
+    reopened.remember("Design a FLUX connection pool", "refreshed", "alice")
+    reopened.remember("Explain FLUX fingerprints", "fingerprint answer", "alice")
+    assert reopened.size == 3
+
+def test_dialogues_from_before_scoping_are_never_recalled(tmp_path):
+    database = sqlite3.connect(str(tmp_path / "memory.sqlite3"))
+    database.execute("CREATE TABLE dialogues (slot INTEGER PRIMARY KEY, prompt TEXT NOT NULL, "
+                     "synthesis TEXT NOT NULL, created_at REAL NOT NULL)")
+    database.execute("INSERT INTO dialogues VALUES (0, 'Design a FLUX connection pool', 'shared', 1.0)")
+    database.commit()
+    database.close()
+
+    memory = DialogueMemory(capacity=4, dim=256, directory=str(tmp_path))
+    assert memory.recall("Design a FLUX connection pool please", "alice") == []
+    memory.remember("Design a FLUX session cache", "mine", "alice")
+    assert memory.cursor == 2
+
+ARCHIVA_PROMPT = "Find similar past patterns for a FLUX connection pool"
+
+def test_repeating_an_archiva_prompt_hits_the_response_cache(hive):
+    hive.process_prompt(ARCHIVA_PROMPT, {}, memory_scope="alice")
+    misses = hive.response_cache.get_statistics()['misses']
+    for _ in range(2):
+        hive.process_prompt(ARCHIVA_PROMPT, {}, memory_scope="alice")
+    assert hive.response_cache.get_statistics()['misses'] == misses
+    assert hive.memory.size == 1
+
+def test_requests_without_a_scope_neither_recall_nor_remember(hive):
+    hive.process_prompt(ARCHIVA_PROMPT, {}, memory_scope="alice")
+    hive.process_prompt(ARCHIVA_PROMPT + " again", {})
+    assert hive.memory.size == 1
+    assert hive.memory.get_statistics()['searches'] == 1
+
+def test_one_client_cannot_recall_another_clients_dialogues(stub_env):
+    flux_backend = pytest.importorskip("flux_backend")
+    from enhanced_lanternhive import FLUXLanternHive
+
+    hive = FLUXLanternHive()
+    archiva_prompts = []
+    stream = hive.provider.stream
+
+    def recording(model, messages, temperature, timeout):
+        if messages[0]["content"] == hive.all_lanterns["archiva"]["system_prompt"]:
+            archiva_prompts.append(messages[1]["content"])
+        return stream(model, messages, temperature, timeout)
+
+    hive.provider.stream = recording
+    flux_backend.lantern_hive, previous = hive, flux_backend.lantern_hive
+    try:
+        def ask(address, prompt):
+            http = flux_backend.app.test_client()
+            http.environ_base['REMOTE_ADDR'] = address
+            assert http.post('/api/lantern/process', json={'prompt': prompt, 'bypass_cache': True}).status_code == 200
+            return archiva_prompts[-1]
+
+        ask("10.0.0.1", "Find similar past patterns for our secret payroll connection")
+        other = ask("10.0.0.2", "Find similar past patterns for a payroll connection")
+        own = ask("10.0.0.1", "Find similar past patterns for a payroll connection")
+    finally:
+        flux_backend.lantern_hive = previous
+
+    assert "secret payroll" not in other
+    assert "secret payroll" in own
@@ -0,0 +1,61 @@
+import pytest
+
+from flux_memory_modules import MemoryModuleRegistry
+
+BODY = "structure { string name }\nbehavior { persistence: ephemeral }"
+
+def test_instance_is_shared_and_unloaded_with_the_last_reference():
+    registry = MemoryModuleRegistry()
+    fingerprint = registry.declare("memory_module", "Cache", BODY)
+    registry.attach(fingerprint, "conn-a")
+    registry.attach(fingerprint, "conn-b")
+    registry.prune([fingerprint])
+
+    assert registry.get(fingerprint, "conn-a") is registry.get(fingerprint, "conn-b")
+    assert registry.materializations == 1
+
+    registry.release(fingerprint, "conn-a")
+    assert fingerprint in registry.instances
+    registry.release_connection("conn-b")
+    assert fingerprint not in registry.declarations
+    assert registry.unloads == 1
+
+def test_get_requires_an_attached_connection():
+    registry = MemoryModuleRegistry()
+    fingerprint = registry.declare("memory_module", "Cache", BODY)
+    with pytest.raises(KeyError):
+        registry.get(fingerprint, "conn-a")
+
+def test_prune_forgets_only_unattached_declarations_of_the_program():
+    registry = MemoryModuleRegistry()
+    ours = registry.declare("memory_module", "Ours", BODY)
+    theirs = registry.declare("memory_module", "Theirs", BODY)
+
+    registry.prune([ours])
+
+    assert ours not in registry.declarations
+    # Another program, between declare and attach, keeps its module
+    registry.attach(theirs, "conn-b")
+
+def test_prune_keeps_a_module_another_program_declared_concurrently():
+    registry = MemoryModuleRegistry()
+    first = registry.declare("memory_module", "Shared", BODY)
+    second = registry.declare("memory_module", "Shared", BODY)
+    assert first == second
+
+    registry.prune([first])
+    registry.attach(second, "conn-b")
+    registry.prune([second])
+    assert registry.get(second, "conn-b").name == "Shared"
+
+def test_releasing_the_last_connection_keeps_a_pending_declaration():
+    registry = MemoryModuleRegistry()
+    fingerprint = registry.declare("memory_module", "Cache", BODY)
+    registry.attach(fingerprint, "conn-a")
+    registry.declare("memory_module", "Cache", BODY)
+    registry.prune([fingerprint])
+
+    registry.release(fingerprint, "conn-a")
+    registry.attach(fingerprint, "conn-b")
+    registry.prune([fingerprint])
+    assert registry.list_modules()[0]["references"] == 1
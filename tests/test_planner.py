@@ -0,0 +1,68 @@
+import pytest
+
+from lantern_planner import DialoguePlanner, RequestBudget
+
+LANTERNS = ["planner", "eidolon", "archiva"]
+PHASES = ["initial", "cross_consultation", "synthesis"]
+
+def shape(lanterns, phases):
+    calls = []
+    for phase in phases:
+        calls.extend([(phase, "eidolon")] if phase == "synthesis" else [(phase, lantern) for lantern in lanterns])
+    return calls
+
+def plan(planner, budget, models=("slow",)):
+    return planner.plan(
+        LANTERNS, PHASES, shape, lambda lantern, phase: ("default", "slow"),
+        lambda lantern, phase: 100, 500, 4, list(models), budget
+    )
+
+def test_no_budget_plans_the_full_dialogue():
+    chosen = plan(DialoguePlanner(prior_seconds=5), None)
+    assert chosen.phases == PHASES
+    assert chosen.lanterns == LANTERNS
+    assert chosen.fits and not chosen.degraded
+    assert chosen.estimated_seconds == 15
+
+@pytest.mark.parametrize("latency, degradations, phases, lanterns, fits", [
+    (20, [], PHASES, LANTERNS, True),
+    (12, ["skip_cross_consultation"], ["initial", "synthesis"], LANTERNS, True),
+    (8, ["skip_cross_consultation", "skip_synthesis"], ["consultation"], LANTERNS, True),
+    (4, ["skip_cross_consultation", "skip_synthesis", "fewer_lanterns"], ["consultation"], ["planner"], False),
+])
+def test_degrades_one_step_at_a_time(latency, degradations, phases, lanterns, fits):
+    chosen = plan(DialoguePlanner(prior_seconds=5), RequestBudget(latency=latency))
+    assert chosen.degradations == degradations
+    assert chosen.phases == phases
+    assert chosen.lanterns == lanterns
+    assert chosen.fits is fits
+
+def test_faster_models_come_before_dropping_synthesis():
+    planner = DialoguePlanner(prior_seconds=5, min_samples=5)
+    for _ in range(5):
+        planner.observe("planner", "fast", 1.0, 200)
+    chosen = plan(planner, RequestBudget(latency=9), models=("slow", "fast"))
+    assert chosen.degradations == ["skip_cross_consultation", "faster_models"]
+    assert chosen.phases == ["initial", "synthesis"]
+    assert {call.model for call in chosen.calls} == {"fast"}
+
+def test_token_budget_degrades_too():
+    chosen = plan(DialoguePlanner(prior_seconds=5), RequestBudget(tokens=2000))
+    assert chosen.degradations == ["skip_cross_consultation", "skip_synthesis"]
+    assert chosen.estimated_tokens == 3 * 600
+
+def test_interactive_prompt_without_budget_keeps_synthesis(hive):
+    prompt = ("Design a connection with floating memory, a natural language API, a secure siig transfer, "
+              "symbolic notation, compliance with the standard and similar past patterns")
+    result = hive.process_prompt(prompt, {}, bypass_cache=True)
+    assert len(result["plan"]["lanterns"]) >= 7
+    assert result["plan"]["budget"] is None
+    assert result["plan"]["degradations"] == []
+    assert "synthesis" in result["plan"]["phases"]
+    assert result.get("final_response")
+
+def test_budgeted_prompt_is_degraded(hive):
+    result = hive.process_prompt("Design a FLUX connection pool", {}, bypass_cache=True,
+                                 budget=RequestBudget(latency=1))
+    assert "skip_cross_consultation" in result["plan"]["degradations"]
+    assert not hive.has_errors(result)
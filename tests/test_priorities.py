@@ -0,0 +1,39 @@
+import logging
+
+import pytest
+
+logging.disable(logging.CRITICAL)
+flux_backend = pytest.importorskip("flux_backend")
+
+class RecordingHive:
+    """Stands in for the hive, remembering the scheduler class of each prompt"""
+
+    def __init__(self):
+        self.priorities = []
+
+    def process_prompt(self, prompt, *args, priority="interactive", **kwargs):
+        self.priorities.append(priority)
+        return {'final_response': 'ok'}
+
+@pytest.fixture
+def hive(monkeypatch):
+    hive = RecordingHive()
+    monkeypatch.setattr(flux_backend, "lantern_hive", hive)
+    return hive
+
+def test_rest_callers_cannot_claim_interactive(hive):
+    response = flux_backend.app.test_client().post(
+        '/api/lantern/process', json={'prompt': 'Design a pool', 'priority': 'interactive'}
+    )
+    assert response.status_code == 200
+    assert hive.priorities == ['batch']
+
+def test_jobs_run_at_batch_priority(hive):
+    flux_backend.run_lantern_job({'prompt': 'Design a pool', 'priority': 'interactive'})
+    assert hive.priorities == ['batch']
+
+def test_socket_queries_are_interactive(hive):
+    client = flux_backend.socketio.test_client(flux_backend.app)
+    client.emit('lantern_query', {'prompt': 'Design a pool', 'priority': 'batch', 'stream': False})
+    client.disconnect()
+    assert hive.priorities == ['interactive']
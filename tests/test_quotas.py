@@ -0,0 +1,61 @@
+import logging
+
+import pytest
+
+from flux_quotas import QuotaManager, QuotaLimits, QuotaExceededError
+
+logging.disable(logging.CRITICAL)
+
+def test_acquire_is_all_or_nothing_across_principals():
+    quotas = QuotaManager(QuotaLimits(connections=2), {'team': QuotaLimits(connections=1)})
+    principals = ("client:a", "key:team")
+    quotas.acquire(principals, 'connections')
+
+    with pytest.raises(QuotaExceededError) as rejected:
+        quotas.acquire(principals, 'connections')
+
+    assert rejected.value.principal == "key:team"
+    assert quotas.usage_for("client:a")['usage']['connections'] == 1
+    quotas.release(principals, 'connections')
+    assert quotas.usage == {}
+
+@pytest.fixture
+def backend(monkeypatch):
+    flux_backend = pytest.importorskip("flux_backend")
+    monkeypatch.setattr(flux_backend, "quota_manager", QuotaManager(QuotaLimits(connections=2), {}))
+    yield flux_backend
+    for connection_id in list(flux_backend.active_connections):
+        flux_backend.close_flux_connection(connection_id)
+
+def test_rest_clients_cannot_pick_their_principal(backend):
+    client = backend.app.test_client()
+    address = {'REMOTE_ADDR': '10.0.0.7'}
+    for client_id in ("first", "second"):
+        response = client.post('/api/connections', json={'name': client_id},
+                               headers={'X-Client-ID': client_id}, environ_base=address)
+        assert response.status_code == 200
+
+    rejected = client.post('/api/connections', json={'name': 'third'},
+                           headers={'X-Client-ID': 'third'}, environ_base=address)
+
+    assert rejected.status_code == 429
+    assert rejected.get_json()['quota']['principal'] == "client:10.0.0.7"
+    other = client.post('/api/connections', json={'name': 'other'}, environ_base={'REMOTE_ADDR': '10.0.0.8'})
+    assert other.status_code == 200
+
+def test_socket_usage_survives_reconnecting(backend):
+    code = "connection A {\n  on_connect { print(\"hi\") }\n}"
+    http = backend.app.test_client()
+    http.environ_base['REMOTE_ADDR'] = '10.0.0.9'
+    first = backend.socketio.test_client(backend.app, flask_test_client=http)
+    first.emit('execute_flux', {'code': code})
+    first.disconnect()
+
+    second = backend.socketio.test_client(backend.app, flask_test_client=http)
+    second.emit('execute_flux', {'code': code})
+    second.emit('execute_flux', {'code': code})
+    events = [message['name'] for message in second.get_received()]
+
+    assert 'execution_error' in events
+    assert backend.quota_manager.usage_for("client:10.0.0.9")['usage']['connections'] == 2
+    second.disconnect()
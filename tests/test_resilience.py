@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from lantern_coalesce import SingleFlight
+from lantern_resilience import LatencyTracker, ResilientCaller, RetryPolicy
+
+class FixedTracker(LatencyTracker):
+    """Claims a p95 time to first token of 10ms whatever has been recorded"""
+
+    def percentile(self, key, q):
+        return 0.01
+
+def caller(**policy):
+    return ResilientCaller(RetryPolicy(base_delay=0.0, **policy), FixedTracker(), seed=1)
+
+def slow_stream(timeout):
+    yield "first "
+    for _ in range(5):
+        time.sleep(0.01)
+        yield "chunk "
+
+def failing_once():
+    calls = []
+
+    def start(timeout):
+        calls.append(timeout)
+        yield "partial "
+        if len(calls) == 1:
+            raise ConnectionError("stream reset")
+        yield "complete"
+    return start
+
+def test_streaming_attempt_is_not_hedged_without_a_listener():
+    resilient = caller()
+    for _ in range(3):
+        assert resilient.call("planner:m", slow_stream, 5).startswith("first ")
+    stats = resilient.get_statistics()
+    assert stats['hedges'] == 0
+    assert stats['attempts'] == 3
+
+def test_unheard_chunks_do_not_block_retries():
+    resilient = caller()
+    assert resilient.call("planner:m", failing_once(), 5, on_chunk=lambda text: False) == "partial complete"
+    assert resilient.get_statistics()['retries'] == 1
+
+def test_heard_chunks_block_retries():
+    heard = []
+    with pytest.raises(ConnectionError):
+        caller().call("planner:m", failing_once(), 5, on_chunk=heard.append)
+    assert heard == ["partial "]
+
+def test_flight_reports_whether_anyone_heard():
+    flights = SingleFlight()
+    assert flights.run("k", lambda publish, cancellation: publish({"text": "x"}))[0] is False
+    assert flights.run("k", lambda publish, cancellation: publish({"text": "x"}), lambda event: None)[0] is True
+    assert flights.run("k", lambda publish, cancellation: publish({"text": "x"}), lambda event: False)[0] is False
+
+def test_rest_dialogue_retries_a_reset_stream(hive, monkeypatch):
+    stream = hive.provider.stream
+    failed = set()
+
+    def flaky(model, messages, temperature, timeout):
+        key = messages[0]["content"]
+        for index, text in enumerate(stream(model, messages, temperature, timeout)):
+            if index == 1 and key not in failed:
+                failed.add(key)
+                raise ConnectionError("stream reset")
+            yield text
+
+    monkeypatch.setattr(hive.provider, "stream", flaky)
+    result = hive.process_prompt("Design a FLUX connection pool", {}, bypass_cache=True)
+    assert not hive.has_errors(result)
+    assert hive.resilience.get_statistics()['retries'] == len(failed) > 0
@@ -0,0 +1,59 @@
+import pytest
+
+from lantern_semantic_cache import SemanticCache
+
+RESULT = {'final_response': 'answer'}
+
+# Prompts that ask for something different but embed close together
+DIFFERENT = [
+    ("Design a FLUX connection with floating memory", "Design a FLUX connection without floating memory"),
+    ("Design a payment processing service", "Design a payroll processing service"),
+    ("How do I create a FLUX memory module for caching?", "Build a FLUX memory module for caching"),
+]
+
+@pytest.mark.parametrize("stored, asked", DIFFERENT)
+def test_default_threshold_rejects_different_questions(stored, asked):
+    cache = SemanticCache()
+    cache.store(stored, {}, RESULT)
+    assert cache.lookup(asked, {}) is None
+
+def test_rewording_with_synonyms_is_served():
+    cache = SemanticCache()
+    cache.store("Please create a FLUX connection pool", {}, RESULT)
+    hit = cache.lookup("build the FLUX connection pool?", {})
+    assert hit['final_response'] == 'answer'
+    assert hit['semantic_cache']['similarity'] >= cache.threshold
+
+def test_negations_must_match_even_at_a_low_threshold():
+    cache = SemanticCache(threshold=0.5)
+    cache.store("Design a FLUX connection with floating memory", {}, RESULT)
+    assert cache.lookup("Design a FLUX connection without floating memory", {}) is None
+    assert cache.lookup("Design a FLUX connection that doesn't use floating memory", {}) is None
+
+def test_scope_must_match():
+    cache = SemanticCache(threshold=0.5)
+    cache.store("Design a memory module for session caching", {}, RESULT, ["LEVEL_6", ["planner", "eidolon"]])
+    assert cache.lookup("Evaluate a memory module for session caching", {}, ["LEVEL_5", ["planner", "eidolon"]]) is None
+    assert cache.lookup("Design a memory module for session caching", {}, ["LEVEL_6", ["planner"]]) is None
+    assert cache.lookup("Design a memory module for session caching", {}, ["LEVEL_6", ["planner", "eidolon"]])
+
+def test_disabled_cache_neither_stores_nor_serves():
+    cache = SemanticCache(enabled=False)
+    cache.store("Design a FLUX connection pool", {}, RESULT)
+    assert cache.lookup("Design a FLUX connection pool", {}) is None
+    assert cache.get_statistics()['entries'] == 0
+
+def test_hive_semantic_cache_is_opt_in(hive):
+    assert not hive.semantic_cache.enabled
+    hive.process_prompt("Design a FLUX connection pool", {})
+    assert 'semantic_cache' not in hive.process_prompt("Design a FLUX connection pool", {})
+
+def test_hive_keys_on_bloom_level(stub_env, monkeypatch):
+    monkeypatch.setenv('LANTERN_SEMANTIC_CACHE', 'on')
+    from enhanced_lanternhive import FLUXLanternHive
+    hive = FLUXLanternHive()
+    hive.semantic_cache.threshold = 0.5
+    assert hive.classify_bloom_level("Design a cache") != hive.classify_bloom_level("Evaluate a cache")
+    hive.process_prompt("Design a cache", {})
+    assert 'semantic_cache' in hive.process_prompt("Please design the cache", {})
+    assert 'semantic_cache' not in hive.process_prompt("Evaluate a cache", {})
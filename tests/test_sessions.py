@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+from lantern_sessions import SessionStore
+
+def dialogue(prompt):
+    return {
+        'prompt': prompt,
+        'dialogue_log': [{'phase': 'initial', 'lantern': 'planner', 'content': 'x' * 500}],
+        'timestamp': 0.0
+    }
+
+def test_only_the_newest_dialogues_across_sessions_stay_full():
+    store = SessionStore(full_history=2)
+    sessions = []
+    for index in range(5):
+        session = SimpleNamespace(dialogue_history=[])
+        store[f"s{index}"] = session
+        store.record_dialogue(session, dialogue(f"prompt {index}"))
+        sessions.append(session)
+
+    compacted = [session.dialogue_history[0].get('compacted', False) for session in sessions]
+    assert compacted == [True, True, True, False, False]
+    stats = store.get_statistics()
+    assert stats['compactions'] == 3
+    assert stats['compacted_dialogues'] == 3
+    assert sessions[0].dialogue_history[0]['summary'] == 'x' * 300
+
+def test_store_expires_and_evicts_sessions():
+    store = SessionStore(max_sessions=2, ttl=60)
+    for index in range(3):
+        store[f"s{index}"] = SimpleNamespace(dialogue_history=[])
+    assert "s0" not in store
+    assert store.get_statistics()['evictions'] == 1
+
+    store.ttl = 0
+    assert store.get("s2") is None
+
+def test_hive_dialogues_are_compacted(hive):
+    prompts = [f"Design and evaluate FLUX connection architecture number {index}" for index in range(3)]
+    prompts += [f"What is memory {index}?" for index in range(3)]
+    for prompt in prompts:
+        hive.process_prompt(prompt, bypass_cache=True, priority='batch')
+
+    stats = hive.active_sessions.get_statistics()
+    assert stats['dialogues'] == 6
+    assert stats['compactions'] == 6 - hive.active_sessions.full_history
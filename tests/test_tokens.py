@@ -0,0 +1,20 @@
+from lantern_context import build_digest, summarize
+from lantern_tokens import content_words, estimate_tokens
+
+
+def test_content_words_keep_negations_and_question_words():
+    assert content_words("Why is the pool NOT shared without a lock?") == ["why", "pool", "not", "shared", "without", "lock"]
+
+
+def test_summaries_fit_the_shared_estimate():
+    text = " ".join(f"Sentence {n} explains connection pooling for worker {n}." for n in range(40))
+    summary = summarize(text, 60)
+    assert 0 < estimate_tokens(summary) <= 60
+
+
+def test_digest_gives_short_contributions_all_they_need():
+    short = "Use a lock."
+    long = " ".join(f"Detail {n} about memory modules and their refcounts." for n in range(50))
+    digest = dict(build_digest([("short", short), ("long", long)], 100))
+    assert digest["short"] == short
+    assert estimate_tokens(digest["long"]) <= 100 - estimate_tokens(short)